@@ -0,0 +1,225 @@
+"""
+Compile a Tiny Swords map (the `{id, x, y}` tile-list JSON under
+Tiny_Swords/ and game-ui/public/assets/tilemaps/) for the game.
+
+- Collider tiles from every `collider` layer are merged into rectangles by
+  greedy meshing, so the client and server create one static body per
+  rectangle instead of one per tile.
+- Layers are stored as grids cut into chunks (--chunk-size tiles square).
+  Each chunk file holds one base64 little-endian uint16 grid per non-empty
+  layer (tile id + 1, 0 = empty) and the colliders inside it, so a large map
+  can be loaded chunk by chunk.
+- The result is decoded again and checked against the source: the same
+  tiles in every layer, and collider rectangles that cover exactly the
+  collider tiles without overlapping.
+
+    python compile_map.py                                  # village.json → tilemaps/village/
+    python compile_map.py Tiny_Swords/map.json --out build/map --chunk-size 32
+"""
+import json
+import gzip
+import base64
+import hashlib
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+
+DEFAULT_SOURCE = Path(__file__).parent / "game-ui" / "public" / "assets" / "tilemaps" / "village.json"
+FORMAT_VERSION = 1
+HEADER = "map.json"
+ENCODING = "base64-uint16le"
+EMPTY = 0
+
+
+def check_source(data: dict) -> list[str]:
+    """Problems that would make the compiled map differ from what the renderer draws."""
+    problems = []
+    width, height = data.get("mapWidth", 29), data.get("mapHeight", 16)
+    for index, layer in enumerate(data.get("layers", [])):
+        name = layer.get("name")
+        if not isinstance(name, str):
+            problems.append(f"layer {index}: no name")
+            name = str(index)
+        seen = set()
+        for tile in layer.get("tiles", []):
+            where = f"layer '{name}' tile {tile}"
+            try:
+                tile_id = int(tile["id"])
+            except (KeyError, TypeError, ValueError):
+                problems.append(f"{where}: id is not an integer")
+                continue
+            if not 0 <= tile_id < 0xFFFF:
+                problems.append(f"{where}: id out of range")
+            x, y = tile.get("x"), tile.get("y")
+            if not (isinstance(x, int) and isinstance(y, int)):
+                problems.append(f"{where}: x and y are not integers")
+            elif not (0 <= x < width and 0 <= y < height):
+                problems.append(f"{where}: outside the {width}x{height} map")
+            elif (x, y) in seen:
+                problems.append(f"{where}: two tiles at the same position")
+            seen.add((x, y))
+    return problems
+
+
+def layer_grids(data: dict) -> np.ndarray:
+    """(layers, height, width) grid of tile id + 1, 0 where a layer has no tile."""
+    grids = np.zeros((len(data["layers"]), data.get("mapHeight", 16), data.get("mapWidth", 29)), np.uint16)
+    for i, layer in enumerate(data["layers"]):
+        tiles = layer.get("tiles", [])
+        if tiles:
+            xs, ys, ids = np.array([(t["x"], t["y"], int(t["id"])) for t in tiles]).T
+            grids[i, ys, xs] = ids + 1
+    return grids
+
+
+def greedy_mesh(solid: np.ndarray) -> list[list[int]]:
+    """Cover the True cells of a 2D grid with non-overlapping [x, y, w, h]
+    rectangles: scanning rows, grow each rectangle right as far as it can,
+    then down while the whole row below is solid and unused."""
+    todo = solid.copy()
+    height, width = todo.shape
+    rects = []
+    for y in range(height):
+        for x in np.flatnonzero(todo[y]):
+            if not todo[y, x]:
+                continue  # taken by a rectangle started on this row
+            w = 1
+            while x + w < width and todo[y, x + w]:
+                w += 1
+            h = 1
+            while y + h < height and todo[y + h, x:x + w].all():
+                h += 1
+            todo[y:y + h, x:x + w] = False
+            rects.append([int(x), y, w, h])
+    return rects
+
+
+def _encode(grid: np.ndarray) -> str:
+    return base64.b64encode(grid.astype("<u2").tobytes()).decode()
+
+
+def _decode(text: str, shape: tuple[int, int]) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(text), "<u2").reshape(shape)
+
+
+def compile_map(data: dict, chunk_size: int = 16, source_name: str = "") -> tuple[dict, dict[str, dict]]:
+    """The header and {file name: chunk} of the compiled map."""
+    grids = layer_grids(data)
+    _, height, width = grids.shape
+    collider_layers = [i for i, layer in enumerate(data["layers"]) if layer.get("collider")]
+    solid = (grids[collider_layers] != EMPTY).any(axis=0)
+
+    chunks, index = {}, []
+    for cy in range(0, height, chunk_size):
+        for cx in range(0, width, chunk_size):
+            part = grids[:, cy:cy + chunk_size, cx:cx + chunk_size]
+            layers = {str(i): _encode(grid) for i, grid in enumerate(part) if grid.any()}
+            if not layers:
+                continue
+            colliders = [[x + cx, y + cy, w, h]
+                         for x, y, w, h in greedy_mesh(solid[cy:cy + chunk_size, cx:cx + chunk_size])]
+            name = f"chunk_{cx // chunk_size}_{cy // chunk_size}.json"
+            chunks[name] = {
+                "x": cx, "y": cy, "w": part.shape[2], "h": part.shape[1], "encoding": ENCODING,
+                "layers": layers, "colliders": colliders,
+            }
+            index.append({"x": cx // chunk_size, "y": cy // chunk_size, "file": name})
+
+    header = {
+        "version": FORMAT_VERSION,
+        "source": source_name,
+        "sourceHash": hashlib.blake2b(json.dumps(data, sort_keys=True).encode(), digest_size=8).hexdigest(),
+        "tileSize": data.get("tileSize", 64), "mapWidth": width, "mapHeight": height, "chunkSize": chunk_size,
+        "layers": [{"name": layer["name"], "collider": bool(layer.get("collider"))} for layer in data["layers"]],
+        # Whole-map rectangles in tiles; chunk files repeat them cut at chunk borders.
+        "colliders": greedy_mesh(solid),
+        "chunks": index,
+    }
+    return header, chunks
+
+
+def _covers_exactly(rects: list, solid: np.ndarray) -> bool:
+    count = np.zeros(solid.shape, np.int32)
+    for x, y, w, h in rects:
+        count[y:y + h, x:x + w] += 1
+    return bool(((count == 1) == solid).all() and count.max(initial=0) <= 1)
+
+
+def validate(data: dict, header: dict, chunks: dict[str, dict]) -> list[str]:
+    """Decode the compiled map and compare it with the source."""
+    problems = []
+    expected = layer_grids(data)
+    decoded = np.zeros_like(expected)
+    solid_chunks = []
+    for entry in header["chunks"]:
+        chunk = chunks[entry["file"]]
+        x, y, w, h = chunk["x"], chunk["y"], chunk["w"], chunk["h"]
+        for i, text in chunk["layers"].items():
+            decoded[int(i), y:y + h, x:x + w] = _decode(text, (h, w))
+        solid_chunks += chunk["colliders"]
+    for i, layer in enumerate(header["layers"]):
+        if not np.array_equal(decoded[i], expected[i]):
+            problems.append(f"layer '{layer['name']}': {int((decoded[i] != expected[i]).sum())} tiles differ")
+    collider_layers = [i for i, layer in enumerate(header["layers"]) if layer["collider"]]
+    solid = (expected[collider_layers] != EMPTY).any(axis=0)
+    if not _covers_exactly(header["colliders"], solid):
+        problems.append("collider rectangles do not cover exactly the collider tiles")
+    if not _covers_exactly(solid_chunks, solid):
+        problems.append("chunk collider rectangles do not cover exactly the collider tiles")
+    return problems
+
+
+def _size(text: str) -> tuple[int, int]:
+    raw = text.encode()
+    return len(raw), len(gzip.compress(raw))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", default=str(DEFAULT_SOURCE), help="Tiny Swords map JSON")
+    parser.add_argument("--out", help="output directory (default: next to the source, named after it)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="chunk side in tiles")
+    args = parser.parse_args()
+
+    source = Path(args.source)
+    text = source.read_text(encoding="utf-8")
+    data = json.loads(text)
+    problems = check_source(data)
+    if problems:
+        print("\n".join(f"❌ {p}" for p in problems))
+        raise SystemExit(1)
+
+    header, chunks = compile_map(data, args.chunk_size, source.name)
+    problems = validate(data, header, chunks)
+    if problems:
+        print("\n".join(f"❌ {p}" for p in problems))
+        raise SystemExit(1)
+
+    out = Path(args.out) if args.out else source.with_suffix("")
+    out.mkdir(parents=True, exist_ok=True)
+    for stale in out.glob("chunk_*.json"):
+        if stale.name not in chunks:
+            stale.unlink()
+    files = {HEADER: json.dumps(header, separators=(",", ":"))}
+    files.update({name: json.dumps(chunk, separators=(",", ":")) for name, chunk in chunks.items()})
+    for name, body in files.items():
+        (out / name).write_text(body + "\n", encoding="utf-8")
+
+    tiles = sum(len(layer.get("tiles", [])) for layer in data["layers"])
+    collider_tiles = sum(len(layer.get("tiles", [])) for layer in data["layers"] if layer.get("collider"))
+    src_raw, src_gz = _size(text)
+    out_raw = sum(_size(body)[0] for body in files.values())
+    out_gz = sum(_size(body)[1] for body in files.values())
+    chunk_bodies = sum(len(chunk["colliders"]) for chunk in chunks.values())
+    print(f"✅ {source.name} → {out}/ ({len(chunks)} chunks of {args.chunk_size}x{args.chunk_size}, "
+          f"{len(header['layers'])} layers, {tiles} tiles)")
+    print(f"   static bodies {collider_tiles} → {len(header['colliders'])} "
+          f"({1 - len(header['colliders']) / max(collider_tiles, 1):.0%} fewer; {chunk_bodies} when loaded by chunk)")
+    print(f"   size {src_raw / 1024:.1f} KiB → {out_raw / 1024:.1f} KiB ({1 - out_raw / src_raw:.0%} smaller), "
+          f"gzipped {src_gz / 1024:.1f} KiB → {out_gz / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import time
+import heapq
+import asyncio
+import itertools
+from enum import IntEnum
+from contextlib import asynccontextmanager
+from loguru import logger
+
+
+class Priority(IntEnum):
+    PLAYER = 0
+    AMBIENT = 1
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of being sent upstream."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AdmissionController:
+    """Gatekeeper in front of one LLM provider.
+
+    At most `max_concurrency` calls run at once and new calls start no faster
+    than the token bucket allows. Everyone else waits in a bounded priority
+    queue (players ahead of ambient chatter). A full queue or a wait longer
+    than `max_wait` sheds the request with Overloaded.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 16, rate_per_sec: float = 0.0, burst: int = 20,
+                 max_queue: int = 100, max_wait: float = 10.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self._active = 0
+        # Waiters that gave up stay in the heap until popped; _waiting counts the live ones.
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._waiting = {p: 0 for p in Priority}
+        self._seq = itertools.count()
+
+        self.admitted = {p.name.lower(): 0 for p in Priority}
+        self.shed = {p.name.lower(): 0 for p in Priority}
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.queue_peak = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(self._waiting.values())
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.PLAYER):
+        start = time.monotonic()
+        await self._acquire(priority)
+        try:
+            await self.bucket.acquire()
+            self._record_wait(time.monotonic() - start)
+            self.admitted[priority.name.lower()] += 1
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: Priority) -> None:
+        if self._active < self.max_concurrency and not self.queue_depth:
+            self._active += 1
+            return
+
+        if self.queue_depth >= self.max_queue:
+            self._shed_lowest(priority)
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (int(priority), next(self._seq), fut))
+        self._waiting[priority] += 1
+        self.queue_peak = max(self.queue_peak, self.queue_depth)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.max_wait)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                # Granted a slot just as we timed out — give it back.
+                self._release()
+            self._abandon(fut, priority)
+            self._count_shed(priority)
+            raise Overloaded(f"{self.name}: waited more than {self.max_wait}s for an LLM slot")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self._release()
+            self._abandon(fut, priority)
+            raise
+
+    def _abandon(self, fut: asyncio.Future, priority: Priority) -> None:
+        if not fut.done():
+            self._waiting[priority] -= 1
+        fut.cancel()
+
+    def _shed_lowest(self, priority: Priority) -> None:
+        """Queue is full: drop the worst waiter if it ranks below us, otherwise drop ourselves.
+        With no live waiters (max_queue=0, or every waiter already gone) that is us."""
+        if any(count for p, count in self._waiting.items() if p > priority):
+            worst = max((entry for entry in self._queue if not entry[2].done()), key=lambda e: (e[0], e[1]))
+            worst[2].set_exception(Overloaded(f"{self.name}: displaced by higher-priority request"))
+            self._waiting[Priority(worst[0])] -= 1
+            self._count_shed(Priority(worst[0]))
+            return
+        self._count_shed(priority)
+        raise Overloaded(f"{self.name}: LLM queue full ({self.max_queue})")
+
+    def _release(self) -> None:
+        while self._queue:
+            priority, _, fut = heapq.heappop(self._queue)
+            if not fut.done():
+                self._waiting[Priority(priority)] -= 1
+                fut.set_result(None)  # hand our slot straight to the next waiter
+                return
+        self._active -= 1
+
+    def _record_wait(self, waited: float) -> None:
+        self.wait_count += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+    def _count_shed(self, priority: Priority) -> None:
+        self.shed[priority.name.lower()] += 1
+        logger.warning(f"🚦 Shed {priority.name.lower()} request on {self.name} (queue {self.queue_depth})")
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.name,
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queue_depth,
+            "queue_peak": self.queue_peak,
+            "max_queue": self.max_queue,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "avg_wait_ms": round(1000 * self.wait_total / self.wait_count, 2) if self.wait_count else 0.0,
+            "max_wait_ms": round(1000 * self.wait_max, 2),
+        }
+
+
+_controllers: dict[str, AdmissionController] = {}
+
+
+def admission_for(provider: str, **kwargs) -> AdmissionController:
+    """One controller per provider, shared by every agent that calls it."""
+    if provider not in _controllers:
+        _controllers[provider] = AdmissionController(provider, **kwargs)
+    return _controllers[provider]
+
+
+def all_admission_stats() -> list[dict]:
+    return [c.stats() for c in _controllers.values()]
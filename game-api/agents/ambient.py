@@ -0,0 +1,178 @@
+import re
+import random
+import asyncio
+from collections import deque
+from itertools import combinations
+from typing import TYPE_CHECKING, Optional
+from langchain_core.messages import SystemMessage, HumanMessage
+from loguru import logger
+
+from agents.prompts import NPC_CONFIGS
+from agents.commands import TAG_RE
+from agents.admission import AdmissionController, Priority, Overloaded
+from metrics import AMBIENT_EXCHANGES
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+
+# NPCs that never take part in village small talk.
+AMBIENT_EXCLUDED = {"dragon"}
+
+CHATTER_PROMPT = """You write ambient dialogue for a fantasy village game.
+Two villagers chat briefly while the player walks past.
+
+Speaker A is {a_name}. {a_perspective} Talking style: {a_style}
+Speaker B is {b_name}. {b_perspective} Talking style: {b_style}
+
+Write exactly {turns} lines, alternating A and B, starting with A.
+Format every line as "A: text" or "B: text". Each line under 12 words.
+Small talk only: never reveal riddle answers, items or quest solutions.
+Plain text only — no markdown, no asterisks, no narration."""
+
+TOPICS = (
+    "the weather", "the dragon in the east", "village gossip", "their work today",
+    "the new adventurer", "an old legend", "supper", "strange noises at night",
+)
+
+_LINE_RE = re.compile(r"^\s*([AB])\s*:\s*(.+?)\s*$", re.MULTILINE)
+
+Pair = tuple[str, str]
+Exchange = list[dict[str, str]]
+
+
+def chatter_pairs(npc_ids=None) -> list[Pair]:
+    """Every unordered pair of chatty NPCs, in NPC_CONFIGS order."""
+    npc_ids = [n for n in (npc_ids or NPC_CONFIGS) if n not in AMBIENT_EXCLUDED]
+    return list(combinations(npc_ids, 2))
+
+
+def parse_exchange(text: str, pair: Pair) -> Exchange:
+    """Turn "A: ..." / "B: ..." lines into speaker-tagged lines; anything else is dropped."""
+    speakers = {"A": pair[0], "B": pair[1]}
+    lines = []
+    for label, line in _LINE_RE.findall(text):
+        line = TAG_RE.sub("", line).strip()
+        if line:
+            lines.append({"npc_id": speakers[label], "text": line})
+    return lines
+
+
+class AmbientChatter:
+    """Pre-generated NPC-to-NPC small talk, pooled per NPC pair.
+
+    One LLM call writes a whole multi-turn exchange. Pools fill lazily: a pair
+    gets its first exchanges only after it is asked for once, and from then
+    on a background task keeps its pool topped up at ambient priority. `take`
+    never waits on the model; an empty pool just means the client uses its
+    canned lines. Pairs that never meet cost nothing.
+    """
+
+    def __init__(self, llm: "BaseChatModel", admission: Optional[AdmissionController] = None,
+                 pool_size: int = 3, turns: int = 4, refill_interval: float = 30.0, npc_ids=None):
+        self.llm = llm
+        self.admission = admission
+        self.pool_size = pool_size
+        self.turns = turns
+        self.refill_interval = refill_interval
+        self._pools: dict[Pair, deque[Exchange]] = {pair: deque() for pair in chatter_pairs(npc_ids)}
+        self._wanted: set[Pair] = set()
+        self._wake = asyncio.Event()
+        self.served = 0
+        self.empty = 0
+        self.generated = 0
+        self.failed = 0
+
+    def _pair(self, npc_a: str, npc_b: str) -> Pair:
+        if (npc_a, npc_b) in self._pools:
+            return (npc_a, npc_b)
+        if (npc_b, npc_a) in self._pools:
+            return (npc_b, npc_a)
+        raise KeyError(f"No chatter between '{npc_a}' and '{npc_b}'")
+
+    def take(self, npc_a: str, npc_b: str) -> Optional[Exchange]:
+        """Pop a ready exchange for the pair (either order), or None if the pool is dry."""
+        pair = self._pair(npc_a, npc_b)
+        pool = self._pools[pair]
+        self._wanted.add(pair)
+        self._wake.set()
+        if not pool:
+            self.empty += 1
+            AMBIENT_EXCHANGES.labels("pool_empty").inc()
+            return None
+        self.served += 1
+        AMBIENT_EXCHANGES.labels("served").inc()
+        return pool.popleft()
+
+    async def generate(self, pair: Pair) -> Exchange:
+        a, b = NPC_CONFIGS[pair[0]], NPC_CONFIGS[pair[1]]
+        messages = [
+            SystemMessage(content=CHATTER_PROMPT.format(
+                a_name=a["name"], a_perspective=a["perspective"], a_style=a["style"],
+                b_name=b["name"], b_perspective=b["perspective"], b_style=b["style"],
+                turns=self.turns,
+            )),
+            HumanMessage(content=f"Write a new exchange about {random.choice(TOPICS)}."),
+        ]
+        if self.admission:
+            async with self.admission.slot(Priority.AMBIENT):
+                response = await self.llm.ainvoke(messages)
+        else:
+            response = await self.llm.ainvoke(messages)
+
+        lines = parse_exchange(str(response.content), pair)
+        if len(lines) < 2:
+            raise ValueError(f"unusable exchange ({len(lines)} lines)")
+        return lines
+
+    async def _refill(self, pair: Pair) -> bool:
+        try:
+            exchange = await self.generate(pair)
+        except Overloaded:
+            return False
+        except Exception as e:
+            self.failed += 1
+            AMBIENT_EXCHANGES.labels("failed").inc()
+            logger.error(f"Chatter for {pair[0]}/{pair[1]} failed: {e}")
+            return False
+        self._pools[pair].append(exchange)
+        self.generated += 1
+        AMBIENT_EXCHANGES.labels("generated").inc()
+        return True
+
+    async def refill(self) -> int:
+        """Top up every pool asked for so far, one exchange per short pair per round.
+        Returns how many were made."""
+        made = 0
+        while True:
+            short = [pair for pair in self._wanted if len(self._pools[pair]) < self.pool_size]
+            if not short:
+                return made
+            results = await asyncio.gather(*(self._refill(pair) for pair in short))
+            made += sum(results)
+            if not any(results):
+                return made  # LLM busy or failing: back off until the next wake-up
+
+    async def run(self) -> None:
+        """Background loop: refill, then sleep until an exchange is taken or the interval passes.
+        Nothing is generated before the first `take`."""
+        while True:
+            self._wake.clear()
+            made = await self.refill()
+            if made:
+                logger.info(f"🗣️ Pooled {made} NPC chatter exchanges")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "pools": {f"{a}-{b}": len(pool) for (a, b), pool in self._pools.items()},
+            "pool_size": self.pool_size,
+            "wanted": len(self._wanted),
+            "served": self.served,
+            "empty": self.empty,
+            "generated": self.generated,
+            "failed": self.failed,
+        }
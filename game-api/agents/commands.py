@@ -0,0 +1,215 @@
+import re
+import json
+from typing import NamedTuple, Optional
+
+from game.quests import QUESTS
+
+
+COMMANDS = ("GIVE_ITEM", "MISSION_COMPLETE")
+TAG_RE = re.compile(r'\[(GIVE_ITEM|MISSION_COMPLETE):(\w+)\]')
+PARTIAL_TAG_RE = re.compile(r'\[(?:GIVE_ITEM|MISSION_COMPLETE):\w*\Z')
+# Anything still mentioning a command once the valid tags are stripped is a tag the model got wrong.
+MALFORMED_TAG_RE = re.compile(r'GIVE[\s_-]?ITEM|MISSION[\s_-]?COMPLETE', re.IGNORECASE)
+VALUE_RE = re.compile(r'\w+\Z')
+# Longest run of bytes we are willing to hold back waiting for a tag to close.
+MAX_TAG_LENGTH = 96
+
+COMMAND_MODES = ("tags", "tools")
+
+# Tool-calling mode: the same two commands as OpenAI-style function schemas.
+# Enums let the provider reject unknown items and missions before we see them.
+COMMAND_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "give_item",
+            "description": "Hand an item to the player.",
+            "parameters": {
+                "type": "object",
+                "properties": {"item": {"type": "string", "enum": sorted(QUESTS.items)}},
+                "required": ["item"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "complete_mission",
+            "description": "Mark one of your missions as completed by the player.",
+            "parameters": {
+                "type": "object",
+                "properties": {"mission_id": {"type": "string", "enum": sorted(QUESTS.missions)}},
+                "required": ["mission_id"],
+            },
+        },
+    },
+]
+# tool name -> (command, argument holding its value)
+TOOL_COMMANDS = {"give_item": ("GIVE_ITEM", "item"), "complete_mission": ("MISSION_COMPLETE", "mission_id")}
+
+
+class StreamEvent(NamedTuple):
+    kind: str  # "text", "give_item" or "mission_complete"
+    value: str
+
+
+class ParsedResponse(NamedTuple):
+    message: str
+    give_item: Optional[str]
+    mission_complete: Optional[str]
+
+
+def parse_response(text: str) -> ParsedResponse:
+    """Strip command tags and pull out the first GIVE_ITEM / MISSION_COMPLETE in one pass."""
+    found: dict[str, str] = {}
+    for match in TAG_RE.finditer(text):
+        found.setdefault(match.group(1), match.group(2))
+    return ParsedResponse(
+        message=TAG_RE.sub('', text).strip(),
+        give_item=found.get("GIVE_ITEM"),
+        mission_complete=found.get("MISSION_COMPLETE"),
+    )
+
+
+def count_malformed(text: str) -> int:
+    """Command mentions in `text` that are not well-formed tags."""
+    return len(MALFORMED_TAG_RE.findall(TAG_RE.sub('', text)))
+
+
+def tool_call_tag(name: str, args) -> Optional[str]:
+    """Render a tool call as the canonical tag, or None if it is not a valid command.
+
+    Tool calls are turned into tags so the cache, memory and CommandStreamParser
+    handle both modes the same way.
+    """
+    spec = TOOL_COMMANDS.get(name)
+    if spec is None or not isinstance(args, dict):
+        return None
+    cmd, field = spec
+    value = args.get(field)
+    if not isinstance(value, str) or not VALUE_RE.match(value):
+        return None
+    return f"[{cmd}:{value}]"
+
+
+def tool_call_tags(message) -> tuple[list[str], int]:
+    """Tags for a complete AIMessage's tool calls, plus how many calls were unusable."""
+    tags, failures = [], len(getattr(message, "invalid_tool_calls", ()))
+    for call in getattr(message, "tool_calls", ()):
+        tag = tool_call_tag(call["name"], call["args"])
+        if tag:
+            tags.append(tag)
+        else:
+            failures += 1
+    return tags, failures
+
+
+class ToolCallStream:
+    """Reassembles streamed tool-call chunks.
+
+    Arguments arrive as JSON fragments; a call is released as its canonical tag
+    the moment its arguments parse, without waiting for the stream to end.
+    """
+
+    def __init__(self):
+        self._calls: dict[int, list] = {}  # index -> [name, args json, done]
+        self.failures = 0
+
+    def feed(self, chunks) -> str:
+        tags = []
+        for chunk in chunks:
+            index = chunk.get("index")
+            call = self._calls.setdefault(len(self._calls) if index is None else index, ["", "", False])
+            call[0] += chunk.get("name") or ""
+            call[1] += chunk.get("args") or ""
+            if call[2] or not call[0]:
+                continue
+            try:
+                args = json.loads(call[1])
+            except ValueError:
+                continue
+            call[2] = True
+            tag = tool_call_tag(call[0], args)
+            if tag:
+                tags.append(tag)
+            else:
+                self.failures += 1
+        return "".join(f" {tag}" for tag in tags)
+
+    def close(self) -> int:
+        """Calls whose arguments never became valid JSON count as failures too."""
+        self.failures += sum(1 for call in self._calls.values() if not call[2])
+        self._calls.clear()
+        return self.failures
+
+
+def _is_partial_tag(text: str) -> bool:
+    """True if `text` (starting at '[') may still turn into a command tag."""
+    if len(text) > MAX_TAG_LENGTH:
+        return False
+    body = text[1:]
+    if any(f"{cmd}:".startswith(body) for cmd in COMMANDS):
+        return True
+    return PARTIAL_TAG_RE.match(text) is not None
+
+
+class CommandStreamParser:
+    """Incremental tag-aware tokenizer for streamed NPC replies.
+
+    Text is released as soon as it cannot be part of a command tag; only a
+    trailing partial tag is held back. Completed tags become command events
+    immediately instead of after the stream ends.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._parts: list[str] = []
+        self.give_item: Optional[str] = None
+        self.mission_complete: Optional[str] = None
+
+    def feed(self, chunk: str) -> list[StreamEvent]:
+        buf = self._pending + chunk
+        self._pending = ""
+        events: list[StreamEvent] = []
+        start = 0
+        while True:
+            i = buf.find('[', start)
+            if i < 0:
+                self._emit_text(events, buf[start:])
+                break
+            self._emit_text(events, buf[start:i])
+            match = TAG_RE.match(buf, i)
+            if match:
+                self._emit_command(events, match.group(1), match.group(2))
+                start = match.end()
+            elif _is_partial_tag(buf[i:]):
+                self._pending = buf[i:]
+                break
+            else:
+                self._emit_text(events, '[')
+                start = i + 1
+        return events
+
+    def close(self) -> list[StreamEvent]:
+        """Flush whatever is held back; an unterminated tag is just text."""
+        events: list[StreamEvent] = []
+        self._emit_text(events, self._pending)
+        self._pending = ""
+        return events
+
+    @property
+    def text(self) -> str:
+        return ''.join(self._parts).strip()
+
+    def _emit_text(self, events: list[StreamEvent], text: str) -> None:
+        if text:
+            self._parts.append(text)
+            events.append(StreamEvent("text", text))
+
+    def _emit_command(self, events: list[StreamEvent], cmd: str, value: str) -> None:
+        if cmd == "GIVE_ITEM":
+            self.give_item = self.give_item or value
+            events.append(StreamEvent("give_item", value))
+        else:
+            self.mission_complete = self.mission_complete or value
+            events.append(StreamEvent("mission_complete", value))
@@ -0,0 +1,68 @@
+from typing import NamedTuple, Optional, Sequence
+from langchain_core.messages import BaseMessage
+from loguru import logger
+
+from agents.tokens import count_tokens
+from agents.memory import Turn
+
+
+# Role/framing tokens a chat API adds around every message.
+MESSAGE_OVERHEAD = 4
+
+
+def message_tokens(msg: BaseMessage) -> int:
+    return count_tokens(msg.content) + MESSAGE_OVERHEAD
+
+
+class ContextStats(NamedTuple):
+    input_tokens: int
+    system_tokens: int
+    history_tokens: int
+    history_kept: int
+    history_dropped: int
+    budget: int
+
+
+class ContextBudgeter:
+    """Fits the message list sent to the model into an input-token budget.
+
+    The system prompt and the latest player turn are always kept; history is
+    dropped oldest-first (never leaving an orphaned NPC reply at the front)
+    until the total fits. History costs come from the counts stored on each
+    Turn, and only the turns that are kept become LangChain messages.
+    """
+
+    def __init__(self, default_budget: int = 3000, per_npc: Optional[dict[str, int]] = None):
+        self.default_budget = default_budget
+        self.per_npc = per_npc or {}
+
+    def budget_for(self, npc_id: str) -> int:
+        return self.per_npc.get(npc_id, self.default_budget)
+
+    def fit(self, npc_id: str, system: BaseMessage, history: Sequence[Turn],
+            latest: BaseMessage) -> tuple[list[BaseMessage], ContextStats]:
+        budget = self.budget_for(npc_id)
+        system_tokens = message_tokens(system)
+        fixed = system_tokens + message_tokens(latest)
+        history_costs = [turn.tokens + MESSAGE_OVERHEAD for turn in history]
+        history_total = sum(history_costs)
+
+        start = 0
+        if budget:
+            while start < len(history) and fixed + history_total > budget:
+                history_total -= history_costs[start]
+                start += 1
+            while start < len(history) and history[start].role == "ai":
+                history_total -= history_costs[start]
+                start += 1
+
+        kept = [turn.to_message() for turn in history[start:]]
+        stats = ContextStats(
+            input_tokens=fixed + history_total, system_tokens=system_tokens,
+            history_tokens=history_total, history_kept=len(kept), history_dropped=start, budget=budget,
+        )
+        logger.info(
+            f"🧮 {npc_id} input tokens: {stats.input_tokens}/{budget} "
+            f"(system {system_tokens}, history {history_total} in {len(kept)} msgs, dropped {start})"
+        )
+        return [system, *kept, latest], stats
@@ -0,0 +1,128 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional
+from loguru import logger
+
+from config import settings
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+
+PROVIDERS = ("groq", "mock", "playback")
+# Run in-process and need no API key.
+LOCAL_PROVIDERS = frozenset({"mock", "playback"})
+
+
+def check_provider(provider: str = None) -> None:
+    """Validate the provider settings without importing the provider stack."""
+    provider = provider or settings.LLM_PROVIDER
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{provider}' (expected one of {PROVIDERS})")
+    if provider == "groq" and not settings.GROQ_API_KEY:
+        raise ValueError("GROQ_API_KEY is required when LLM_PROVIDER=groq "
+                         f"(local providers need no key: {sorted(LOCAL_PROVIDERS)})")
+
+
+def create_llm(provider: str = None) -> "BaseChatModel":
+    """Build the chat model for the configured provider (LLM_PROVIDER).
+    Provider modules are imported here, never at module import time."""
+    provider = provider or settings.LLM_PROVIDER
+    check_provider(provider)
+
+    if provider == "groq":
+        from langchain_groq import ChatGroq
+        return ChatGroq(
+            api_key = settings.GROQ_API_KEY,
+            model = settings.LLM_MODEL,
+            temperature = settings.LLM_TEMPERATURE,
+            max_tokens = settings.LLM_MAX_TOKENS,
+        )
+
+    if provider == "mock":
+        from agents.mock_llm import MockChatModel
+        return MockChatModel(
+            ttft_ms = settings.MOCK_TTFT_MS,
+            tokens_per_sec = settings.MOCK_TOKENS_PER_SEC,
+            failure_rate = settings.MOCK_FAILURE_RATE,
+            tag_error_rate = settings.MOCK_TAG_ERROR_RATE,
+            tool_error_rate = settings.MOCK_TOOL_ERROR_RATE,
+            seed = settings.MOCK_SEED,
+        )
+
+    from agents.playback_llm import PlaybackChatModel
+    return PlaybackChatModel(
+        trace_path = settings.TRACE_REPLAY_PATH,
+        speed = settings.TRACE_PLAYBACK_SPEED,
+    )
+
+
+class LazyLLM:
+    """Stands in for the chat model until it exists.
+
+    Importing a provider stack (langchain_core's model base with langsmith,
+    plus the provider SDK) is most of a worker's start-up time. `warm()` builds
+    the model in a thread so the server can start listening first; calls made
+    before it is ready wait for it. `bind_tools()` returns a view that binds
+    once the model exists. Settings are still validated up front.
+    """
+
+    def __init__(self, provider: str = None, _parent: "LazyLLM" = None, _tools: Optional[list] = None):
+        self.provider = provider or settings.LLM_PROVIDER
+        if _parent is None:
+            check_provider(self.provider)
+        self._parent = _parent
+        self._tools = _tools
+        self._model: Optional["BaseChatModel"] = None
+        self._loading: Optional[asyncio.Future] = None
+
+    def _root(self) -> "LazyLLM":
+        return self._parent or self
+
+    @property
+    def state(self) -> str:
+        root = self._root()
+        if root._model is not None:
+            return "ready"
+        if root._loading is None:
+            return "cold"
+        if not root._loading.done():
+            return "warming"
+        return "failed" if root._loading.cancelled() or root._loading.exception() else "ready"
+
+    def warm(self) -> asyncio.Future:
+        """Start building the model in a thread (once); await the result to wait for it."""
+        root = self._root()
+        if root._loading is None:
+            root._loading = asyncio.ensure_future(asyncio.to_thread(self._build, root.provider))
+        return root._loading
+
+    @staticmethod
+    def _build(provider: str) -> "BaseChatModel":
+        model = create_llm(provider)
+        logger.info(f"🧠 LLM provider {provider} loaded")
+        return model
+
+    async def model(self) -> "BaseChatModel":
+        if self._model is None:
+            if self._parent is not None:
+                self._model = self._bind(await self._parent.model())
+            else:
+                self._model = await self.warm()
+        return self._model
+
+    def _bind(self, model: "BaseChatModel"):
+        try:
+            return model.bind_tools(self._tools)
+        except NotImplementedError:
+            logger.warning(f"⚠️ {type(model).__name__} has no tool calling; commands fall back to tags")
+            return model
+
+    def bind_tools(self, tools: list) -> "LazyLLM":
+        return LazyLLM(self.provider, _parent=self._root(), _tools=list(tools))
+
+    async def ainvoke(self, input: Any, **kwargs: Any):
+        return await (await self.model()).ainvoke(input, **kwargs)
+
+    async def astream(self, input: Any, **kwargs: Any) -> AsyncIterator:
+        async for chunk in (await self.model()).astream(input, **kwargs):
+            yield chunk
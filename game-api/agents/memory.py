@@ -1,53 +1,257 @@
-from typing import Optional
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+import sys
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING, Optional
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, SystemMessage
 from loguru import logger
 
+from agents.tokens import count_tokens
+from agents.admission import AdmissionController, Priority, Overloaded
+from game.storage import GameStore, Conversations
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+
+class TruncationSummarizer:
+    """Default strategy: append evicted lines and keep the last `max_chars` characters."""
+
+    background = False
+
+    def __init__(self, max_chars: int = 500):
+        self.max_chars = max_chars
+
+    def summarize(self, old_summary: str, lines: list[str]) -> str:
+        new_summary = old_summary + "\n" + "\n".join(lines)
+        if len(new_summary) > self.max_chars:
+            new_summary = new_summary[-self.max_chars:]
+        return new_summary
+
+
+SUMMARY_PROMPT = """You keep notes for a fantasy village NPC about their conversation with a player.
+Merge the existing notes and the new conversation lines into one short summary of at most {max_words} words.
+Keep every quest-relevant fact: riddles asked, answers given, items handed over, promises made.
+Write plain text, third person, no preamble."""
+
+
+class LLMSummarizer:
+    """Condenses evicted turns with the LLM, off the request path.
+
+    `summarize` returns an immediate stand-in so the next prompt is never
+    blocked: the condensed notes, whole, plus the tail of the lines not yet
+    folded in. ConversationMemory then calls `condense` in a background task,
+    at ambient priority so it never competes with player turns.
+    """
+
+    background = True
+
+    def __init__(self, llm: "BaseChatModel", admission: Optional[AdmissionController] = None, max_words: int = 80,
+                 max_recent_chars: int = 500):
+        self.llm = llm
+        self.admission = admission
+        self.max_words = max_words
+        self.max_recent_chars = max_recent_chars
+
+    def summarize(self, old_summary: str, lines: list[str]) -> str:
+        recent = "\n".join(lines)[-self.max_recent_chars:]
+        return f"{old_summary}\n{recent}" if old_summary else recent
+
+    async def condense(self, old_summary: str, lines: list[str]) -> str:
+        messages = [
+            SystemMessage(content=SUMMARY_PROMPT.format(max_words=self.max_words)),
+            HumanMessage(content=f"EXISTING NOTES:\n{old_summary or '(none)'}\n\nNEW LINES:\n" + "\n".join(lines)),
+        ]
+        if self.admission:
+            async with self.admission.slot(Priority.AMBIENT):
+                response = await self.llm.ainvoke(messages)
+        else:
+            response = await self.llm.ainvoke(messages)
+        return str(response.content).strip()
+
+
+def create_summarizer(strategy: str, llm: Optional["BaseChatModel"] = None,
+                      admission: Optional[AdmissionController] = None, max_words: int = 80):
+    if strategy == "truncate":
+        return TruncationSummarizer()
+    if strategy == "llm":
+        if llm is None:
+            raise ValueError("The 'llm' summary strategy needs an LLM")
+        return LLMSummarizer(llm, admission=admission, max_words=max_words)
+    raise ValueError(f"Unknown summary strategy '{strategy}'")
+
+
+class Turn:
+    """One stored message. A fraction of the size of a LangChain message, which
+    is only built (`to_message`) when a request is assembled."""
+
+    __slots__ = ("role", "content", "tokens")
+
+    def __init__(self, role: str, content: str, tokens: int):
+        self.role = sys.intern(role)
+        self.content = content
+        self.tokens = tokens
+
+    def to_message(self) -> BaseMessage:
+        return HumanMessage(content=self.content) if self.role == "human" else AIMessage(content=self.content)
+
 
 class ConversationMemory:
-    def __init__(self, max_messages: int = 20):
+    # Evicted lines waiting for a background summary; past this the oldest are dropped.
+    MAX_PENDING_LINES = 40
+    # A failed or shed summary is retried after 2, 4 and 8 s, then waits for the next trim.
+    CONDENSE_RETRIES = 3
+    CONDENSE_BACKOFF = 2.0
+
+    def __init__(self, max_messages: int = 20, store: Optional[GameStore] = None, session_id: str = "",
+                 max_tokens: int = 0, summarizer=None):
         self.max_messages = max_messages
-        self._histories: dict[str, list[BaseMessage]] = {}
+        self.max_tokens = max_tokens
+        self.summarizer = summarizer or TruncationSummarizer()
+        self.store = store
+        self.session_id = session_id
+        self._histories: dict[str, deque[Turn]] = {}
+        self._history_tokens: dict[str, int] = {}
         self._summaries: dict[str, str] = {}
+        # Background summarization: condensed notes plus evicted lines not yet folded in.
+        self._condensed: dict[str, str] = {}
+        self._pending: dict[str, list[str]] = {}
+        self._pending_added: dict[str, int] = {}  # lines ever queued, to tell new ones from a batch in flight
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def load(self, conversations: Conversations) -> None:
+        for npc_id, (messages, summary) in conversations.items():
+            history = deque(Turn(role, content, count_tokens(content)) for role, content in messages)
+            self._histories[npc_id] = history
+            self._history_tokens[npc_id] = sum(turn.tokens for turn in history)
+            if summary:
+                self._summaries[npc_id] = summary
+                self._condensed[npc_id] = summary
+
+    def get_turns(self, npc_id: str) -> list[Turn]:
+        """The NPC's stored history, each turn with its token count."""
+        return list(self._histories.get(npc_id, ()))
 
     def get_history(self, npc_id: str) -> list[BaseMessage]:
-        return self._histories.get(npc_id, [])
+        """The NPC's history as LangChain messages, built fresh for a request."""
+        return [turn.to_message() for turn in self._histories.get(npc_id, ())]
+
+    def history_length(self, npc_id: str) -> int:
+        return len(self._histories.get(npc_id, ()))
 
     def get_summary(self, npc_id: str) -> str:
         return self._summaries.get(npc_id, "No previous conversation.")
 
+    def history_tokens(self, npc_id: str) -> int:
+        return self._history_tokens.get(npc_id, 0)
+
     def add_message(self, npc_id: str, role: str, content: str) -> None:
-        if npc_id not in self._histories:
-            self._histories[npc_id] = []
+        turn = Turn(role, content, count_tokens(content))
+        self._histories.setdefault(npc_id, deque()).append(turn)
+        self._history_tokens[npc_id] = self._history_tokens.get(npc_id, 0) + turn.tokens
+        if self.store:
+            self.store.record_message(self.session_id, npc_id, role, content)
 
-        msg = HumanMessage(content=content) if role == "human" else AIMessage(content=content)
-        self._histories[npc_id].append(msg)
+        if self._over_budget(npc_id):
+            self._trim_history(npc_id)
 
+    def _over_budget(self, npc_id: str) -> bool:
         if len(self._histories[npc_id]) > self.max_messages:
-            self._trim_history(npc_id)
+            return True
+        return bool(self.max_tokens) and self._history_tokens[npc_id] > self.max_tokens
 
-    def _trim_history(self, npc_id: str) -> None:
+    def _split_point(self, npc_id: str) -> int:
+        """How many of the oldest messages to evict."""
         history = self._histories[npc_id]
-        split = len(history) // 2
-        old = history[:split]
+        if not self.max_tokens or len(history) > self.max_messages:
+            return len(history) // 2
+        # Over the token budget: evict oldest until at most half the budget remains,
+        # always keeping the latest exchange.
+        remaining = self._history_tokens[npc_id]
+        split = 0
+        for turn in history:
+            if split >= len(history) - 2 or remaining <= self.max_tokens // 2:
+                break
+            remaining -= turn.tokens
+            split += 1
+        return split
 
-        parts = []
-        for msg in old:
-            role = "Player" if isinstance(msg, HumanMessage) else "NPC"
-            parts.append(f"{role}: {msg.content}")
+    def _trim_history(self, npc_id: str) -> None:
+        history = self._histories[npc_id]
+        split = self._split_point(npc_id)
+        if not split:
+            return
+        old = [history.popleft() for _ in range(split)]
+        parts = [f"{'Player' if turn.role == 'human' else 'NPC'}: {turn.content}" for turn in old]
 
-        old_summary = self._summaries.get(npc_id, "")
-        new_summary = old_summary + "\n" + "\n".join(parts)
-        if len(new_summary) > 500:
-            new_summary = new_summary[-500:]
+        if self.summarizer.background:
+            pending = self._pending.setdefault(npc_id, [])
+            pending.extend(parts)
+            del pending[:-self.MAX_PENDING_LINES]
+            self._pending_added[npc_id] = self._pending_added.get(npc_id, 0) + len(parts)
+            new_summary = self.summarizer.summarize(self._condensed.get(npc_id, ""), self._pending[npc_id])
+            self._schedule_condense(npc_id)
+        else:
+            new_summary = self.summarizer.summarize(self._summaries.get(npc_id, ""), parts)
 
         self._summaries[npc_id] = new_summary
-        self._histories[npc_id] = history[split:]
+        self._history_tokens[npc_id] -= sum(turn.tokens for turn in old)
+        if self.store:
+            self.store.record_trim(self.session_id, npc_id, len(history), new_summary)
         logger.info(f"Trimmed {npc_id} history")
 
+    def _schedule_condense(self, npc_id: str) -> None:
+        task = self._tasks.get(npc_id)
+        if task and not task.done():
+            return  # the running job picks up the new lines when it loops
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no event loop (scripts/tests): keep the stand-in summary
+        self._tasks[npc_id] = loop.create_task(self._condense(npc_id))
+
+    async def _condense(self, npc_id: str) -> None:
+        failures = 0
+        while self._pending.get(npc_id):
+            batch = list(self._pending[npc_id])
+            queued = self._pending_added[npc_id]
+            try:
+                condensed = await self.summarizer.condense(self._condensed.get(npc_id, ""), batch)
+            except Exception as e:
+                reason = "LLM busy" if isinstance(e, Overloaded) else f"failed: {e}"
+                if failures == self.CONDENSE_RETRIES:
+                    logger.warning(f"Summary for {npc_id} {reason}; keeping the stand-in until the next trim")
+                    return
+                delay = self.CONDENSE_BACKOFF * 2 ** failures
+                failures += 1
+                logger.info(f"Summary for {npc_id} {reason}; retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                continue
+            if npc_id not in self._pending:
+                return  # reset while we were waiting
+            failures = 0
+            self._condensed[npc_id] = condensed
+            # Keep only the lines queued after this batch was taken (some of the batch may have been dropped).
+            added = self._pending_added[npc_id] - queued
+            self._pending[npc_id] = self._pending[npc_id][-added:] if added else []
+            remaining = self._pending[npc_id]
+            summary = self.summarizer.summarize(condensed, remaining) if remaining else condensed
+            self._summaries[npc_id] = summary
+            if self.store:
+                self.store.record_summary(self.session_id, npc_id, summary)
+            logger.info(f"Condensed {npc_id} summary to {count_tokens(summary)} tokens")
+
     def reset(self, npc_id: Optional[str] = None) -> None:
         if npc_id:
-            self._histories.pop(npc_id, None)
-            self._summaries.pop(npc_id, None)
+            npc_ids = [npc_id]
         else:
-            self._histories.clear()
-            self._summaries.clear()
\ No newline at end of file
+            npc_ids = list(set(self._histories) | set(self._summaries) | set(self._tasks))
+        for nid in npc_ids:
+            self._histories.pop(nid, None)
+            self._history_tokens.pop(nid, None)
+            self._summaries.pop(nid, None)
+            self._condensed.pop(nid, None)
+            self._pending.pop(nid, None)
+            self._pending_added.pop(nid, None)
+            task = self._tasks.pop(nid, None)
+            if task:
+                task.cancel()
@@ -0,0 +1,211 @@
+import re
+import json
+import time
+import random
+import asyncio
+from typing import Any, AsyncIterator, Iterator, NamedTuple, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage
+from langchain_core.messages.tool import invalid_tool_call, tool_call, tool_call_chunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from agents.commands import TAG_RE, TOOL_COMMANDS
+
+
+# (npc name, trigger words in the player's message, items required, mission, reply)
+# The first matching rule wins; a rule whose mission is already completed is skipped.
+QUEST_SCRIPT = [
+    ("Zephyr the Wise", ("map",), (), "riddle_quest",
+     "Indeed! A map, curious and correct. The key is yours. [GIVE_ITEM:magic_key] [MISSION_COMPLETE:riddle_quest]"),
+    ("Brunhild the Strong", (), ("magic_key",), "forge_quest",
+     "Aye, the Magic Key! Right then, stand back from the fire. [GIVE_ITEM:sword_of_dawn] [MISSION_COMPLETE:forge_quest]"),
+    ("Elara the Herbalist", ("fire",), (), "herb_quest",
+     "Fire, dear one. Mother nature smiles on you. [GIVE_ITEM:healing_potion] [MISSION_COMPLETE:herb_quest]"),
+    ("Captain Aldric", (), ("sword_of_dawn", "healing_potion"), "guard_quest",
+     "You are ready, brave one! The dragon awaits. [GIVE_ITEM:village_medal] [MISSION_COMPLETE:guard_quest]"),
+    ("Ignis the Dread", (), ("sword_of_dawn", "healing_potion"), "dragon_quest",
+     "That blade... the Sword of Dawn?! NO! You... have bested me... [MISSION_COMPLETE:dragon_quest]"),
+]
+
+_NAME_RE = re.compile(r"Character name: (.+)")
+_INVENTORY_RE = re.compile(r"- Player inventory: (.*)")
+_COMPLETED_RE = re.compile(r"'(\w+)': 'completed'")
+_TOKEN_RE = re.compile(r"\S+\s*")
+_SPEAKER_RE = re.compile(r"Speaker ([AB]) is ([^.]+)\.")
+_TURNS_RE = re.compile(r"Write exactly (\d+) lines")
+_TOPIC_RE = re.compile(r"exchange about (.+?)\.$")
+
+# Ways a model writing prose gets a command tag slightly wrong.
+TAG_MANGLERS = (
+    lambda cmd, value: f"[{cmd}: {value}]",
+    lambda cmd, value: f"[{cmd.title()}:{value}]",
+    lambda cmd, value: f"{cmd}:{value}",
+    lambda cmd, value: f"[{cmd.replace('_', ' ')}:{value}]",
+    lambda cmd, value: f"[{cmd}:{value.replace('_', ' ')}]",
+)
+TAG_TOOLS = {cmd: (name, field) for name, (cmd, field) in TOOL_COMMANDS.items()}
+
+CHATTER_LINES = (
+    "A: Have you heard the talk about {topic}, {b}?",
+    "B: Aye, {a}. Nobody speaks of anything else.",
+    "A: Strange times for our little village.",
+    "B: Strange times make for good stories.",
+)
+
+
+def scripted_chatter(system: str, request: str) -> str:
+    """Deterministic NPC-to-NPC exchange in the A:/B: format the chatter prompt asks for."""
+    names = dict(_SPEAKER_RE.findall(system))
+    turns_match = _TURNS_RE.search(system)
+    turns = int(turns_match.group(1)) if turns_match else 2
+    topic_match = _TOPIC_RE.search(request)
+    topic = topic_match.group(1) if topic_match else "the weather"
+    lines = [CHATTER_LINES[i % len(CHATTER_LINES)] for i in range(turns)]
+    return "\n".join(lines).format(a=names.get("A", "friend"), b=names.get("B", "friend"), topic=topic)
+
+
+def scripted_reply(messages: list[BaseMessage]) -> str:
+    """Deterministic NPC reply that walks the quest chain from the prompt's game state."""
+    system = next((m.content for m in messages if isinstance(m, SystemMessage)), "")
+    player = str(messages[-1].content).lower() if messages else ""
+
+    if "Speaker A is" in system:
+        return scripted_chatter(system, str(messages[-1].content))
+
+    if player.startswith("(the player walks up to you"):
+        name_match = _NAME_RE.search(system)
+        return f"{name_match.group(1).strip() if name_match else 'The villager'} nods as you approach."
+
+    if player.startswith("existing notes:"):
+        # Summarization request: keep the tail of the new lines as "notes".
+        words = player.split("new lines:", 1)[-1].split()
+        return "Notes: " + " ".join(words[-40:])
+
+    name_match = _NAME_RE.search(system)
+    name = name_match.group(1).strip() if name_match else "Villager"
+    inventory_match = _INVENTORY_RE.search(system)
+    inventory = inventory_match.group(1) if inventory_match else ""
+    completed = set(_COMPLETED_RE.findall(system))
+
+    for npc_name, triggers, required, mission, reply in QUEST_SCRIPT:
+        if npc_name != name or mission in completed:
+            continue
+        if triggers and not any(t in player for t in triggers):
+            continue
+        if all(item in inventory for item in required):
+            return reply
+    return f"{name} listens. You said: {player[:60]}"
+
+
+class MockToolCall(NamedTuple):
+    name: str
+    args: str  # JSON, possibly truncated
+
+
+class MockReply(NamedTuple):
+    tokens: list[str]
+    tool_calls: list[MockToolCall]
+
+    def message(self) -> AIMessage:
+        calls, invalid = [], []
+        for i, call in enumerate(self.tool_calls):
+            try:
+                calls.append(tool_call(name=call.name, args=json.loads(call.args), id=f"call_{i}"))
+            except ValueError:
+                invalid.append(invalid_tool_call(name=call.name, args=call.args, id=f"call_{i}", error="bad JSON"))
+        return AIMessage(content="".join(self.tokens), tool_calls=calls, invalid_tool_calls=invalid)
+
+    def chunks(self) -> Iterator[AIMessageChunk]:
+        for token in self.tokens:
+            yield AIMessageChunk(content=token)
+        for i, call in enumerate(self.tool_calls):
+            # Split the arguments like a provider would, so the parser sees partial JSON.
+            half = len(call.args) // 2
+            yield AIMessageChunk(content="", tool_call_chunks=[
+                tool_call_chunk(name=call.name, args=call.args[:half], id=f"call_{i}", index=i)])
+            yield AIMessageChunk(content="", tool_call_chunks=[
+                tool_call_chunk(name=None, args=call.args[half:], id=None, index=i)])
+
+
+class MockChatModel(BaseChatModel):
+    """Offline chat model with scripted quest replies and configurable latency.
+
+    ttft_ms is the delay before the first token, tokens_per_sec paces the rest,
+    and failure_rate makes that fraction of calls raise like an upstream error.
+    With tools bound (bind_tools) commands come back as tool calls instead of
+    tags. tag_error_rate / tool_error_rate mangle that fraction of tags / tool
+    call arguments, to exercise the parse-failure paths.
+    """
+
+    ttft_ms: float = 200.0
+    tokens_per_sec: float = 50.0
+    failure_rate: float = 0.0
+    tag_error_rate: float = 0.0
+    tool_error_rate: float = 0.0
+    seed: Optional[int] = None
+    rng: Any = None
+
+    def model_post_init(self, __context: Any) -> None:
+        self.rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "mock"
+
+    def bind_tools(self, tools, *, tool_choice: Optional[str] = None, **kwargs: Any):
+        return self.bind(tools=list(tools), **kwargs)
+
+    def _reply(self, messages: list[BaseMessage], tools: Optional[list] = None) -> MockReply:
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            raise RuntimeError("Mock upstream failure")
+        text = scripted_reply(messages)
+        if not tools:
+            return MockReply(_TOKEN_RE.findall(TAG_RE.sub(self._tag, text)), [])
+
+        calls = []
+        for cmd, value in TAG_RE.findall(text):
+            name, field = TAG_TOOLS[cmd]
+            args = json.dumps({field: value})
+            if self.tool_error_rate and self.rng.random() < self.tool_error_rate:
+                args = args[:-1]
+            calls.append(MockToolCall(name, args))
+        return MockReply(_TOKEN_RE.findall(" ".join(TAG_RE.sub("", text).split())), calls)
+
+    def _tag(self, match: re.Match) -> str:
+        if self.tag_error_rate and self.rng.random() < self.tag_error_rate:
+            return self.rng.choice(TAG_MANGLERS)(match.group(1), match.group(2))
+        return match.group(0)
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        reply = self._reply(messages, kwargs.get("tools"))
+        time.sleep(self.ttft_ms / 1000 + self._token_delay() * max(len(reply.tokens) - 1, 0))
+        return ChatResult(generations=[ChatGeneration(message=reply.message())])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        reply = self._reply(messages, kwargs.get("tools"))
+        await asyncio.sleep(self.ttft_ms / 1000 + self._token_delay() * max(len(reply.tokens) - 1, 0))
+        return ChatResult(generations=[ChatGeneration(message=reply.message())])
+
+    def _stream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        reply = self._reply(messages, kwargs.get("tools"))
+        time.sleep(self.ttft_ms / 1000)
+        for i, chunk in enumerate(reply.chunks()):
+            if i and chunk.content:
+                time.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._reply(messages, kwargs.get("tools"))
+        await asyncio.sleep(self.ttft_ms / 1000)
+        for i, chunk in enumerate(reply.chunks()):
+            if i and chunk.content:
+                await asyncio.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=chunk)
@@ -1,83 +1,239 @@
-import re
-from typing import Optional
+import time
+import asyncio
+from typing import TYPE_CHECKING, Optional
 from loguru import logger
 
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage
 from config import settings
-from agents.prompts import build_system_prompt
+from agents.llm import LazyLLM
+from agents.prompts import build_system_prompt, npc_label, BUSY_LINES, DEFAULT_BUSY_LINE, OPENER_CONTINUATION
+from agents.admission import Priority, Overloaded, admission_for
+from agents.response_cache import ResponseCache, CacheKey, replay_chunks
+from agents.context import ContextBudgeter, ContextStats
 from agents.memory import ConversationMemory
+from agents.trace import TurnTrace, create_recorder
+from agents.commands import (
+    COMMAND_MODES, COMMAND_TOOLS, ToolCallStream, count_malformed, parse_response, tool_call_tags,
+)
 from game.models import ChatResponse
+from metrics import COMMAND_PARSE_FAILURES, LLM_REQUESTS, LLM_TTFT, LLM_DURATION, PROMPT_BUILD, INPUT_TOKENS, HISTORY_LENGTH, SUMMARY_SIZE
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
 
 
 class NPCAgent:
-    def __init__(self):
-        self.llm = ChatGroq(
-            api_key = settings.GROQ_API_KEY,
-            model = settings.LLM_MODEL,
-            temperature = settings.LLM_TEMPERATURE,
-            max_tokens = settings.LLM_MAX_TOKENS,
+    def __init__(self, llm: "BaseChatModel" = None):
+        # Without an explicit model the provider stack is imported on warm() or first use.
+        self.llm = llm or LazyLLM()
+        self.command_mode, self.chat_llm = self._bind_commands(settings.COMMAND_MODE)
+        self.admission = admission_for(
+            settings.LLM_PROVIDER,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            rate_per_sec=settings.LLM_RATE_PER_SEC,
+            burst=settings.LLM_RATE_BURST,
+            max_queue=settings.LLM_QUEUE_SIZE,
+            max_wait=settings.LLM_QUEUE_TIMEOUT,
+        )
+        self.budgeter = ContextBudgeter(settings.CONTEXT_TOKEN_BUDGET, settings.CONTEXT_TOKEN_BUDGETS)
+        self.cache = ResponseCache(
+            max_bytes=settings.RESPONSE_CACHE_MAX_BYTES, ttl_seconds=settings.RESPONSE_CACHE_TTL,
+        ) if settings.RESPONSE_CACHE_ENABLED else None
+        self.tracer = create_recorder(
+            settings.TRACE_ENABLED, settings.TRACE_PATH, workers=settings.WORKERS,
+            max_bytes=settings.TRACE_MAX_BYTES, backups=settings.TRACE_BACKUPS,
         )
-        self.memory = ConversationMemory(max_messages = settings.MAX_CONVERSATION_HISTORY)
-        logger.info(f"NPC Agent ready model : {settings.LLM_MODEL}")
+        logger.info(f"NPC Agent ready provider : {settings.LLM_PROVIDER} model : {settings.LLM_MODEL} "
+                    f"commands : {self.command_mode}")
+
+    def _bind_commands(self, mode: str):
+        """The model used for NPC turns: with the command tools bound in tool mode.
+        Falls back to tags when the provider cannot call tools."""
+        if mode not in COMMAND_MODES:
+            raise ValueError(f"Unknown COMMAND_MODE '{mode}' (expected one of {COMMAND_MODES})")
+        if mode == "tools":
+            try:
+                return mode, self.llm.bind_tools(COMMAND_TOOLS)
+            except NotImplementedError:
+                logger.warning(f"⚠️ {type(self.llm).__name__} has no tool calling, using command tags")
+        return "tags", self.llm
 
     async def chat(
         self, npc_id: str, player_message: str,
         inventory: list[str], missions_completed: dict[str, str],
+        memory: ConversationMemory, priority: Priority = Priority.PLAYER,
+        session_id: str = "",
     ) -> ChatResponse:
-        summary = self.memory.get_summary(npc_id)
-        system_prompt = build_system_prompt(npc_id, inventory, missions_completed, summary)
+        key = self._cache_key(npc_id, player_message, inventory, missions_completed, memory)
+        content = self.cache.get(key) if key else None
+        trace = self.tracer.begin(session_id, npc_id, player_message, "invoke") if self.tracer else None
 
-        messages = [SystemMessage(content=system_prompt)]
-        messages.extend(self.memory.get_history(npc_id))
-        messages.append(HumanMessage(content=player_message))
+        if content is None:
+            messages, _ = self.build_messages(npc_id, player_message, inventory, missions_completed, memory)
+            if trace:
+                trace.messages = messages
 
-        response = await self.llm.ainvoke(messages)
-        content = response.content
+            try:
+                async with self.admission.slot(priority):
+                    start = time.perf_counter()
+                    if trace:
+                        trace.llm_started()
+                    response = await self.chat_llm.ainvoke(messages)
+            except Overloaded:
+                LLM_REQUESTS.labels(npc_label(npc_id), "shed").inc()
+                self._end_trace(trace, "shed")
+                return ChatResponse(message=self.busy_line(npc_id), npc_id=npc_id)
+            except Exception:
+                LLM_REQUESTS.labels(npc_label(npc_id), "error").inc()
+                self._end_trace(trace, "error")
+                raise
+            LLM_DURATION.labels(npc_label(npc_id), "invoke").observe(time.perf_counter() - start)
+            LLM_REQUESTS.labels(npc_label(npc_id), "ok").inc()
+            tags, failures = tool_call_tags(response)
+            content = " ".join([response.content, *tags])
+            self._record_failures(npc_id, content, failures)
+            if key:
+                self.cache.put(key, content)
+            if trace:
+                trace.chunk(content)
+            self._end_trace(trace, "ok")
+        else:
+            LLM_REQUESTS.labels(npc_label(npc_id), "cache_hit").inc()
+            self._end_trace(trace, "cache_hit")
 
-        self.memory.add_message(npc_id, "human", player_message)
-        self.memory.add_message(npc_id, "ai", content)
+        memory.add_message(npc_id, "human", player_message)
+        memory.add_message(npc_id, "ai", content)
 
+        parsed = parse_response(content)
         return ChatResponse(
-            message=self._clean_response(content),
-            give_item=self._extract_command(content, "GIVE_ITEM"),
-            mission_complete=self._extract_command(content, "MISSION_COMPLETE"),
+            message=parsed.message,
+            give_item=parsed.give_item,
+            mission_complete=parsed.mission_complete,
             npc_id=npc_id
         )
 
     async def chat_streaming(
         self, npc_id: str, player_message: str,
         inventory: list[str], missions_completed: dict[str, str],
+        memory: ConversationMemory, priority: Priority = Priority.PLAYER,
+        opener: Optional[str] = None, session_id: str = "",
     ):
-        summary = self.memory.get_summary(npc_id)
-        system_prompt = build_system_prompt(npc_id, inventory, missions_completed, summary)
+        """Stream the NPC's reply. With `opener` (a pre-generated greeting), that line is
+        sent first with no model wait and the live call continues from it."""
+        key = None if opener else self._cache_key(npc_id, player_message, inventory, missions_completed, memory)
+        cached = self.cache.get(key) if key else None
+        trace = self.tracer.begin(session_id, npc_id, player_message, "stream") if self.tracer else None
+        if cached is not None:
+            LLM_REQUESTS.labels(npc_label(npc_id), "cache_hit").inc()
+            self._end_trace(trace, "cache_hit")
+            for piece in replay_chunks(cached):
+                yield piece
+                await asyncio.sleep(0)
+            memory.add_message(npc_id, "human", player_message)
+            memory.add_message(npc_id, "ai", cached)
+            return
 
-        messages = [SystemMessage(content=system_prompt)]
-        messages.extend(self.memory.get_history(npc_id))
-        messages.append(HumanMessage(content=player_message))
+        prefix = ""
+        prompt_message = player_message
+        if opener:
+            prefix = opener + " "
+            prompt_message += OPENER_CONTINUATION.format(opener=opener)
+            for piece in replay_chunks(prefix):
+                yield piece
+        messages, _ = self.build_messages(npc_id, prompt_message, inventory, missions_completed, memory)
+        if trace:
+            trace.messages, trace.opener = messages, opener
 
-        full_response = ""
+        parts: list[str] = []
+        tool_calls = ToolCallStream()
         try:
-            async for chunk in self.llm.astream(messages):
-                if chunk.content:
-                    full_response += chunk.content
-                    yield chunk.content
+            async with self.admission.slot(priority):
+                start = time.perf_counter()
+                if trace:
+                    trace.llm_started()
+                async for chunk in self.chat_llm.astream(messages):
+                    # Completed tool calls are spliced into the text as tags, so everything
+                    # downstream (CommandStreamParser, cache, memory) sees a single format.
+                    piece = chunk.content
+                    if chunk.tool_call_chunks:
+                        piece += tool_calls.feed(chunk.tool_call_chunks)
+                    if piece:
+                        if not parts:
+                            LLM_TTFT.labels(npc_label(npc_id)).observe(time.perf_counter() - start)
+                        parts.append(piece)
+                        if trace:
+                            trace.chunk(piece)
+                        yield piece
+                LLM_DURATION.labels(npc_label(npc_id), "stream").observe(time.perf_counter() - start)
+            LLM_REQUESTS.labels(npc_label(npc_id), "ok").inc()
+            self._end_trace(trace, "ok")
+            self._record_failures(npc_id, "".join(parts), tool_calls.close())
+            if key and parts:
+                self.cache.put(key, "".join(parts))
+        except Overloaded:
+            LLM_REQUESTS.labels(npc_label(npc_id), "shed").inc()
+            self._end_trace(trace, "shed")
+            yield self.busy_line(npc_id)
+            return
+        except (asyncio.CancelledError, GeneratorExit):
+            # Player cancelled: the upstream stream is closed by unwinding; keep what they saw.
+            LLM_REQUESTS.labels(npc_label(npc_id), "cancelled").inc()
+            self._end_trace(trace, "cancelled")
+            if prefix or parts:
+                memory.add_message(npc_id, "human", player_message)
+                memory.add_message(npc_id, "ai", prefix + "".join(parts))
+            raise
         except Exception as e:
+            LLM_REQUESTS.labels(npc_label(npc_id), "error").inc()
+            self._end_trace(trace, "error")
             logger.error(f"Streaming error: {e}")
             yield "Hmm, my mind seems clouded..."
-            full_response = "Hmm, my mind seems clouded..."
+            parts = ["Hmm, my mind seems clouded..."]
+
+        memory.add_message(npc_id, "human", player_message)
+        memory.add_message(npc_id, "ai", prefix + "".join(parts))
 
-        self.memory.add_message(npc_id, "human", player_message)
-        self.memory.add_message(npc_id, "ai", full_response)
+    def _end_trace(self, trace: Optional[TurnTrace], outcome: str) -> None:
+        if trace:
+            self.tracer.end(trace, outcome)
 
-    def reset_memory(self, npc_id: Optional[str] = None):
-        self.memory.reset(npc_id)
+    def _record_failures(self, npc_id: str, text: str, tool_failures: int = 0) -> None:
+        """Count commands the model tried to issue but we could not parse."""
+        failures = count_malformed(text) + tool_failures
+        if failures:
+            COMMAND_PARSE_FAILURES.labels(npc_label(npc_id), self.command_mode).inc(failures)
+            logger.warning(f"⚠️ {npc_id}: {failures} unparseable command(s) in reply")
+
+    def build_messages(
+        self, npc_id: str, player_message: str,
+        inventory: list[str], missions_completed: dict[str, str],
+        memory: ConversationMemory, record: bool = True,
+    ) -> tuple[list[BaseMessage], ContextStats]:
+        """System prompt + history + new turn, fitted to the NPC's input-token budget.
+        `record=False` keeps requests that are not player turns (speculative greetings)
+        out of the per-turn metrics."""
+        start = time.perf_counter()
+        summary = memory.get_summary(npc_id)
+        history = memory.get_turns(npc_id)
+        system_prompt = build_system_prompt(npc_id, inventory, missions_completed, summary, self.command_mode)
+        messages, stats = self.budgeter.fit(
+            npc_id, SystemMessage(content=system_prompt), history,
+            HumanMessage(content=player_message),
+        )
+        if not record:
+            return messages, stats
+        PROMPT_BUILD.labels(npc_label(npc_id)).observe(time.perf_counter() - start)
+        INPUT_TOKENS.labels(npc_label(npc_id)).observe(stats.input_tokens)
+        HISTORY_LENGTH.labels(npc_label(npc_id)).observe(len(history))
+        SUMMARY_SIZE.labels(npc_label(npc_id)).observe(len(summary))
+        return messages, stats
 
-    def _extract_command(self, text: str, cmd: str) -> Optional[str]:
-        match = re.search(rf'\[{cmd}:(\w+)\]', text)
-        return match.group(1) if match else None
+    def busy_line(self, npc_id: str) -> str:
+        return BUSY_LINES.get(npc_id, DEFAULT_BUSY_LINE)
 
-    def _clean_response(self, text: str) -> str:
-        text = re.sub(r'\[GIVE_ITEM:\w+\]', '', text)
-        text = re.sub(r'\[MISSION_COMPLETE:\w+\]', '', text)
-        return text.strip()
+    def _cache_key(self, npc_id: str, player_message: str, inventory: list[str],
+                   missions_completed: dict[str, str], memory: ConversationMemory) -> Optional[CacheKey]:
+        if self.cache is None:
+            return None
+        history_empty = not memory.history_length(npc_id)
+        return ResponseCache.make_key(npc_id, player_message, inventory, missions_completed, history_empty)
@@ -0,0 +1,91 @@
+import time
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from loguru import logger
+
+from agents.mock_llm import _NAME_RE, scripted_reply
+from agents.trace import read_traces
+
+
+# (NPC name, message sent) -> recorded replies as [[offset ms, text], ...]
+ReplyKey = tuple[str, str]
+
+
+def _npc_name(system: str) -> str:
+    match = _NAME_RE.search(system)
+    return match.group(1).strip() if match else ""
+
+
+class PlaybackChatModel(BaseChatModel):
+    """Replays recorded NPC turns with their recorded chunk timing (LLM_PROVIDER=playback).
+
+    A request is matched to recorded turns by NPC and the exact message that
+    was sent; several recordings of the same message are used in turn. Anything
+    that was never recorded (summaries, chatter, new dialogue) gets the scripted
+    mock reply with no delay and counts as a miss. `speed` > 1 plays faster.
+    """
+
+    trace_path: str = "traces"
+    speed: float = 1.0
+    replies: Any = None
+    hits: int = 0
+    misses: int = 0
+
+    def model_post_init(self, __context: Any) -> None:
+        self.replies: dict[ReplyKey, deque] = {}
+        turns = 0
+        for turn in read_traces(self.trace_path):
+            if turn["outcome"] != "ok" or not turn["chunks"]:
+                continue
+            key = (_npc_name(turn["system"]), turn["message"])
+            self.replies.setdefault(key, deque()).append(turn["chunks"])
+            turns += 1
+        logger.info(f"🎞️ Playback LLM loaded {turns} recorded turns ({len(self.replies)} distinct) "
+                    f"from {self.trace_path}")
+
+    @property
+    def _llm_type(self) -> str:
+        return "playback"
+
+    def bind_tools(self, tools, *, tool_choice: Optional[str] = None, **kwargs: Any):
+        # Recorded replies already carry tool calls as canonical tags.
+        return self.bind(**kwargs)
+
+    def _recorded(self, messages: list[BaseMessage]) -> list:
+        system = next((str(m.content) for m in messages if isinstance(m, SystemMessage)), "")
+        key = (_npc_name(system), str(messages[-1].content) if messages else "")
+        recordings = self.replies.get(key)
+        if not recordings:
+            self.misses += 1
+            return [[0.0, scripted_reply(messages)]]
+        self.hits += 1
+        recordings.rotate(-1)
+        return recordings[-1]
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        chunks = self._recorded(messages)
+        time.sleep(chunks[-1][0] / 1000 / self.speed)
+        text = "".join(piece for _, piece in chunks)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        chunks = self._recorded(messages)
+        await asyncio.sleep(chunks[-1][0] / 1000 / self.speed)
+        text = "".join(piece for _, piece in chunks)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        start = time.perf_counter()
+        for offset_ms, piece in self._recorded(messages):
+            delay = offset_ms / 1000 / self.speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
@@ -0,0 +1,174 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+from loguru import logger
+
+from agents.prompts import GREETING_REQUEST
+from agents.commands import TAG_RE
+from agents.tokens import count_tokens
+from agents.admission import Priority, Overloaded
+from agents.memory import ConversationMemory
+from metrics import PREWARM_EVENTS, PREWARM_TOKENS
+
+
+# (inventory, completed missions, history length): a greeting is only valid for the state it was written for.
+Fingerprint = tuple[tuple, tuple, int]
+
+
+def fingerprint(npc_id: str, inventory: list[str], missions_completed: dict[str, str],
+                memory: ConversationMemory) -> Fingerprint:
+    return tuple(inventory), tuple(sorted(missions_completed.items())), memory.history_length(npc_id)
+
+
+class Speculation:
+    __slots__ = ("fingerprint", "task", "created", "input_tokens", "output_tokens")
+
+    def __init__(self, fp: Fingerprint, input_tokens: int):
+        self.fingerprint = fp
+        self.task: Optional[asyncio.Task] = None
+        self.created = time.monotonic()
+        self.input_tokens = input_tokens
+        self.output_tokens = 0
+
+    @property
+    def tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+class Prewarmer:
+    """Speculative NPC greetings, generated when the player walks up to an NPC.
+
+    `approach` warms the session and prompt caches and starts an ambient-priority
+    LLM call for the NPC's opening line. The first real message to that NPC then
+    `take`s the line and streams it before the live call answers. Speculation is
+    bounded: at most `max_inflight` calls at once, `max_entries` buffered lines,
+    one new speculation per session every `cooldown` seconds, and lines expire
+    after `ttl`. Unused lines count as wasted tokens.
+    """
+
+    def __init__(self, agent, ttl: float = 30.0, max_inflight: int = 4,
+                 max_entries: int = 1000, cooldown: float = 5.0):
+        self.agent = agent
+        self.ttl = ttl
+        self.max_inflight = max_inflight
+        self.max_entries = max_entries
+        self.cooldown = cooldown
+        self._entries: OrderedDict[tuple[str, str], Speculation] = OrderedDict()
+        self._last_started: dict[str, float] = {}
+        self._inflight = 0
+        self.started = 0
+        self.hits = 0
+        self.used_tokens = 0
+        self.wasted_tokens = 0
+
+    def approach(self, session_id: str, npc_id: str, inventory: list[str],
+                 missions_completed: dict[str, str], memory: ConversationMemory) -> str:
+        """Start speculating for (session, npc) if the budget allows. Returns what happened."""
+        self._expire()
+        key = (session_id, npc_id)
+        fp = fingerprint(npc_id, inventory, missions_completed, memory)
+        entry = self._entries.get(key)
+        if entry and entry.fingerprint == fp:
+            return "pending" if entry.task and not entry.task.done() else "ready"
+
+        now = time.monotonic()
+        if now - self._last_started.get(session_id, -self.cooldown) < self.cooldown:
+            return self._skip("cooldown")
+        if self._inflight >= self.max_inflight:
+            return self._skip("budget")
+
+        if entry:
+            self._discard(key, "stale")
+        messages, stats = self.agent.build_messages(
+            npc_id, GREETING_REQUEST, inventory, missions_completed, memory, record=False,
+        )
+        entry = Speculation(fp, stats.input_tokens)
+        entry.task = asyncio.get_running_loop().create_task(self._generate(entry, npc_id, messages))
+        self._entries[key] = entry
+        self._last_started[session_id] = now
+        self.started += 1
+        PREWARM_EVENTS.labels("started").inc()
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)), "evicted")
+        return "started"
+
+    async def _generate(self, entry: Speculation, npc_id: str, messages) -> Optional[str]:
+        self._inflight += 1
+        try:
+            async with self.agent.admission.slot(Priority.AMBIENT):
+                response = await self.agent.llm.ainvoke(messages)
+        except Overloaded:
+            PREWARM_EVENTS.labels("shed").inc()
+            return None
+        except Exception as e:
+            PREWARM_EVENTS.labels("failed").inc()
+            logger.error(f"Prewarming {npc_id} failed: {e}")
+            return None
+        finally:
+            self._inflight -= 1
+        text = " ".join(TAG_RE.sub("", str(response.content)).split())
+        entry.output_tokens = count_tokens(text)
+        return text or None
+
+    def take(self, session_id: str, npc_id: str, inventory: list[str],
+             missions_completed: dict[str, str], memory: ConversationMemory) -> Optional[str]:
+        """The speculative opener for this turn, or None. Only a finished greeting is used:
+        one still queued at ambient priority is cancelled, so the turn never waits on it."""
+        self._expire()
+        key = (session_id, npc_id)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        if entry.fingerprint != fingerprint(npc_id, inventory, missions_completed, memory):
+            self._waste(entry, "stale")
+            return None
+
+        if not entry.task.done():
+            self._waste(entry, "unfinished")
+            return None
+        text = None if entry.task.cancelled() else entry.task.result()
+        if not text:
+            return None
+        self.hits += 1
+        self.used_tokens += entry.tokens
+        PREWARM_EVENTS.labels("hit").inc()
+        PREWARM_TOKENS.labels("used").inc(entry.tokens)
+        return text
+
+    def _skip(self, reason: str) -> str:
+        PREWARM_EVENTS.labels(reason).inc()
+        return reason
+
+    def _discard(self, key: tuple[str, str], reason: str) -> None:
+        entry = self._entries.pop(key)
+        self._waste(entry, reason)
+
+    def _waste(self, entry: Speculation, reason: str) -> None:
+        if entry.task and not entry.task.done():
+            entry.task.cancel()
+        self.wasted_tokens += entry.tokens
+        PREWARM_EVENTS.labels(reason).inc()
+        PREWARM_TOKENS.labels("wasted").inc(entry.tokens)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.created > cutoff:
+                break
+            self._discard(key, "expired")
+        stale_sessions = [s for s, t in self._last_started.items() if t < cutoff]
+        for session_id in stale_sessions:
+            del self._last_started[session_id]
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._entries),
+            "inflight": self._inflight,
+            "started": self.started,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.started, 3) if self.started else 0.0,
+            "used_tokens": self.used_tokens,
+            "wasted_tokens": self.wasted_tokens,
+        }
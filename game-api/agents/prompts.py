@@ -1,3 +1,9 @@
+from functools import lru_cache
+from types import MappingProxyType
+
+
+# Static per-NPC part of the system prompt. Everything that never changes for
+# an NPC comes first so provider-side prefix caching can reuse it across turns.
 CHARACTER_CARD_TEMPLATE = """Let's roleplay. You are {npc_name} — a character in a fantasy village.
 You are engaging with a player (adventurer) in conversation.
 Use short sentences. Keep responses under 80 words.
@@ -10,31 +16,61 @@ Talking style: {npc_style}
 
 ---
 
-CURRENT GAME STATE:
-- Player inventory: {inventory}
-- Missions completed: {missions_completed}
-
-CONVERSATION SUMMARY SO FAR:
-{summary}
-
----
-
 RULES:
 1. Never mention you are an AI or assistant.
 2. Stay in character at ALL times.
 3. Keep responses under 80 words.
-4. If giving an item, include EXACTLY: [GIVE_ITEM:item_name]
-5. If completing a mission, include EXACTLY: [MISSION_COMPLETE:mission_id]
+{command_rules}
 6. Plain text only — no markdown, no asterisks.
 
 ---
 
 {mission_instructions}
+"""
+
+# How the NPC hands out items and completes missions, per COMMAND_MODE.
+COMMAND_RULES = MappingProxyType({
+    "tags": """4. If giving an item, include EXACTLY: [GIVE_ITEM:item_name]
+5. If completing a mission, include EXACTLY: [MISSION_COMPLETE:mission_id]""",
+    "tools": """4. To give an item, call the give_item tool. Below, [GIVE_ITEM:x] means: call give_item with item x.
+5. To complete a mission, call the complete_mission tool. Below, [MISSION_COMPLETE:x] means: call complete_mission with mission_id x. Never write these tags in your reply.""",
+})
+
+# Per-turn part, appended after the static prefix.
+GAME_STATE_TEMPLATE = """
+---
+
+CURRENT GAME STATE:
+- Player inventory: {inventory}
+- Missions completed: {missions_completed}
+
+CONVERSATION SUMMARY SO FAR:
+{summary}
 
 The conversation starts now.
 """
 
-NPC_CONFIGS = {
+FALLBACK_PROMPT = "You are a friendly villager. Chat casually."
+
+# Speculative opening line, generated while the player is still walking up.
+GREETING_REQUEST = (
+    "(The player walks up to you. Greet them in one or two short sentences, in character, "
+    "reacting to what they carry and have done. Do not ask riddles or give items yet.)"
+)
+# Appended to the real first message when the reply starts with that pre-generated line.
+OPENER_CONTINUATION = '\n\n(You already began your reply with: "{opener}" Continue from there without repeating it.)'
+
+# In-character lines used when a turn is shed because the LLM is overloaded.
+BUSY_LINES = MappingProxyType({
+    "wizard": "Curious... the stars are crowded tonight. Ask me again in a moment, traveler.",
+    "blacksmith": "Listen here, the forge is roaring. Give me a moment!",
+    "herbalist": "Patience, dear one. Let the wind settle, then ask me again.",
+    "guard": "Hold, soldier! The gate is busy. Report back shortly.",
+    "dragon": "SILENCE, mortal! Ignis will deal with you in a moment...",
+})
+DEFAULT_BUSY_LINE = "Hmm, give me a moment to gather my thoughts..."
+
+_NPC_CONFIGS = {
     "wizard": {
         "name": "Zephyr the Wise",
         "perspective": (
@@ -161,23 +197,69 @@ BEHAVIOR:
     }
 }
 
-def build_system_prompt(
-    npc_id: str,
-    inventory: list[str],
-    missions_completed: dict[str, str],
-    summary: str = ""
-) -> str:
-    """Build full system prompt for an NPC with current game state."""
-    config = NPC_CONFIGS.get(npc_id)
-    if not config:
-        return "You are a friendly villager. Chat casually."
 
+def _build_prefix(config: dict, command_mode: str = "tags") -> str:
     return CHARACTER_CARD_TEMPLATE.format(
+        command_rules=COMMAND_RULES[command_mode],
         npc_name=config["name"],
         npc_perspective=config["perspective"],
         npc_style=config["style"],
-        inventory=inventory,
-        missions_completed=missions_completed,
-        summary=summary if summary else "No previous conversation.",
         mission_instructions=config["mission_instructions"]
-    )
\ No newline at end of file
+    )
+
+
+# Registries are built once at import and read-only afterwards; prompt prefixes
+# are never re-formatted per turn.
+NPC_CONFIGS = MappingProxyType({npc_id: MappingProxyType(config) for npc_id, config in _NPC_CONFIGS.items()})
+NPC_NAMES = MappingProxyType({npc_id: config["name"] for npc_id, config in NPC_CONFIGS.items()})
+PROMPT_PREFIXES = MappingProxyType({npc_id: _build_prefix(config) for npc_id, config in NPC_CONFIGS.items()})
+TOOL_PROMPT_PREFIXES = MappingProxyType({
+    npc_id: _build_prefix(config, "tools") for npc_id, config in NPC_CONFIGS.items()
+})
+_PREFIXES = MappingProxyType({"tags": PROMPT_PREFIXES, "tools": TOOL_PROMPT_PREFIXES})
+
+
+class UnknownNPC(LookupError):
+    """No NPC with this id."""
+
+
+def check_npc(npc_id: str) -> None:
+    if npc_id not in NPC_CONFIGS:
+        raise UnknownNPC(f"Unknown NPC '{npc_id}'")
+
+
+def npc_label(npc_id: str) -> str:
+    """Metric label for an NPC: ids are client-supplied, so unknown ones share one label."""
+    return npc_id if npc_id in NPC_CONFIGS else "unknown"
+
+
+@lru_cache(maxsize=1024)
+def _cached_prompt(npc_id: str, inventory: tuple, missions: tuple, summary: str,
+                   command_mode: str = "tags") -> str:
+    prefix = _PREFIXES[command_mode].get(npc_id)
+    if prefix is None:
+        return FALLBACK_PROMPT
+    return prefix + GAME_STATE_TEMPLATE.format(
+        inventory=list(inventory),
+        missions_completed=dict(missions),
+        summary=summary,
+    )
+
+
+def build_system_prompt(
+    npc_id: str,
+    inventory: list[str],
+    missions_completed: dict[str, str],
+    summary: str = "",
+    command_mode: str = "tags",
+) -> str:
+    """Build full system prompt for an NPC with current game state.
+
+    The static prefix comes from PROMPT_PREFIXES (TOOL_PROMPT_PREFIXES in tool
+    mode); only the game-state suffix varies, and whole prompts are memoized on
+    (npc_id, inventory, missions, summary, mode).
+    """
+    return _cached_prompt(
+        npc_id, tuple(inventory), tuple(missions_completed.items()),
+        summary if summary else "No previous conversation.", command_mode,
+    )
@@ -0,0 +1,95 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+from loguru import logger
+
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+_CHUNK_RE = re.compile(r"\S+\s*")
+
+CacheKey = tuple[str, str, frozenset, frozenset, bool]
+
+
+def normalize_message(text: str) -> str:
+    """Case, punctuation and whitespace-insensitive form of a player message."""
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", text.lower())).strip()
+
+
+def replay_chunks(content: str) -> list[str]:
+    """Split a cached reply into word-sized pieces to replay it as a stream."""
+    return _CHUNK_RE.findall(content) or [content]
+
+
+class ResponseCache:
+    """LRU + TTL cache of raw NPC replies, bounded by total bytes.
+
+    Keys are (npc_id, normalized message, inventory set, completed missions,
+    empty-history flag). Replies are stored with their command tags intact, so
+    the normal parsing and MissionManager.process_npc_actions still run on a hit.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, ttl_seconds: float = 600.0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[CacheKey, tuple[str, float, int]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(npc_id: str, player_message: str, inventory: list[str],
+                 missions_completed: dict[str, str], history_empty: bool) -> CacheKey:
+        completed = frozenset(m for m, status in missions_completed.items() if status == "completed")
+        return (npc_id, normalize_message(player_message), frozenset(inventory), completed, history_empty)
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        content, expires, _ = entry
+        if expires < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return content
+
+    def put(self, key: CacheKey, content: str) -> None:
+        size = len(content.encode("utf-8")) + len(key[0]) + len(key[1])
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (content, time.monotonic() + self.ttl_seconds, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            old_key = next(iter(self._entries))
+            self._remove(old_key)
+            self.evictions += 1
+
+    def _remove(self, key: CacheKey) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        logger.info("🗑️ Response cache cleared")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "upstream_calls_saved": self.hits,
+            "evictions": self.evictions,
+        }
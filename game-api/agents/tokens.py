@@ -0,0 +1,16 @@
+import re
+
+
+# An estimate, not the model's tokenizer: words are split into pieces of up to
+# 6 characters and punctuation counts on its own. Against the Llama 3 tokenizer
+# (benchmarks/bench_tokens.py) it overcounts this game's prompts, replies and
+# chatter by about 10% in total. A single message is off by -11% to +70%, and by
+# -3% to +17% once it is 50+ tokens long. Erring high keeps requests inside
+# their budget, and no tokenizer has to be shipped.
+_TOKEN_RE = re.compile(r"\w{1,6}|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Estimated model tokens in `text`. Stored turns keep their count (`Turn.tokens`),
+    so each message is counted once, when it enters memory."""
+    return len(_TOKEN_RE.findall(text))
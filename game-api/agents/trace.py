@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import queue
+import hashlib
+import threading
+from pathlib import Path
+from typing import Iterator, Optional
+from loguru import logger
+
+from langchain_core.messages import BaseMessage, SystemMessage
+
+from agents.commands import parse_response
+
+
+class TurnTrace:
+    """One NPC turn as it happens: the messages sent and every chunk with its
+    offset (ms) from the moment the LLM call started."""
+
+    __slots__ = ("ts", "session_id", "npc_id", "player_message", "mode", "messages", "opener", "t0", "chunks")
+
+    def __init__(self, session_id: str, npc_id: str, player_message: str, mode: str):
+        self.ts = time.time()
+        self.session_id = session_id
+        self.npc_id = npc_id
+        self.player_message = player_message
+        self.mode = mode
+        self.messages: list[BaseMessage] = []
+        self.opener: Optional[str] = None
+        self.t0 = time.perf_counter()
+        self.chunks: list[tuple[float, str]] = []
+
+    def llm_started(self) -> None:
+        self.t0 = time.perf_counter()
+
+    def chunk(self, text: str) -> None:
+        self.chunks.append((round((time.perf_counter() - self.t0) * 1000, 1), text))
+
+
+def prompt_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+class TraceRecorder:
+    """Opt-in, append-only JSONL record of NPC turns (TRACE_ENABLED).
+
+    Each line is either a `prompt` record (a system prompt, written once per
+    file) or a `turn` record that references it by hash, with the history and
+    message that were sent, chunk timings, the parsed actions and the outcome.
+    Records are serialized and written by a background thread; the file rotates
+    at `max_bytes`, keeping `backups` old files (path.1 is the newest). If the
+    writer falls behind by `max_pending` turns, new turns are dropped rather
+    than slowing the game down.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5,
+                 max_pending: int = 10000):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.recorded = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._prompts: set[str] = set()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"🎞️ Recording NPC traces to {self.path}")
+
+    def begin(self, session_id: str, npc_id: str, player_message: str, mode: str) -> TurnTrace:
+        return TurnTrace(session_id, npc_id, player_message, mode)
+
+    def end(self, trace: TurnTrace, outcome: str) -> None:
+        try:
+            self._queue.put_nowait((trace, outcome))
+            self.recorded += 1
+        except queue.Full:
+            self.dropped += 1
+
+    # --- writer thread ----------------------------------------------------
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._file.close()
+                return
+            if isinstance(item, threading.Event):
+                self._file.flush()
+                item.set()
+                continue
+            try:
+                self._write(*item)
+            except Exception as e:
+                logger.error(f"Writing trace failed: {e}")
+
+    def _write(self, trace: TurnTrace, outcome: str) -> None:
+        system, history, message = "", [], ""
+        if trace.messages:
+            first, *rest = trace.messages
+            if isinstance(first, SystemMessage):
+                system = str(first.content)
+            else:
+                rest = trace.messages
+            history = [[m.type, m.content] for m in rest[:-1]]
+            message = rest[-1].content if rest else ""
+        digest = prompt_hash(system) if system else None
+        text = "".join(chunk for _, chunk in trace.chunks)
+        parsed = parse_response(text)
+        turn = {
+            "type": "turn", "ts": round(trace.ts, 3), "session": trace.session_id, "npc": trace.npc_id,
+            "mode": trace.mode, "outcome": outcome, "prompt": digest, "player": trace.player_message,
+            "message": message, "history": history, "opener": trace.opener, "chunks": trace.chunks,
+            "actions": {"give_item": parsed.give_item, "mission_complete": parsed.mission_complete},
+        }
+        data = json.dumps(turn, ensure_ascii=False, separators=(",", ":")) + "\n"
+        prompt = json.dumps({"type": "prompt", "hash": digest, "text": system}, ensure_ascii=False,
+                            separators=(",", ":")) + "\n" \
+            if digest else ""
+
+        if digest and digest not in self._prompts:
+            data = prompt + data
+        if 0 < self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+            self._rotate()
+            if not data.startswith(prompt):
+                data = prompt + data  # each file carries the prompts its turns reference
+        self._file.write(data)
+        if digest:
+            self._prompts.add(digest)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{i}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._prompts.clear()
+
+    def flush(self) -> None:
+        """Block until every turn queued so far is written."""
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def stats(self) -> dict:
+        return {"path": str(self.path), "recorded": self.recorded, "dropped": self.dropped,
+                "pending": self._queue.qsize()}
+
+
+def create_recorder(enabled: bool, path: str, workers: int = 1, **kwargs) -> Optional[TraceRecorder]:
+    if not enabled:
+        return None
+    if workers > 1:
+        # One file per worker process: rotation is not safe across processes.
+        p = Path(path)
+        path = str(p.with_name(f"{p.stem}.{os.getpid()}{p.suffix}"))
+    return TraceRecorder(path, **kwargs)
+
+
+def trace_files(path: str) -> list[Path]:
+    """Trace files under `path` (a file, whose rotated backups are included, or a directory), oldest first."""
+    p = Path(path)
+    if p.is_dir():
+        files = [f for f in p.iterdir() if ".jsonl" in f.name]
+    else:
+        files = [f for f in p.parent.glob(f"{p.name}*") if f.name == p.name or f.name[len(p.name) + 1:].isdigit()]
+    # Same mtime (coarse clocks): a higher rotation number is older.
+    return sorted(files, key=lambda f: (f.stat().st_mtime, -int(f.suffix[1:]) if f.suffix[1:].isdigit() else 0))
+
+
+def read_traces(path: str) -> Iterator[dict]:
+    """Turn records from every trace file, each with its system prompt restored under "system"."""
+    prompts: dict[str, str] = {}
+    for file in trace_files(path):
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                if record.get("type") == "prompt":
+                    prompts[record["hash"]] = record["text"]
+                elif record.get("type") == "turn":
+                    record["system"] = prompts.get(record.get("prompt"), "")
+                    yield record
@@ -0,0 +1,111 @@
+"""
+Command tags in prose vs structured tool calls: parse failures and the turns
+it takes to finish the quest.
+
+Runs in-process on the mock backend. Every simulated player streams the
+quest chain through NPCAgent.chat_streaming, CommandStreamParser and
+MissionManager, the same path /chat/stream and the WebSocket use. When an
+NPC's command is lost, its mission does not register and the player has to
+ask again, which is one more LLM turn. When only the item is lost, the mission
+is done but a later NPC never gets the item it needs, and the player is stuck
+(counted as not finished).
+
+Both modes run at each of --error-rates, the chance that one command is
+corrupted. In tag mode the mock garbles a tag it writes in prose, the way
+real models drift: "[GIVE_ITEM: magic key]", "Give_Item:...". In tool mode it
+truncates the tool call's JSON arguments. Either way the command is lost, so
+at the same rate the modes differ only in how they recover. How often a real
+model corrupts each format is a property of the model, not of this code, so
+the sweep does not assume one.
+
+    cd game-api
+    python -m benchmarks.bench_commands --players 200 --error-rates 0 0.05 0.15 0.3
+"""
+import asyncio
+import argparse
+import statistics
+
+from agents.commands import CommandStreamParser
+from agents.memory import ConversationMemory
+from agents.mock_llm import MockChatModel
+from agents.npc_agent import NPCAgent
+from benchmarks.load_test import QUEST_CHAIN
+from config import settings
+from game.missions import MissionManager
+from metrics import COMMAND_PARSE_FAILURES
+
+
+# Give up on a quest step after this many tries; the player counts as stuck.
+MAX_TRIES = 10
+# The last message to each NPC is the one that should complete its mission.
+QUEST_STEPS = {npc_id: i for i, (npc_id, _) in enumerate(QUEST_CHAIN)}
+
+
+async def play(agent: NPCAgent) -> tuple[int, bool]:
+    """One player through the chain. Returns (turns taken, finished the quest)."""
+    manager, memory = MissionManager(), ConversationMemory(max_messages=settings.MAX_CONVERSATION_HISTORY)
+    state = manager.player_state
+    turns = 0
+    for step, (npc_id, message) in enumerate(QUEST_CHAIN):
+        tries = MAX_TRIES if QUEST_STEPS[npc_id] == step else 1
+        mission = next(m.id for m in manager.quests.missions.values() if m.npc == npc_id)
+        for _ in range(tries):
+            turns += 1
+            parser = CommandStreamParser()
+            missions = {k: v.value for k, v in state.missions.items()}
+            async for chunk in agent.chat_streaming(npc_id, message, state.inventory, missions, memory):
+                for event in parser.feed(chunk):
+                    if event.kind == "give_item":
+                        manager.process_npc_actions(event.value, None, npc_id=npc_id)
+                    elif event.kind == "mission_complete":
+                        manager.process_npc_actions(None, event.value, npc_id=npc_id)
+            parser.close()
+            if state.is_mission_completed(mission):
+                break
+    return turns, manager.is_game_complete()
+
+
+def failures(mode: str) -> int:
+    return int(sum(COMMAND_PARSE_FAILURES.labels(npc_id, mode).value for npc_id in QUEST_STEPS))
+
+
+async def run(mode: str, players: int, tag_error_rate: float, tool_error_rate: float, seed: int) -> dict:
+    settings.COMMAND_MODE = mode
+    llm = MockChatModel(ttft_ms=0, tokens_per_sec=0, seed=seed,
+                        tag_error_rate=tag_error_rate, tool_error_rate=tool_error_rate)
+    agent = NPCAgent(llm)
+    before = failures(mode)
+    results = [await play(agent) for _ in range(players)]
+    turns = [t for t, done in results if done]
+    return {
+        "mode": mode,
+        "failures": failures(mode) - before,
+        "finished": len(turns),
+        "mean_turns": statistics.mean(turns) if turns else float("nan"),
+        "p95_turns": statistics.quantiles(turns, n=20)[-1] if len(turns) > 1 else float("nan"),
+        "max_turns": max(turns, default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--error-rates", type=float, nargs="+", default=[0.0, 0.05, 0.15, 0.3],
+                        help="chance a command is corrupted, applied to both modes")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from loguru import logger
+    logger.remove()
+
+    print(f"{args.players} players per run, ideal {len(QUEST_CHAIN)} turns")
+    print("error  mode    parse failures  finished  mean turns  p95 turns  max turns")
+    for rate in args.error_rates:
+        for mode in ("tags", "tools"):
+            r = asyncio.run(run(mode, args.players, rate, rate, args.seed))
+            print(f"{rate:>5.0%}  {r['mode']:<6}  {r['failures']:>14}  {r['finished']:>4}/{args.players:<4} "
+                  f"{r['mean_turns']:>10.2f}  {r['p95_turns']:>9.1f}  {r['max_turns']:>9}")
+
+
+if __name__ == "__main__":
+    main()
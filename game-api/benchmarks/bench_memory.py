@@ -0,0 +1,115 @@
+"""
+Bytes per stored conversation turn: LangChain message lists (the previous
+representation) vs ConversationMemory's slotted Turn records in deques.
+
+Message text is allocated up front and shared by both layouts, so the
+numbers are pure per-turn overhead; the text itself costs the same either way.
+Sizes come from a tracemalloc run. Build times come from separate untraced
+runs (best of --repeat), because tracing slows allocation and skews the
+comparison. The Turn build includes counting each message's tokens once, in
+add_message, which the old layout left to every request.
+
+    cd game-api
+    python -m benchmarks.bench_memory --sessions 500
+"""
+import gc
+import sys
+import time
+import argparse
+import tracemalloc
+
+from langchain_core.messages import HumanMessage, AIMessage
+
+from agents.memory import ConversationMemory
+
+NPCS = ("wizard", "blacksmith", "herbalist", "guard", "dragon")
+
+
+def make_texts(sessions: int, turns: int) -> list[str]:
+    return [f"Line {i}: the adventurer and the villager talk about the dragon and the key."
+            for i in range(sessions * len(NPCS) * turns)]
+
+
+def legacy_histories(texts: list[str], sessions: int, turns: int) -> list:
+    out, it = [], iter(texts)
+    for _ in range(sessions):
+        histories = {}
+        for npc in NPCS:
+            histories[npc] = [
+                HumanMessage(content=next(it)) if i % 2 == 0 else AIMessage(content=next(it))
+                for i in range(turns)
+            ]
+        out.append(histories)
+    return out
+
+
+def compact_histories(texts: list[str], sessions: int, turns: int) -> list:
+    out, it = [], iter(texts)
+    for _ in range(sessions):
+        memory = ConversationMemory(max_messages=turns)
+        for npc in NPCS:
+            for i in range(turns):
+                memory.add_message(npc, "human" if i % 2 == 0 else "ai", next(it))
+        out.append(memory)
+    return out
+
+
+def measure(build, texts: list[str], sessions: int, turns: int) -> tuple[float, object]:
+    gc.collect()
+    tracemalloc.start()
+    result = build(texts, sessions, turns)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def build_time(build, texts: list[str], sessions: int, turns: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = build(texts, sessions, turns)
+        best = min(best, time.perf_counter() - start)
+        del result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=20, help="stored messages per NPC")
+    parser.add_argument("--repeat", type=int, default=3, help="untraced builds to time, best kept")
+    args = parser.parse_args()
+
+    from loguru import logger
+    logger.remove()  # keep trim logs out of the measurement
+
+    texts = make_texts(args.sessions, args.turns)
+    n = len(texts)
+    text_bytes = sum(sys.getsizeof(t) for t in texts)
+
+    legacy_size, legacy = measure(legacy_histories, texts, args.sessions, args.turns)
+    del legacy
+    compact_size, compact = measure(compact_histories, texts, args.sessions, args.turns)
+    legacy_time = build_time(legacy_histories, texts, args.sessions, args.turns, args.repeat)
+    compact_time = build_time(compact_histories, texts, args.sessions, args.turns, args.repeat)
+
+    # Lazy conversion cost, paid once per request instead of once per stored turn.
+    memory = compact[0]
+    start = time.perf_counter()
+    for _ in range(1000):
+        memory.get_history("wizard")
+    convert_us = (time.perf_counter() - start) / 1000 * 1e6
+
+    print(f"{args.sessions} sessions × {len(NPCS)} NPCs × {args.turns} messages = {n} turns "
+          f"(text: {text_bytes / n:.0f} B/turn, shared)")
+    print(f"  LangChain messages   {legacy_size / n:8.0f} B/turn   {legacy_size / 2**20:7.1f} MiB   "
+          f"built in {legacy_time * 1000:.0f} ms ({legacy_time / n * 1e6:.1f} µs/turn)")
+    print(f"  Turn records/deque   {compact_size / n:8.0f} B/turn   {compact_size / 2**20:7.1f} MiB   "
+          f"built in {compact_time * 1000:.0f} ms ({compact_time / n * 1e6:.1f} µs/turn, token count included)")
+    print(f"  → {legacy_size / compact_size:.1f}x smaller, {compact_time / legacy_time:.2f}x the build time; "
+          f"get_history() of {args.turns} turns: {convert_us:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Prompt assembly benchmark: legacy single-template formatting vs. the
+static-prefix + memoized game-state suffix in agents/prompts.py.
+
+Reports formatting cost per turn and prompt tokens per turn, split into the
+part shared with the previous turn (reusable by provider prefix caching) and
+the part that has to be processed fresh.
+
+    cd game-api && python -m benchmarks.bench_prompts
+"""
+import os
+import re
+import time
+
+from agents.prompts import NPC_CONFIGS, build_system_prompt, _cached_prompt
+
+
+LEGACY_TEMPLATE = """Let's roleplay. You are {npc_name} — a character in a fantasy village.
+You are engaging with a player (adventurer) in conversation.
+Use short sentences. Keep responses under 80 words.
+
+---
+
+Character name: {npc_name}
+Character role: {npc_perspective}
+Talking style: {npc_style}
+
+---
+
+CURRENT GAME STATE:
+- Player inventory: {inventory}
+- Missions completed: {missions_completed}
+
+CONVERSATION SUMMARY SO FAR:
+{summary}
+
+---
+
+RULES:
+1. Never mention you are an AI or assistant.
+2. Stay in character at ALL times.
+3. Keep responses under 80 words.
+4. If giving an item, include EXACTLY: [GIVE_ITEM:item_name]
+5. If completing a mission, include EXACTLY: [MISSION_COMPLETE:mission_id]
+6. Plain text only — no markdown, no asterisks.
+
+---
+
+{mission_instructions}
+
+The conversation starts now.
+"""
+
+
+def legacy_build_system_prompt(npc_id, inventory, missions_completed, summary=""):
+    config = NPC_CONFIGS[npc_id]
+    return LEGACY_TEMPLATE.format(
+        npc_name=config["name"], npc_perspective=config["perspective"], npc_style=config["style"],
+        inventory=inventory, missions_completed=missions_completed,
+        summary=summary if summary else "No previous conversation.",
+        mission_instructions=config["mission_instructions"],
+    )
+
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def approx_tokens(text: str) -> int:
+    """Word/punctuation count — a stable stand-in for a BPE tokenizer."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def common_prefix_len(a: str, b: str) -> int:
+    return len(os.path.commonprefix([a, b]))
+
+
+def simulated_turns() -> list[tuple]:
+    """A player walking the quest chain: several turns per NPC, state changing between them."""
+    missions = {m: "not_started" for m in ("riddle_quest", "forge_quest", "herb_quest", "guard_quest", "dragon_quest")}
+    inventory: list[str] = []
+    turns = []
+    chain = [
+        ("wizard", "magic_key", "riddle_quest"), ("blacksmith", "sword_of_dawn", "forge_quest"),
+        ("herbalist", "healing_potion", "herb_quest"), ("guard", "village_medal", "guard_quest"),
+        ("dragon", None, "dragon_quest"),
+    ]
+    for npc_id, item, mission in chain:
+        summary = ""
+        for turn in range(4):
+            turns.append((npc_id, list(inventory), dict(missions), summary))
+            summary += f"\nPlayer: line {turn}\nNPC: reply {turn}"
+        if item:
+            inventory.append(item)
+        missions[mission] = "completed"
+    return turns
+
+
+def bench(fn, turns, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for args in turns:
+            fn(*args)
+    return (time.perf_counter() - start) / (repeat * len(turns))
+
+
+def token_report(fn, turns) -> tuple[float, float]:
+    """Average prompt tokens per turn, and average tokens not shared with the previous same-NPC turn."""
+    total = fresh = 0
+    previous: dict[str, str] = {}
+    for args in turns:
+        prompt = fn(*args)
+        shared = common_prefix_len(previous.get(args[0], ""), prompt)
+        total += approx_tokens(prompt)
+        fresh += approx_tokens(prompt[shared:])
+        previous[args[0]] = prompt
+    return total / len(turns), fresh / len(turns)
+
+
+def main(repeat: int = 2000):
+    turns = simulated_turns()
+
+    legacy_us = bench(legacy_build_system_prompt, turns, repeat) * 1e6
+
+    def uncached(*args):
+        _cached_prompt.cache_clear()
+        return build_system_prompt(*args)
+    split_us = bench(uncached, turns, repeat) * 1e6 - bench(lambda *a: _cached_prompt.cache_clear(), turns, repeat) * 1e6
+
+    build_system_prompt(*turns[0])
+    memo_us = bench(build_system_prompt, turns, repeat) * 1e6
+
+    legacy_total, legacy_fresh = token_report(legacy_build_system_prompt, turns)
+    new_total, new_fresh = token_report(build_system_prompt, turns)
+
+    print(f"Turns simulated: {len(turns)}  (x{repeat} repeats)\n")
+    print(f"{'':28}{'format µs/turn':>16}{'tokens/turn':>14}{'uncached tokens/turn':>22}")
+    print(f"{'legacy single template':28}{legacy_us:>16.2f}{legacy_total:>14.0f}{legacy_fresh:>22.0f}")
+    print(f"{'static prefix + suffix':28}{split_us:>16.2f}{new_total:>14.0f}{new_fresh:>22.0f}")
+    print(f"{'  + memo cache hit':28}{memo_us:>16.2f}{new_total:>14.0f}{new_fresh:>22.0f}")
+    print(f"\nUncached prompt tokens per turn: {legacy_fresh:.0f} -> {new_fresh:.0f} "
+          f"({100 * (1 - new_fresh / legacy_fresh):.0f}% fewer)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Start-up cost: what `import main` imports, and how long a fresh worker takes
+to answer /health and its first /chat.
+
+Part 1 runs `python -X importtime -c "import main"` in a clean interpreter
+and totals the self time per top-level package, then lists the slowest
+modules (cumulative). Part 2 starts uvicorn for each LLM_WARMUP mode and
+times, from process start, the first 200 from /health (the worker accepts
+traffic) and the first /chat reply (the LLM client is built and used). Each
+is the median of --runs fresh processes.
+
+Runs on the mock backend, with no network or API key. The mock still builds
+on langchain_core's chat model, so its import cost is close to a real
+provider's; --provider groq measures ChatGroq itself (needs GROQ_API_KEY for
+the /chat column).
+
+    cd game-api
+    python -m benchmarks.bench_startup --runs 5
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+import httpx
+
+
+GAME_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(env: dict) -> tuple[dict[str, int], list[tuple[int, str]], int]:
+    """Self time per top-level package, (cumulative, module) pairs, and the total (µs)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                          env=env, cwd=GAME_API, capture_output=True, text=True, check=True)
+    packages: dict[str, int] = defaultdict(int)
+    modules, total = [], 0
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative, indent, module = int(match[1]), int(match[2]), match[3], match[4]
+        packages[module.split(".")[0]] += self_us
+        modules.append((cumulative, module))
+        if len(indent) == 1:  # imported directly by `import main`
+            total += cumulative
+    return packages, modules, total
+
+
+def time_to_first_request(env: dict, port: int) -> tuple[float, float]:
+    """Seconds from process start to the first /health 200 and the first /chat reply."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                             "--log-level", "warning"], env=env, cwd=GAME_API,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + 60
+        while True:
+            if time.perf_counter() > deadline or proc.poll() is not None:
+                raise RuntimeError("Server did not come up")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.01)
+        health = time.perf_counter() - start
+        try:
+            httpx.post(f"http://127.0.0.1:{port}/chat", timeout=60,
+                       json={"npc_id": "wizard", "message": "Hello", "session_id": "startup"}).raise_for_status()
+            chat = time.perf_counter() - start
+        except httpx.HTTPError:
+            chat = float("nan")
+        return health, chat
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", default="mock", help="LLM_PROVIDER for both parts")
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per warm-up mode")
+    parser.add_argument("--top", type=int, default=12, help="packages and modules to list")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    env = {**os.environ, "LLM_PROVIDER": args.provider, "STORAGE_BACKEND": "memory",
+           "AMBIENT_CHATTER_ENABLED": "false", "PREWARM_ENABLED": "false", "TRACE_ENABLED": "false",
+           "PROXIMITY_GATE": "off",
+           "MOCK_TTFT_MS": "0", "MOCK_TOKENS_PER_SEC": "0"}
+
+    packages, modules, total = import_profile(env)
+    print(f"import main: {total / 1000:.0f} ms ({len(modules)} modules)")
+    print("  self time by package")
+    for package, us in sorted(packages.items(), key=lambda p: -p[1])[:args.top]:
+        print(f"    {package:<24} {us / 1000:>8.1f} ms")
+    print("  slowest modules (cumulative)")
+    for cumulative, module in sorted(modules, reverse=True)[:args.top]:
+        print(f"    {module:<48} {cumulative / 1000:>8.1f} ms")
+
+    print(f"\ntime to first request, {args.provider}, median of {args.runs}")
+    print("LLM_WARMUP   /health    first /chat")
+    for mode in ("startup", "background", "lazy"):
+        runs = [time_to_first_request({**env, "LLM_WARMUP": mode}, args.port) for _ in range(args.runs)]
+        health = statistics.median(h for h, _ in runs)
+        chat = statistics.median(c for _, c in runs)
+        print(f"{mode:<11} {health:>7.2f} s  {chat:>9.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Bytes spent keeping the client's inventory and missions up to date, over one
+full quest chain on a WebSocket v2 session (mock LLM).
+
+- full: the socket does not subscribe. Every action and done frame carries
+  the inventory, and the client polls /game-state after each turn for the
+  missions.
+- deltas: the socket subscribes once. Action and done frames carry no
+  inventory, and each change arrives as a delta frame.
+
+Counts the state-bearing bytes only, so the LLM text, which is the same in
+both modes, is left out. That means the inventory fields plus the poll
+bodies, against the state and delta frames. Then it reconnects the way a
+client does after a dropped socket, from a few versions back and from an
+unknown epoch, and compares the resync frames.
+
+    cd game-api
+    python -m benchmarks.bench_state_sync
+"""
+import json
+import uuid
+import asyncio
+import argparse
+
+import httpx
+import websockets
+
+from benchmarks.load_test import QUEST_CHAIN, spawn_server
+
+
+def _size(value) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+async def play(base_url: str, subscribe: bool) -> dict:
+    session_id = f"sync-{uuid.uuid4().hex[:8]}"
+    ws_url = base_url.replace("http", "ws", 1)
+    state_bytes, frames, last = 0, 0, None
+    async with httpx.AsyncClient() as client, \
+            websockets.connect(f"{ws_url}/ws/chat?session_id={session_id}&protocol=v2") as ws:
+        if subscribe:
+            await ws.send(json.dumps({"type": "subscribe"}))
+        for i, (npc_id, message) in enumerate(QUEST_CHAIN):
+            await ws.send(json.dumps({"type": "chat", "id": str(i), "npc_id": npc_id, "message": message}))
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame["type"] in ("state", "delta"):
+                    state_bytes += _size(frame)
+                    frames += 1
+                    last = frame
+                elif frame["type"] in ("action", "done") and "inventory" in frame:
+                    state_bytes += _size({"inventory": frame["inventory"]})
+                if frame.get("id") == str(i) and frame["type"] in ("done", "error"):
+                    break
+            if not subscribe:
+                resp = await client.get(f"{base_url}/game-state", params={"session_id": session_id})
+                state_bytes += len(resp.content)
+                frames += 1
+        # A few late delta frames may still be in flight.
+        while subscribe:
+            try:
+                frame = json.loads(await asyncio.wait_for(ws.recv(), 0.2))
+            except asyncio.TimeoutError:
+                break
+            if frame["type"] == "delta":
+                state_bytes += _size(frame)
+                frames += 1
+                last = frame
+
+    result = {"state_bytes": state_bytes, "frames": frames}
+    if subscribe and last:
+        async with websockets.connect(f"{ws_url}/ws/chat?session_id={session_id}&protocol=v2") as ws:
+            for name, since in (("resync_3_behind", {"epoch": last["epoch"], "v": last["v"] - 3}),
+                                ("resync_unknown", {"epoch": "0" * 8, "v": 0})):
+                await ws.send(json.dumps({"type": "subscribe", **since}))
+                while (frame := json.loads(await ws.recv()))["type"] not in ("state", "delta"):
+                    pass
+                result[name] = (frame["type"], _size(frame))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="running server (default: spawn a mock-LLM one)")
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    proc = None
+    if not args.base_url:
+        proc = spawn_server(args.port, {"MOCK_TTFT_MS": "0", "MOCK_TOKENS_PER_SEC": "0",
+                                        "AMBIENT_CHATTER_ENABLED": "false", "WORLD_ENABLED": "false"})
+        args.base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        full = asyncio.run(play(args.base_url, subscribe=False))
+        deltas = asyncio.run(play(args.base_url, subscribe=True))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    turns = len(QUEST_CHAIN)
+    print(f"state traffic over the {turns}-turn quest chain")
+    print(f"  full     {full['state_bytes']:>6} B  ({full['state_bytes'] / turns:.0f} B/turn, "
+          f"{full['frames']} polls)")
+    print(f"  deltas   {deltas['state_bytes']:>6} B  ({deltas['state_bytes'] / turns:.0f} B/turn, "
+          f"{deltas['frames']} frames, no polls)  "
+          f"{1 - deltas['state_bytes'] / full['state_bytes']:.0%} less")
+    for name in ("resync_3_behind", "resync_unknown"):
+        kind, size = deltas[name]
+        print(f"  {name:<16} {kind:<6} {size:>5} B")
+
+
+if __name__ == "__main__":
+    main()
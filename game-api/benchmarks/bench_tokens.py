@@ -0,0 +1,73 @@
+"""
+How far `count_tokens` (a regex estimate) is from a real tokenizer, on this
+game's own text: every NPC system prompt, the mock replies, chatter lines,
+quest-chain messages and the client's canned lines.
+
+Needs `tiktoken` and a tiktoken-format BPE file. For Llama 3, the default
+Groq model family, that is the `tokenizer.model` that ships in the
+`llama-models` wheel (llama_models/llama3/tokenizer.model). tiktoken is in
+requirements-bench.txt, not the server's requirements.
+
+    cd game-api
+    pip install -r requirements-bench.txt
+    python -m benchmarks.bench_tokens --tokenizer path/to/llama3/tokenizer.model
+"""
+import re
+import ast
+import argparse
+import statistics
+from pathlib import Path
+
+from agents.tokens import count_tokens
+from agents.prompts import NPC_CONFIGS, build_system_prompt
+
+# Llama 3's pre-tokenizer split.
+LLAMA3_PATTERN = (r"(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n]*"
+                  r"|\s*[\r\n]+|\s+(?!\S)|\s+")
+SOURCES = ["agents/mock_llm.py", "agents/ambient.py", "agents/prompts.py", "agents/npc_agent.py",
+           "benchmarks/load_test.py", "game/npc_registry.py"]
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def corpus() -> list[str]:
+    texts = [build_system_prompt(npc_id, ["magic_key"], {"riddle_quest": "completed"},
+                                 "The player asked about the riddle.", mode)
+             for npc_id in NPC_CONFIGS for mode in ("tags", "tools")]
+    for source in SOURCES:
+        for node in ast.walk(ast.parse((ROOT / source).read_text(encoding="utf-8"))):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and len(node.value.split()) >= 4:
+                texts.append(node.value)
+    for js in (ROOT.parent / "game-ui" / "src").rglob("*.js"):
+        texts += [line for line in re.findall(r"'([^'\n]{25,})'", js.read_text(encoding="utf-8")) if " " in line]
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokenizer", required=True, help="tiktoken-format BPE ranks file")
+    parser.add_argument("--pattern", default=LLAMA3_PATTERN, help="the tokenizer's pre-tokenizer regex")
+    args = parser.parse_args()
+
+    try:
+        import tiktoken
+        from tiktoken.load import load_tiktoken_bpe
+    except ImportError:
+        parser.error("needs tiktoken: pip install -r requirements-bench.txt")
+    encoding = tiktoken.Encoding("reference", pat_str=args.pattern,
+                                 mergeable_ranks=load_tiktoken_bpe(args.tokenizer), special_tokens={})
+
+    texts = corpus()
+    real = [len(encoding.encode(text)) for text in texts]
+    estimate = [count_tokens(text) for text in texts]
+    errors = [(e - r) / r for e, r in zip(estimate, real)]
+    long = [err for err, r in zip(errors, real) if r >= 50]
+
+    print(f"{len(texts)} texts, {sum(real)} real tokens, {sum(estimate)} estimated")
+    print(f"  total        {sum(estimate) / sum(real) - 1:+.1%}")
+    print(f"  mean |error| {statistics.fmean(abs(err) for err in errors):.1%}")
+    print(f"  per text     {min(errors):+.0%} .. {max(errors):+.0%}")
+    print(f"  50+ tokens   {min(long):+.0%} .. {max(long):+.0%}  ({len(long)} texts)")
+
+
+if __name__ == "__main__":
+    main()
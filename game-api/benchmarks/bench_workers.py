@@ -0,0 +1,100 @@
+"""
+Throughput scaling from 1 to N worker processes (serve.py) with the mock LLM.
+
+Each run starts a fresh server over a shared SQLite file and plays the quest
+chain with N simulated players. The mock has no latency by default, so the
+server itself is the bottleneck and turns/s should grow with the worker count
+(up to the number of cores). The "hop" mode opens a new WebSocket for every
+turn, so players bounce between workers; every player finishing the quest
+shows that state stays consistent across workers.
+
+    cd game-api
+    python -m benchmarks.bench_workers --workers 1 2 4 --players 200
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+
+import websockets
+
+from benchmarks.load_test import QUEST_CHAIN, Results, run, report, spawn_server
+
+
+async def hop_player(ws_url: str, results: Results) -> None:
+    """Reconnect before every turn; the kernel spreads new connections across workers."""
+    session_id = f"hop-{uuid.uuid4().hex[:12]}"
+    game_complete = False
+    for npc_id, message in QUEST_CHAIN:
+        start = time.perf_counter()
+        try:
+            async with websockets.connect(f"{ws_url}/ws/chat?session_id={session_id}") as ws:
+                await ws.send(json.dumps({"npc_id": npc_id, "message": message}))
+                while True:
+                    data = json.loads(await ws.recv())
+                    if "error" in data:
+                        raise RuntimeError(data["error"])
+                    if "response" in data:
+                        game_complete = data["game_actions"].get("game_complete", False)
+                        break
+        except Exception:
+            results.errors += 1
+            continue
+        results.latencies.append(time.perf_counter() - start)
+    if game_complete:
+        results.completed_players += 1
+
+
+async def run_hops(ws_url: str, players: int) -> tuple[Results, float]:
+    results = Results()
+    start = time.perf_counter()
+    await asyncio.gather(*(hop_player(ws_url, results) for _ in range(players)))
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--modes", nargs="+", default=["http", "ws", "hop"], choices=("http", "sse", "ws", "hop"))
+    parser.add_argument("--ttft-ms", type=float, default=0.0, help="mock LLM delay before the first token")
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU cores available")
+    rows = []
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            proc = spawn_server(args.port, {
+                "STORAGE_BACKEND": "sqlite", "SQLITE_PATH": os.path.join(tmp, "bench.db"),
+                "MOCK_TTFT_MS": str(args.ttft_ms), "MOCK_TOKENS_PER_SEC": "0",
+                "AMBIENT_CHATTER_ENABLED": "false",
+            }, workers=workers)
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                for mode in args.modes:
+                    if mode == "hop":
+                        results, elapsed = asyncio.run(run_hops(base_url.replace("http", "ws", 1), args.players))
+                    else:
+                        results, elapsed = asyncio.run(run(mode, base_url, args.players, ramp=0.0))
+                    print(f"\n--- {workers} worker(s) ---", end="")
+                    rows.append((workers, report(mode, args.players, results, elapsed)))
+            finally:
+                proc.terminate()
+                proc.wait()
+
+    print("\nworkers  mode   turns/s  speedup  p95 ms  finished  errors")
+    baseline = {}
+    for workers, summary in rows:
+        mode = summary["mode"]
+        baseline.setdefault(mode, summary["turns_per_s"] or 1.0)
+        speedup = summary["turns_per_s"] / baseline[mode]
+        print(f"{workers:>7}  {mode:<5} {summary['turns_per_s']:>8} {speedup:>7.2f}x {summary['p95_ms']:>7} "
+              f"{summary['completed_players']:>5}/{args.players:<3} {summary['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
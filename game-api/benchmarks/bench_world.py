@@ -0,0 +1,123 @@
+"""
+World simulation cost: one tick, and the neighbour queries the server makes,
+against entity count.
+
+The village map is repeated side by side (--density entities per village
+copy) so crowding stays realistic as the count grows: every entity is a
+roaming NPC with the village colliders around it. For each size the report
+gives the mean and p99 tick time (think + move + spatial hash rebuild), the
+share of a 1/--hz tick budget it uses, and the cost of one `near` query
+through the spatial hash against the same query as a brute-force distance
+scan, at the snapshot view radius and at talking reach.
+
+    cd game-api
+    python -m benchmarks.bench_world --sizes 100 1000 5000 10000
+"""
+import json
+import math
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+import numpy as np
+
+from config import settings
+from game.world import World
+
+
+def tiled_world(copies: int, header: dict, cell_size: float, seed: int) -> World:
+    """`copies` village maps in a near-square grid, as one world."""
+    side_x = math.ceil(math.sqrt(copies))
+    side_y = math.ceil(copies / side_x)
+    w, h, tile = header["mapWidth"], header["mapHeight"], header["tileSize"]
+    colliders = [[x + cx * w, y + cy * h, rw, rh]
+                 for cy in range(side_y) for cx in range(side_x) for x, y, rw, rh in header["colliders"]]
+    return World(side_x * w * tile, side_y * h * tile, colliders, tile_size=tile, cell_size=cell_size,
+                 on_meet=lambda a, b: None, seed=seed)
+
+
+def populate(world: World, count: int, rng: np.random.Generator) -> None:
+    """`count` NPCs on free cells, a fifth of them chatty."""
+    placed = 0
+    while placed < count:
+        x, y = rng.uniform(0, world.width), rng.uniform(0, world.height)
+        if not world.blocked(x, y):
+            world.add_npc(f"npc-{placed}", x, y, speed=30.0, chatty=placed % 5 == 0)
+            placed += 1
+
+
+def query_cost(world: World, points: np.ndarray, radius: float) -> tuple[float, float, float]:
+    """µs per hashed and per brute-force query, and the mean number of entities found."""
+    start = time.perf_counter()
+    hashed = [world.near(world.x[i], world.y[i], radius) for i in points]
+    hashed_us = (time.perf_counter() - start) / len(points) * 1e6
+    start = time.perf_counter()
+    brute = []
+    for i in points:
+        dx, dy = world.x[:world.n] - world.x[i], world.y[:world.n] - world.y[i]
+        brute.append(np.flatnonzero(dx * dx + dy * dy <= radius * radius))
+    brute_us = (time.perf_counter() - start) / len(points) * 1e6
+    assert all(set(a.tolist()) == set(b.tolist()) for a, b in zip(hashed, brute)), "hash query missed entities"
+    return hashed_us, brute_us, statistics.fmean(len(a) for a in hashed)
+
+
+def bench_size(count: int, header: dict, args) -> dict:
+    rng = np.random.default_rng(args.seed)
+    world = tiled_world(max(1, math.ceil(count / args.density)), header, args.cell_size, args.seed)
+    populate(world, count, rng)
+    dt = 1.0 / args.hz
+    for _ in range(args.warmup):
+        world.tick(dt)
+    ticks = []
+    for _ in range(args.ticks):
+        start = time.perf_counter()
+        world.tick(dt)
+        ticks.append(time.perf_counter() - start)
+
+    points = rng.integers(0, world.n, args.queries)
+    view = query_cost(world, points, settings.WORLD_VIEW_RADIUS)
+    reach = query_cost(world, points, settings.INTERACTION_DISTANCE + settings.PROXIMITY_SLACK)
+
+    mean = statistics.fmean(ticks)
+    return {
+        "entities": count, "map_px": [int(world.width), int(world.height)], "grid": [world.hash.cols, world.hash.rows],
+        "tick_ms": mean * 1000, "tick_p99_ms": sorted(ticks)[int(len(ticks) * 0.99) - 1] * 1000,
+        "budget": mean / dt, "view_us": view[:2], "reach_us": reach[:2], "in_view": view[2], "meets": world.meets,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 10000])
+    parser.add_argument("--map", default=settings.WORLD_MAP_PATH, help="compiled map header")
+    parser.add_argument("--density", type=int, default=50, help="entities per copy of the map")
+    parser.add_argument("--cell-size", type=float, default=settings.WORLD_CELL_SIZE)
+    parser.add_argument("--hz", type=float, default=settings.WORLD_TICK_HZ)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=500, help="near() calls per size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="also print a JSON summary line")
+    args = parser.parse_args()
+
+    header = json.loads(Path(args.map).read_text(encoding="utf-8"))
+    reach = settings.INTERACTION_DISTANCE + settings.PROXIMITY_SLACK
+    print(f"{args.hz:g} Hz ticks, cell {args.cell_size:g} px; queries in µs, hash / scan, "
+          f"view {settings.WORLD_VIEW_RADIUS:g} px and reach {reach:g} px")
+    print(f"{'entities':>8} {'map px':>13} {'tick ms':>8} {'p99 ms':>8} {'budget':>7} "
+          f"{'view':>13} {'reach':>13} {'in view':>8}")
+    rows = []
+    for count in args.sizes:
+        row = bench_size(count, header, args)
+        rows.append(row)
+        print(f"{count:>8} {row['map_px'][0]:>6}x{row['map_px'][1]:<6} {row['tick_ms']:>8.3f} "
+              f"{row['tick_p99_ms']:>8.3f} {row['budget']:>7.1%} "
+              f"{row['view_us'][0]:>6.1f}/{row['view_us'][1]:<6.1f} {row['reach_us'][0]:>6.1f}/{row['reach_us'][1]:<6.1f} "
+              f"{row['in_view']:>8.1f}")
+    if args.json:
+        print(json.dumps(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Load generator: N concurrent simulated players run the full quest chain
+against /chat (HTTP), /chat/stream (SSE) and/or /ws/chat (WebSocket).
+
+Start the server with the mock provider so only server overhead is measured:
+
+    cd game-api
+    LLM_PROVIDER=mock MOCK_TTFT_MS=50 MOCK_TOKENS_PER_SEC=200 PROXIMITY_GATE=off uvicorn main:app --port 8000
+    python -m benchmarks.load_test --players 200 --mode both
+
+or let the script start (and stop) that server itself with --spawn. Simulated
+players never walk up to the NPCs, so the proximity gate must be off.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+import subprocess
+from dataclasses import dataclass, field
+
+import httpx
+import websockets
+
+
+QUEST_CHAIN = [
+    ("wizard", "Greetings, wise one. Do you have a quest for me?"),
+    ("wizard", "Is the answer a map?"),
+    ("blacksmith", "I have the Magic Key. Can you forge the sword?"),
+    ("herbalist", "The answer to your riddle is fire."),
+    ("guard", "I have the sword and the potion. Am I ready?"),
+    ("dragon", "I challenge you, Ignis!"),
+]
+
+
+@dataclass
+class Results:
+    latencies: list[float] = field(default_factory=list)
+    first_chunk: list[float] = field(default_factory=list)
+    errors: int = 0
+    completed_players: int = 0
+
+
+def percentile(values: list[float], pct: int) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+async def http_player(client: httpx.AsyncClient, base_url: str, results: Results) -> None:
+    session_id = f"load-{uuid.uuid4().hex[:12]}"
+    game_complete = False
+    for npc_id, message in QUEST_CHAIN:
+        start = time.perf_counter()
+        try:
+            resp = await client.post(f"{base_url}/chat", json={
+                "npc_id": npc_id, "message": message, "session_id": session_id,
+            })
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception:
+            results.errors += 1
+            continue
+        results.latencies.append(time.perf_counter() - start)
+        game_complete = data.get("game_actions", {}).get("game_complete", False)
+    if game_complete:
+        results.completed_players += 1
+
+
+async def sse_player(client: httpx.AsyncClient, base_url: str, results: Results) -> None:
+    session_id = f"load-{uuid.uuid4().hex[:12]}"
+    game_complete = False
+    for npc_id, message in QUEST_CHAIN:
+        start = time.perf_counter()
+        first = None
+        event = None
+        try:
+            async with client.stream("POST", f"{base_url}/chat/stream", json={
+                "npc_id": npc_id, "message": message, "session_id": session_id,
+            }) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[7:]
+                        if event == "chunk" and first is None:
+                            first = time.perf_counter() - start
+                    elif line.startswith("data: ") and event == "done":
+                        game_complete = json.loads(line[6:])["game_actions"].get("game_complete", False)
+        except Exception:
+            results.errors += 1
+            continue
+        if event != "done":
+            results.errors += 1
+            continue
+        results.latencies.append(time.perf_counter() - start)
+        if first is not None:
+            results.first_chunk.append(first)
+    if game_complete:
+        results.completed_players += 1
+
+
+async def ws_player(ws_url: str, results: Results) -> None:
+    session_id = f"load-{uuid.uuid4().hex[:12]}"
+    game_complete = False
+    try:
+        async with websockets.connect(f"{ws_url}/ws/chat?session_id={session_id}", max_size=None) as ws:
+            for npc_id, message in QUEST_CHAIN:
+                start = time.perf_counter()
+                first = None
+                await ws.send(json.dumps({"npc_id": npc_id, "message": message}))
+                while True:
+                    data = json.loads(await ws.recv())
+                    if "error" in data:
+                        results.errors += 1
+                        break
+                    if "chunk" in data and first is None:
+                        first = time.perf_counter() - start
+                    if "response" in data:
+                        results.latencies.append(time.perf_counter() - start)
+                        if first is not None:
+                            results.first_chunk.append(first)
+                        game_complete = data["game_actions"].get("game_complete", False)
+                        break
+    except Exception:
+        results.errors += 1
+    if game_complete:
+        results.completed_players += 1
+
+
+async def run(mode: str, base_url: str, players: int, ramp: float) -> tuple[Results, float]:
+    results = Results()
+    ws_url = base_url.replace("http", "ws", 1)
+    limits = httpx.Limits(max_connections=players, max_keepalive_connections=players)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        async def one(i: int):
+            await asyncio.sleep(ramp * i / max(players, 1))
+            if mode == "http":
+                await http_player(client, base_url, results)
+            elif mode == "sse":
+                await sse_player(client, base_url, results)
+            else:
+                await ws_player(ws_url, results)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(players)))
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def report(mode: str, players: int, results: Results, elapsed: float) -> dict:
+    lat = [x * 1000 for x in results.latencies]
+    ttfc = [x * 1000 for x in results.first_chunk]
+    summary = {
+        "mode": mode, "players": players, "turns": len(lat), "errors": results.errors,
+        "completed_players": results.completed_players, "elapsed_s": round(elapsed, 2),
+        "turns_per_s": round(len(lat) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(lat, 50), 1), "p95_ms": round(percentile(lat, 95), 1),
+        "p99_ms": round(percentile(lat, 99), 1),
+    }
+    if ttfc:
+        summary.update({
+            "ttfc_p50_ms": round(percentile(ttfc, 50), 1), "ttfc_p95_ms": round(percentile(ttfc, 95), 1),
+            "ttfc_p99_ms": round(percentile(ttfc, 99), 1),
+        })
+    print(f"\n[{mode.upper()}] {players} players, {summary['turns']} turns in {summary['elapsed_s']}s "
+          f"→ {summary['turns_per_s']} turns/s, {results.completed_players}/{players} finished the quest, "
+          f"{results.errors} errors")
+    print(f"  latency   p50 {summary['p50_ms']:>8} ms   p95 {summary['p95_ms']:>8} ms   p99 {summary['p99_ms']:>8} ms")
+    if ttfc:
+        print(f"  1st chunk p50 {summary['ttfc_p50_ms']:>8} ms   p95 {summary['ttfc_p95_ms']:>8} ms   "
+              f"p99 {summary['ttfc_p99_ms']:>8} ms")
+    return summary
+
+
+def spawn_server(port: int, extra_env: dict, workers: int = 1) -> subprocess.Popen:
+    env = {**os.environ, "LLM_PROVIDER": "mock", "PROXIMITY_GATE": "off", **extra_env}
+    cmd = [sys.executable, "serve.py", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("Server did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--mode", choices=("http", "sse", "ws", "both"), default="both")
+    parser.add_argument("--ramp", type=float, default=1.0, help="seconds over which players join")
+    parser.add_argument("--spawn", action="store_true", help="start a mock-LLM server for the run")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for --spawn")
+    parser.add_argument("--json", action="store_true", help="also print a JSON summary line")
+    args = parser.parse_args()
+
+    proc = None
+    if args.spawn:
+        proc = spawn_server(args.port, {"MOCK_TTFT_MS": "50", "MOCK_TOKENS_PER_SEC": "200"}, workers=args.workers)
+        args.base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        modes = ("http", "ws") if args.mode == "both" else (args.mode,)
+        summaries = []
+        for mode in modes:
+            results, elapsed = asyncio.run(run(mode, args.base_url, args.players, args.ramp))
+            summaries.append(report(mode, args.players, results, elapsed))
+        if args.json:
+            print(json.dumps(summaries))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Replay recorded NPC traffic (TRACE_ENABLED=true) against a server whose LLM
+plays the recorded replies back with their recorded chunk timing. No network
+or API key is needed. Use it to benchmark server changes against real traffic.
+
+Every recorded session is re-driven turn by turn, in its original order:
+streamed turns over the WebSocket and /chat turns over HTTP (or all over one
+transport with --mode). The tool reports end-to-end latency and first-chunk
+time next to the recorded LLM time, so the difference is what the server adds.
+It also lists turns whose item or mission differs from the recording, which
+points at quest regressions.
+
+    cd game-api
+    TRACE_ENABLED=true uvicorn main:app          # play for a while, then
+    python -m benchmarks.replay traces --spawn
+    python -m benchmarks.replay traces --spawn --realtime 10   # original pacing, 10x faster
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+
+import httpx
+import websockets
+
+from agents.trace import read_traces
+from benchmarks.load_test import Results, percentile, report, spawn_server
+
+
+def load_sessions(path: str, limit: int = 0) -> list[list[dict]]:
+    """Recorded player turns grouped by session, each in its original order."""
+    sessions: dict[str, list[dict]] = defaultdict(list)
+    for turn in read_traces(path):
+        if turn["session"]:
+            sessions[turn["session"]].append(turn)
+    ordered = sorted(sessions.values(), key=lambda turns: turns[0]["ts"])
+    for turns in ordered:
+        turns.sort(key=lambda t: t["ts"])
+    return ordered[:limit] if limit else ordered
+
+
+class Replay:
+    def __init__(self, base_url: str, mode: str, realtime: float):
+        self.base_url = base_url
+        self.ws_url = base_url.replace("http", "ws", 1)
+        self.mode = mode
+        self.realtime = realtime
+        self.results = Results()
+        self.mismatches: list[tuple[str, str, dict, dict]] = []
+
+    def _check(self, turn: dict, give_item, mission_complete) -> None:
+        got = {"give_item": give_item, "mission_complete": mission_complete}
+        if turn["outcome"] == "ok" and got != turn["actions"]:
+            self.mismatches.append((turn["session"], turn["npc"], turn["actions"], got))
+
+    async def _pace(self, turns: list[dict], i: int) -> None:
+        if self.realtime and i:
+            await asyncio.sleep((turns[i]["ts"] - turns[i - 1]["ts"]) / self.realtime)
+
+    async def http_turn(self, client: httpx.AsyncClient, session_id: str, turn: dict) -> None:
+        start = time.perf_counter()
+        resp = await client.post(f"{self.base_url}/chat", json={
+            "npc_id": turn["npc"], "message": turn["player"], "session_id": session_id,
+        })
+        resp.raise_for_status()
+        data = resp.json()
+        self.results.latencies.append(time.perf_counter() - start)
+        self._check(turn, data.get("give_item"), data.get("mission_complete"))
+
+    async def ws_turn(self, ws, turn: dict) -> None:
+        start = time.perf_counter()
+        first = None
+        await ws.send(json.dumps({"npc_id": turn["npc"], "message": turn["player"]}))
+        while True:
+            data = json.loads(await ws.recv())
+            if "error" in data:
+                raise RuntimeError(data["error"])
+            if "chunk" in data and first is None:
+                first = time.perf_counter() - start
+            if "response" in data:
+                break
+        self.results.latencies.append(time.perf_counter() - start)
+        if first is not None:
+            self.results.first_chunk.append(first)
+        self._check(turn, data.get("give_item"), data.get("mission_complete"))
+
+    async def session(self, client: httpx.AsyncClient, n: int, turns: list[dict], t0: float) -> None:
+        if self.realtime:
+            await asyncio.sleep((turns[0]["ts"] - t0) / self.realtime)
+        session_id = f"replay-{n}-{turns[0]['session']}"[:64]
+        ws = None
+        try:
+            for i, turn in enumerate(turns):
+                await self._pace(turns, i)
+                streamed = turn["mode"] == "stream" if self.mode == "recorded" else self.mode == "ws"
+                try:
+                    if streamed:
+                        if ws is None:
+                            ws = await websockets.connect(
+                                f"{self.ws_url}/ws/chat?session_id={session_id}", max_size=None)
+                        await self.ws_turn(ws, turn)
+                    else:
+                        await self.http_turn(client, session_id, turn)
+                except Exception:
+                    self.results.errors += 1
+        finally:
+            if ws is not None:
+                await ws.close()
+        self.results.completed_players += 1
+
+    async def run(self, sessions: list[list[dict]]) -> float:
+        t0 = min((turns[0]["ts"] for turns in sessions), default=0.0)
+        limits = httpx.Limits(max_connections=len(sessions) or 1)
+        async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(self.session(client, n, turns, t0) for n, turns in enumerate(sessions)))
+            return time.perf_counter() - start
+
+
+def recorded_times(sessions: list[list[dict]]) -> tuple[list[float], list[float]]:
+    """Recorded LLM total and first-chunk times (ms) of the turns that reached the model."""
+    total, first = [], []
+    for turns in sessions:
+        for turn in turns:
+            if turn["outcome"] == "ok" and turn["chunks"]:
+                total.append(turn["chunks"][-1][0])
+                if turn["mode"] == "stream":
+                    first.append(turn["chunks"][0][0])
+    return total, first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="?", default="traces", help="trace file or directory")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000",
+                        help="server started with LLM_PROVIDER=playback TRACE_REPLAY_PATH=<traces>")
+    parser.add_argument("--spawn", action="store_true", help="start a playback server for the run")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for --spawn")
+    parser.add_argument("--mode", choices=("recorded", "ws", "http"), default="recorded")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback LLM speed-up (chunk timing / speed)")
+    parser.add_argument("--realtime", type=float, default=0.0,
+                        help="keep the recorded gaps between turns, divided by this factor (0: back to back)")
+    parser.add_argument("--sessions", type=int, default=0, help="replay only the first N sessions")
+    args = parser.parse_args()
+
+    sessions = load_sessions(args.traces, args.sessions)
+    if not sessions:
+        parser.error(f"no recorded turns under {args.traces}")
+    turns = sum(len(t) for t in sessions)
+    print(f"Replaying {len(sessions)} sessions, {turns} turns from {args.traces}")
+
+    proc = None
+    if args.spawn:
+        proc = spawn_server(args.port, {
+            "LLM_PROVIDER": "playback", "TRACE_REPLAY_PATH": os.path.abspath(args.traces),
+            "TRACE_PLAYBACK_SPEED": str(args.speed), "TRACE_ENABLED": "false",
+            "AMBIENT_CHATTER_ENABLED": "false", "PREWARM_ENABLED": "false",
+        }, workers=args.workers)
+        args.base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        replay = Replay(args.base_url, args.mode, args.realtime)
+        elapsed = asyncio.run(replay.run(sessions))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    report(f"replay/{args.mode}", len(sessions), replay.results, elapsed)
+    total, first = recorded_times(sessions)
+    if total:
+        print(f"  recorded  p50 {percentile(total, 50) / args.speed:>8.1f} ms   "
+              f"p95 {percentile(total, 95) / args.speed:>8.1f} ms   (LLM only, at --speed {args.speed})")
+    if first:
+        print(f"  rec 1st   p50 {percentile(first, 50) / args.speed:>8.1f} ms   "
+              f"p95 {percentile(first, 95) / args.speed:>8.1f} ms")
+    print(f"  {len(replay.mismatches)} turns granted different items/missions than recorded")
+    for session, npc, expected, got in replay.mismatches[:10]:
+        print(f"    {session} {npc}: recorded {expected}, replayed {got}")
+
+
+if __name__ == "__main__":
+    main()
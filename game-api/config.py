@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -7,15 +8,87 @@ class Settings(BaseSettings):
         env_file_encoding = "utf-8"
     )
 
-    GROQ_API_KEY: str
+    LLM_PROVIDER: str = "groq"
+    LLM_WARMUP: str = "background"
+    GROQ_API_KEY: Optional[str] = None
     LLM_MODEL: str = "llama-3.3-70b-versatile"
     LLM_TEMPERATURE: float = 0.7
     LLM_MAX_TOKENS: int = 200
+    CONTEXT_TOKEN_BUDGET: int = 3000
+    CONTEXT_TOKEN_BUDGETS: dict[str, int] = {}
+    COMMAND_MODE: str = "tags"
+
+    MOCK_TTFT_MS: float = 200.0
+    MOCK_TOKENS_PER_SEC: float = 50.0
+    MOCK_FAILURE_RATE: float = 0.0
+    MOCK_SEED: Optional[int] = None
+    MOCK_TAG_ERROR_RATE: float = 0.0
+    MOCK_TOOL_ERROR_RATE: float = 0.0
+
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_RATE_PER_SEC: float = 0.0
+    LLM_RATE_BURST: int = 20
+    LLM_QUEUE_SIZE: int = 100
+    LLM_QUEUE_TIMEOUT: float = 10.0
+
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    RESPONSE_CACHE_TTL: float = 600.0
+
+    PREWARM_ENABLED: bool = False
+    PREWARM_TTL: float = 30.0
+    PREWARM_MAX_INFLIGHT: int = 4
+    PREWARM_MAX_ENTRIES: int = 1000
+    PREWARM_COOLDOWN: float = 5.0
+
+    TRACE_ENABLED: bool = False
+    TRACE_PATH: str = "traces/npc_trace.jsonl"
+    TRACE_MAX_BYTES: int = 10 * 1024 * 1024
+    TRACE_BACKUPS: int = 5
+    TRACE_REPLAY_PATH: str = "traces"
+    TRACE_PLAYBACK_SPEED: float = 1.0
+
+    AMBIENT_CHATTER_ENABLED: bool = False
+    AMBIENT_POOL_SIZE: int = 3
+    AMBIENT_TURNS: int = 4
+    AMBIENT_REFILL_INTERVAL: float = 30.0
     
     API_HOST:str = "0.0.0.0"
     API_PORT:int = 8000
+    WORKERS:int = 1
+
+    WS_MAX_STREAMS:int = 4
+    WS_HEARTBEAT_INTERVAL:float = 20.0
+    WS_IDLE_TIMEOUT:float = 300.0
     
     MAX_CONVERSATION_HISTORY:int = 20
+    HISTORY_TOKEN_BUDGET:int = 800
+    SUMMARY_STRATEGY:str = "truncate"
+    SUMMARY_MAX_WORDS:int = 80
     INTERACTION_DISTANCE:float = 55.0
 
+    WORLD_ENABLED:bool = True
+    WORLD_MAP_PATH:str = "../game-ui/public/assets/tilemaps/village/map.json"
+    WORLD_TICK_HZ:float = 20.0
+    WORLD_CELL_SIZE:float = 128.0
+    WORLD_SNAPSHOT_HZ:float = 10.0
+    WORLD_VIEW_RADIUS:float = 600.0
+    WORLD_PLAYER_TTL:float = 600.0
+    WORLD_MEET_DISTANCE:float = 100.0
+    WORLD_MEET_COOLDOWN:float = 12.0
+    WORLD_TALK_HOLD:float = 10.0
+    PLAYER_SPEED:float = 120.0
+    PROXIMITY_GATE:str = "log"
+    PROXIMITY_SLACK:float = 40.0
+
+    SESSION_TTL_SECONDS:float = 1800.0
+    MAX_SESSIONS:int = 10000
+    SESSION_SWEEP_INTERVAL:float = 60.0
+    STATE_DELTA_HISTORY:int = 64
+
+    STORAGE_BACKEND:str = "none"
+    SQLITE_PATH:str = "game_state.db"
+    STORAGE_FLUSH_INTERVAL:float = 0.5
+    STORAGE_BATCH_SIZE:int = 256
+
 settings = Settings()
\ No newline at end of file
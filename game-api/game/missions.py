@@ -1,21 +1,50 @@
-from typing import Optional
+import secrets
+from collections import deque
+from typing import Callable, Optional
 from loguru import logger
 from game.models import PlayerState, MissionStatus
+from game.storage import GameStore
+from game.quests import QUESTS, QuestGraph
+from metrics import NPC_ACTIONS
 
 
-ALL_MISSIONS = {
-    "riddle_quest": MissionStatus.NOT_STARTED,
-    "forge_quest": MissionStatus.NOT_STARTED,
-    "herb_quest": MissionStatus.NOT_STARTED,
-    "guard_quest": MissionStatus.NOT_STARTED,
-    "dragon_quest": MissionStatus.NOT_STARTED,
-}
+# Every mission in quests.json, not started.
+ALL_MISSIONS = {mission_id: MissionStatus.NOT_STARTED for mission_id in QUESTS.missions}
+
+# on_delta(epoch, delta) is called for every recorded change.
+DeltaListener = Callable[[str, dict], None]
 
 
 class MissionManager:
-    def __init__(self):
-        self.player_state = PlayerState(
-            missions=dict(ALL_MISSIONS)
+    """One player's progress. PlayerState is what gets stored; the item and
+    mission bitmasks mirror it for O(1) checks against the quest graph.
+
+    Every change is also recorded as a compact, numbered delta
+    ({"v": 3, "op": "item", "id": "magic_key"}; ops item, mission, complete
+    and reset). The last `history` deltas are kept, so a client that knows
+    (epoch, v) can catch up with `deltas_since`. The epoch is new whenever
+    the manager is rebuilt (restart, reload from the store), because version
+    numbers restart with it.
+    """
+
+    def __init__(self, state: Optional[PlayerState] = None,
+                 store: Optional[GameStore] = None, session_id: str = "", quests: QuestGraph = QUESTS,
+                 history: int = 64, on_delta: Optional[DeltaListener] = None):
+        self.quests = quests
+        self.player_state = state or PlayerState(missions=dict(ALL_MISSIONS))
+        self.player_state.missions = {**ALL_MISSIONS, **self.player_state.missions}
+        self.store = store
+        self.session_id = session_id
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        self._deltas: deque[dict] = deque(maxlen=history)
+        self.on_delta = on_delta
+        self._sync_masks()
+
+    def _sync_masks(self) -> None:
+        self._items = self.quests.items_mask(self.player_state.inventory)
+        self._missions = self.quests.missions_mask(
+            m for m, status in self.player_state.missions.items() if status == MissionStatus.COMPLETED
         )
 
     def get_inventory(self) -> list[str]:
@@ -24,27 +53,95 @@ class MissionManager:
     def get_missions(self) -> dict[str, MissionStatus]:
         return self.player_state.missions
 
-    def process_npc_actions(self, give_item: Optional[str], mission_complete: Optional[str]) -> dict:
-        result = {"items_received": [], "missions_completed": [], "game_complete": False}
+    def process_npc_actions(self, give_item: Optional[str], mission_complete: Optional[str],
+                            npc_id: Optional[str] = None) -> dict:
+        """Apply command tags emitted by `npc_id`'s reply. Grants the quest graph does not
+        allow yet (wrong NPC, missing prerequisites, unknown ids) are rejected."""
+        result = {"items_received": [], "missions_completed": [], "rejected": [], "game_complete": False}
 
-        if give_item and not self.player_state.has_item(give_item):
-            self.player_state.add_item(give_item)
-            result["items_received"].append(give_item)
-            logger.info(f"📦 Player got: {give_item}")
+        if give_item and self.player_state.has_item(give_item):
+            NPC_ACTIONS.labels("item_duplicate").inc()
+        elif give_item:
+            verdict = self.quests.check_item(give_item, npc_id, self._items, self._missions)
+            if verdict.ok:
+                self.player_state.add_item(give_item)
+                self._items |= self.quests.items[give_item]
+                if self.store:
+                    self.store.record_item(self.session_id, give_item)
+                self._record("item", id=give_item)
+                result["items_received"].append(give_item)
+                NPC_ACTIONS.labels("item_granted").inc()
+                logger.info(f"📦 Player got: {give_item}")
+            else:
+                result["rejected"].append({"item": give_item, "reason": verdict.reason})
+                NPC_ACTIONS.labels("item_rejected").inc()
+                logger.warning(f"🚫 Rejected {give_item} from {npc_id}: {verdict.reason}")
 
-        if mission_complete and not self.player_state.is_mission_completed(mission_complete):
-            self.player_state.complete_mission(mission_complete)
-            result["missions_completed"].append(mission_complete)
-            logger.info(f"✅ Mission done: {mission_complete}")
+        if mission_complete and self.player_state.is_mission_completed(mission_complete):
+            NPC_ACTIONS.labels("mission_duplicate").inc()
+        elif mission_complete:
+            verdict = self.quests.check_mission(mission_complete, npc_id, self._items, self._missions)
+            if verdict.ok:
+                self.player_state.complete_mission(mission_complete)
+                self._missions |= self.quests.missions[mission_complete].bit
+                if self.store:
+                    self.store.record_mission(self.session_id, mission_complete, MissionStatus.COMPLETED)
+                self._record("mission", id=mission_complete, status=MissionStatus.COMPLETED.value)
+                result["missions_completed"].append(mission_complete)
+                NPC_ACTIONS.labels("mission_completed").inc()
+                logger.info(f"✅ Mission done: {mission_complete}")
+            else:
+                result["rejected"].append({"mission": mission_complete, "reason": verdict.reason})
+                NPC_ACTIONS.labels("mission_rejected").inc()
+                logger.warning(f"🚫 Rejected {mission_complete} from {npc_id}: {verdict.reason}")
 
         if self.is_game_complete():
             result["game_complete"] = True
+            if result["missions_completed"]:
+                NPC_ACTIONS.labels("game_complete").inc()
+                self._record("complete")
             logger.info("🎉 ALL MISSIONS COMPLETE!")
 
         return result
 
+    def available_missions(self) -> list[str]:
+        """Missions whose prerequisites are met but which are not completed yet."""
+        return [
+            m.id for m in self.quests.missions.values()
+            if not self._missions & m.bit and self.quests.eligible(m, self._items, self._missions)
+        ]
+
     def is_game_complete(self) -> bool:
-        return all(s == MissionStatus.COMPLETED for s in self.player_state.missions.values())
+        return self.quests.is_complete(self._missions)
 
     def reset(self) -> None:
-        self.player_state = PlayerState(missions=dict(ALL_MISSIONS))
\ No newline at end of file
+        self.player_state = PlayerState(missions=dict(ALL_MISSIONS))
+        self._sync_masks()
+        self._record("reset")
+
+    def _record(self, op: str, **fields) -> None:
+        self.version += 1
+        delta = {"v": self.version, "op": op, **fields}
+        self._deltas.append(delta)
+        if self.on_delta:
+            self.on_delta(self.epoch, delta)
+
+    def snapshot(self) -> dict:
+        """The whole state, at its version."""
+        return {
+            "epoch": self.epoch, "v": self.version,
+            "inventory": list(self.player_state.inventory),
+            "missions": {k: v.value for k, v in self.player_state.missions.items()},
+            "game_complete": self.is_game_complete(),
+        }
+
+    def deltas_since(self, epoch: Optional[str], version: Optional[int]) -> Optional[list[dict]]:
+        """Deltas after `version`, or None when they cannot bring that client up to
+        date (another epoch, a version from the future, or older than the history)."""
+        if epoch != self.epoch or version is None or not 0 <= version <= self.version:
+            return None
+        if version == self.version:
+            return []
+        if not self._deltas or self._deltas[0]["v"] > version + 1:
+            return None
+        return [delta for delta in self._deltas if delta["v"] > version]
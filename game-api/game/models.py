@@ -9,10 +9,13 @@ class NPCDefinition(BaseModel):
     style: str = ""
     spawn_x: float=0
     spawn_y: float=0
+    roam_speed: float=30
     
 class ChatMessage(BaseModel):
     message: str
     npc_id: str
+    session_id: str = "default"
+    priority: str = "player"  # "player" or "ambient" (NPC chatter, shed first)
     
 class ChatResponse(BaseModel):
     message: str
@@ -1,18 +1,31 @@
+from types import MappingProxyType
+
 from game.models import NPCDefinition
 from agents.prompts import NPC_CONFIGS
 
 
+TILE_SIZE = 64
+# Where each NPC stands on the village map, in tiles (GameScene places them at the tile centre).
+NPC_SPAWNS = {"wizard": (6, 10), "blacksmith": (20, 10), "herbalist": (10, 13), "guard": (16, 13), "dragon": (25, 3)}
+NPC_ROAM_SPEEDS = {"dragon": 45.0}  # the dragon paces more aggressively
+PLAYER_SPAWN = (14 * TILE_SIZE + TILE_SIZE / 2, 12 * TILE_SIZE + TILE_SIZE / 2)
+
+
 class NPCRegistry:
     def __init__(self):
-        self._npcs = {}
-        for npc_id, config in NPC_CONFIGS.items():
-            self._npcs[npc_id] = NPCDefinition(
+        self._npcs = MappingProxyType({
+            npc_id: NPCDefinition(
                 id=npc_id,
                 name=config["name"],
                 perspective=config["perspective"],
                 style=config["style"],
-                mission_instructions=config["mission_instructions"]
+                mission_instructions=config["mission_instructions"],
+                spawn_x=NPC_SPAWNS.get(npc_id, (0, 0))[0] * TILE_SIZE + TILE_SIZE / 2,
+                spawn_y=NPC_SPAWNS.get(npc_id, (0, 0))[1] * TILE_SIZE + TILE_SIZE / 2,
+                roam_speed=NPC_ROAM_SPEEDS.get(npc_id, 30.0),
             )
+            for npc_id, config in NPC_CONFIGS.items()
+        })
 
     def get_npc(self, npc_id: str) -> NPCDefinition:
         if npc_id not in self._npcs:
@@ -20,4 +33,8 @@ class NPCRegistry:
         return self._npcs[npc_id]
 
     def get_all_npcs(self) -> list[NPCDefinition]:
-        return list(self._npcs.values())
\ No newline at end of file
+        return list(self._npcs.values())
+
+
+# Built once at import.
+NPC_REGISTRY = NPCRegistry()
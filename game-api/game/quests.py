@@ -0,0 +1,151 @@
+import json
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+
+QUESTS_PATH = Path(__file__).with_name("quests.json")
+
+
+class Mission(NamedTuple):
+    id: str
+    title: str
+    npc: str
+    bit: int
+    requires_items: int      # bitmask over QuestGraph.items
+    requires_missions: int   # bitmask over QuestGraph.missions
+    rewards: tuple[str, ...]
+
+
+class Verdict(NamedTuple):
+    ok: bool
+    reason: str = ""
+
+
+class QuestGraph:
+    """Quest data compiled to bitmasks.
+
+    Every item and mission gets one bit, and player progress is a pair of ints
+    (items held, missions completed). Checking prerequisites, validating an
+    LLM-emitted grant or testing for game completion is then a few AND/compare
+    operations.
+    """
+
+    def __init__(self, data: dict):
+        specs = data["missions"]
+        self.missions: dict[str, Mission] = {}
+        self.items: dict[str, int] = {}           # item -> bit
+        self.item_source: dict[str, str] = {}     # item -> mission that rewards it
+
+        for spec in specs.values():
+            for item in (*spec.get("requires_items", ()), *spec.get("rewards", ())):
+                self.items.setdefault(item, 1 << len(self.items))
+
+        order = self._topological_order(specs)
+        mission_bits = {mission_id: 1 << i for i, mission_id in enumerate(order)}
+        for mission_id in order:
+            spec = specs[mission_id]
+            for item in spec.get("rewards", ()):
+                if item in self.item_source:
+                    raise ValueError(f"Item '{item}' is rewarded by both {self.item_source[item]} and {mission_id}")
+                self.item_source[item] = mission_id
+            self.missions[mission_id] = Mission(
+                id=mission_id, title=spec.get("title", mission_id), npc=spec["npc"],
+                bit=mission_bits[mission_id],
+                requires_items=self.items_mask(spec.get("requires_items", ())),
+                requires_missions=self._mask(mission_bits, spec.get("requires_missions", ())),
+                rewards=tuple(spec.get("rewards", ())),
+            )
+        self.all_missions = sum(m.bit for m in self.missions.values())
+
+    @staticmethod
+    def _mask(bits: dict[str, int], names) -> int:
+        mask = 0
+        for name in names:
+            mask |= bits[name]
+        return mask
+
+    @staticmethod
+    def _topological_order(specs: dict) -> list[str]:
+        """Missions ordered so prerequisites come first; rejects unknown references and cycles.
+        An item requirement counts as a dependency on the mission that rewards it."""
+        rewarded_by = {item: mid for mid, spec in specs.items() for item in spec.get("rewards", ())}
+        deps: dict[str, set[str]] = {}
+        for mission_id, spec in specs.items():
+            needed = set(spec.get("requires_missions", ()))
+            unknown = needed - specs.keys()
+            if unknown:
+                raise ValueError(f"{mission_id} requires unknown missions {sorted(unknown)}")
+            for item in spec.get("requires_items", ()):
+                if item not in rewarded_by:
+                    raise ValueError(f"{mission_id} requires '{item}', which no mission rewards")
+                needed.add(rewarded_by[item])
+            deps[mission_id] = needed
+
+        order, done, visiting = [], set(), set()
+
+        def visit(mission_id: str) -> None:
+            if mission_id in done:
+                return
+            if mission_id in visiting:
+                raise ValueError(f"Quest dependency cycle through {mission_id}")
+            visiting.add(mission_id)
+            for dep in sorted(deps[mission_id]):
+                visit(dep)
+            visiting.discard(mission_id)
+            done.add(mission_id)
+            order.append(mission_id)
+
+        for mission_id in specs:
+            visit(mission_id)
+        return order
+
+    def items_mask(self, items) -> int:
+        mask = 0
+        for item in items:
+            mask |= self.items.get(item, 0)
+        return mask
+
+    def missions_mask(self, mission_ids) -> int:
+        mask = 0
+        for mission_id in mission_ids:
+            mission = self.missions.get(mission_id)
+            if mission:
+                mask |= mission.bit
+        return mask
+
+    def eligible(self, mission: Mission, items: int, missions: int) -> bool:
+        return (items & mission.requires_items) == mission.requires_items and \
+            (missions & mission.requires_missions) == mission.requires_missions
+
+    def check_item(self, item: str, npc_id: Optional[str], items: int, missions: int) -> Verdict:
+        """May `npc_id` hand over `item` now? npc_id None skips the NPC check."""
+        source = self.item_source.get(item)
+        if source is None:
+            return Verdict(False, "unknown item")
+        mission = self.missions[source]
+        if npc_id is not None and npc_id != mission.npc:
+            return Verdict(False, f"only {mission.npc} gives {item}")
+        if not self.eligible(mission, items, missions):
+            return Verdict(False, f"{source} prerequisites not met")
+        return Verdict(True)
+
+    def check_mission(self, mission_id: str, npc_id: Optional[str], items: int, missions: int) -> Verdict:
+        mission = self.missions.get(mission_id)
+        if mission is None:
+            return Verdict(False, "unknown mission")
+        if npc_id is not None and npc_id != mission.npc:
+            return Verdict(False, f"only {mission.npc} completes {mission_id}")
+        if not self.eligible(mission, items, missions):
+            return Verdict(False, "prerequisites not met")
+        return Verdict(True)
+
+    def is_complete(self, missions: int) -> bool:
+        return missions == self.all_missions
+
+
+def load_quests(path: Path = QUESTS_PATH) -> QuestGraph:
+    with open(path, encoding="utf-8") as f:
+        return QuestGraph(json.load(f))
+
+
+QUESTS = load_quests()
@@ -0,0 +1,235 @@
+import sys
+import time
+import asyncio
+from collections import OrderedDict, deque
+from enum import Enum
+from functools import partial
+from typing import Callable, Optional
+from loguru import logger
+
+from agents.memory import ConversationMemory
+from game.missions import MissionManager
+from game.models import PlayerState
+from game.storage import Conversations, GameStore
+
+
+DEFAULT_SESSION_ID = "default"
+
+
+def _deep_sizeof(obj, seen: set[int]) -> int:
+    """Approximate retained size of an object graph in bytes."""
+    if id(obj) in seen or isinstance(obj, (Enum, type)):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _deep_sizeof(vars(obj), seen)
+    if hasattr(obj, "__slots__"):
+        for slot in obj.__slots__:
+            if hasattr(obj, slot):
+                size += _deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+# What a store holds for one player: (version, progress, conversations).
+SavedSession = tuple[int, Optional[PlayerState], Conversations]
+
+
+def load_saved(store: GameStore, session_id: str) -> SavedSession:
+    """Read a player's saved state. Blocking: run it off the event loop."""
+    return store.version(session_id), store.load_player(session_id), store.load_conversations(session_id)
+
+
+class PlayerSession:
+    """Everything one player owns: inventory/missions plus per-NPC conversation memory.
+
+    `saved` is what the store held for the player (see `load_saved`), the
+    first time they show up after a restart or an eviction.
+    """
+
+    def __init__(self, session_id: str, max_messages: int = 20, store: Optional[GameStore] = None,
+                 max_history_tokens: int = 0, summarizer=None, sync_writes: bool = False,
+                 state_history: int = 64, on_state_delta: Optional[Callable[[str, str, dict], None]] = None,
+                 saved: Optional[SavedSession] = None):
+        version, state, conversations = saved or (0, None, {})
+        self.session_id = session_id
+        self.store = store
+        self.sync_writes = sync_writes
+        self.version = version
+        self.mission_manager = MissionManager(
+            state=state,
+            store=store, session_id=session_id, history=state_history,
+            on_delta=partial(on_state_delta, session_id) if on_state_delta else None,
+        )
+        self.memory = ConversationMemory(
+            max_messages=max_messages, store=store, session_id=session_id,
+            max_tokens=max_history_tokens, summarizer=summarizer,
+        )
+        if conversations:
+            self.memory.load(conversations)
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+
+    def touch(self) -> None:
+        self.last_seen = time.monotonic()
+
+    def reset(self) -> None:
+        if self.store:
+            self.store.reset(self.session_id)
+        self.mission_manager.reset()
+        self.memory.reset()
+
+    def close(self) -> None:
+        """Leaving the cache: cancel background summaries so they stop holding the session."""
+        self.memory.reset()
+
+    async def commit(self) -> None:
+        """End of a turn: bump the version and, with sync_writes, wait until it is on disk
+        so the player's next request sees it on any worker."""
+        if not self.store:
+            return
+        self.store.record_version(self.session_id)
+        self.version += 1
+        if self.sync_writes:
+            await asyncio.to_thread(self.store.flush)
+
+    def memory_cost(self) -> int:
+        seen: set[int] = {id(self.store), id(self.memory.summarizer)}
+        return _deep_sizeof(self.mission_manager, seen) + _deep_sizeof(self.memory, seen)
+
+
+class SessionStore:
+    """LRU map of live player sessions with idle-TTL eviction and a hard cap.
+
+    New sessions are loaded from the store in a thread, once per session even
+    when several requests for it arrive together. With `shared=True` (several
+    workers on one store) a cached session is reloaded whenever another worker
+    has committed a newer version of it.
+    `on_state_delta(session_id, epoch, delta)` hears every game-state change.
+    """
+
+    def __init__(self, ttl_seconds: float = 1800.0, max_sessions: int = 10000, max_messages: int = 20,
+                 store: Optional[GameStore] = None, max_history_tokens: int = 0, summarizer=None,
+                 shared: bool = False, state_history: int = 64,
+                 on_state_delta: Optional[Callable[[str, str, dict], None]] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.max_history_tokens = max_history_tokens
+        self.summarizer = summarizer
+        self.store = store
+        self.shared = shared and store is not None and store.shared
+        self.state_history = state_history
+        self.on_state_delta = on_state_delta
+        self._sessions: OrderedDict[str, PlayerSession] = OrderedDict()
+        self._loading: dict[str, asyncio.Future] = {}
+        self._evicted = 0
+        self._reloaded = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def get(self, session_id: Optional[str] = None) -> PlayerSession:
+        """Return the live session for `session_id`, creating it on first use."""
+        session_id = session_id or DEFAULT_SESSION_ID
+        session = self._sessions.get(session_id)
+        if session is not None and self.shared and await self._is_stale(session):
+            logger.info(f"🔄 Session {session_id} changed on another worker, reloading")
+            self._reloaded += 1
+            session.close()
+            if self._sessions.get(session_id) is session:
+                del self._sessions[session_id]
+            session = self._sessions.get(session_id)
+        if session is None:
+            session = await self._create(session_id)
+        else:
+            self._sessions.move_to_end(session_id)
+        session.touch()
+        return session
+
+    async def _is_stale(self, session: PlayerSession) -> bool:
+        """Has another worker committed a newer version? A store read, so it runs in a thread."""
+        return await asyncio.to_thread(self.store.version, session.session_id) > session.version
+
+    async def _create(self, session_id: str) -> PlayerSession:
+        saved = None
+        if self.store:
+            loading = self._loading.get(session_id)
+            if loading is None:
+                loading = asyncio.ensure_future(asyncio.to_thread(load_saved, self.store, session_id))
+                self._loading[session_id] = loading
+                loading.add_done_callback(lambda _: self._loading.pop(session_id, None))
+            saved = await asyncio.shield(loading)
+            # Whoever else awaited the same load may have built the session already.
+            session = self._sessions.get(session_id)
+            if session is not None:
+                return session
+        session = PlayerSession(
+            session_id, max_messages=self.max_messages, store=self.store,
+            max_history_tokens=self.max_history_tokens, summarizer=self.summarizer,
+            sync_writes=self.shared, state_history=self.state_history, on_state_delta=self.on_state_delta,
+            saved=saved,
+        )
+        self._sessions[session_id] = session
+        self._enforce_cap()
+        return session
+
+    def peek(self, session_id: str) -> Optional[PlayerSession]:
+        return self._sessions.get(session_id)
+
+    def drop(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def _enforce_cap(self) -> None:
+        while len(self._sessions) > self.max_sessions:
+            old_id, old = self._sessions.popitem(last=False)
+            old.close()
+            self._evicted += 1
+            logger.info(f"🧹 Session cap reached, evicted {old_id}")
+
+    def evict_idle(self) -> int:
+        """Drop sessions idle for longer than the TTL. Oldest are at the front."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = 0
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_seen >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            session.close()
+            expired += 1
+        if expired:
+            self._evicted += expired
+            logger.info(f"🧹 Evicted {expired} idle sessions")
+        return expired
+
+    async def run_sweeper(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+    def stats(self, sample: int = 100) -> dict:
+        """Session counts plus per-session memory cost, measured on the most recent `sample` sessions."""
+        recent = list(self._sessions.values())[-sample:] if sample else []
+        costs = [s.memory_cost() for s in recent]
+        avg = sum(costs) / len(costs) if costs else 0
+        return {
+            "live_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "evicted_total": self._evicted,
+            "reloaded_total": self._reloaded,
+            "sampled_sessions": len(costs),
+            "avg_session_bytes": int(avg),
+            "max_session_bytes": max(costs, default=0),
+            "estimated_total_bytes": int(avg * len(self._sessions)),
+        }
@@ -0,0 +1,73 @@
+import asyncio
+from typing import Optional
+
+from metrics import STATE_DELTAS
+
+
+class StateSubscription:
+    """One socket's queue of delta frames for its session. If the socket falls
+    more than `max_pending` frames behind, the queue is dropped and `get`
+    returns None: the socket should send a full snapshot instead."""
+
+    def __init__(self, session_id: str, max_pending: int = 64):
+        self.session_id = session_id
+        self._queue: asyncio.Queue = asyncio.Queue(max_pending)
+        self._overflowed = False
+
+    def push(self, frame: dict) -> None:
+        try:
+            self._queue.put_nowait(frame)
+            STATE_DELTAS.labels("queued").inc()
+        except asyncio.QueueFull:
+            self._overflowed = True
+            STATE_DELTAS.labels("overflow").inc()
+
+    async def get(self) -> Optional[dict]:
+        frame = await self._queue.get()
+        if self._overflowed:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._overflowed = False
+            return None
+        return frame
+
+
+class StateFeed:
+    """Pushes game-state deltas to the sockets subscribed to each session.
+
+    In-process only: a socket on another worker does not hear the change,
+    but the versions tell its client it is behind the next time it syncs.
+    """
+
+    def __init__(self, max_pending: int = 64):
+        self.max_pending = max_pending
+        self._subscribers: dict[str, set[StateSubscription]] = {}
+        self.published = 0
+
+    def subscribe(self, session_id: str) -> StateSubscription:
+        subscription = StateSubscription(session_id, self.max_pending)
+        self._subscribers.setdefault(session_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: StateSubscription) -> None:
+        subscribers = self._subscribers.get(subscription.session_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.session_id]
+
+    def publish(self, session_id: str, epoch: str, delta: dict) -> None:
+        """MissionManager's on_delta hook (through SessionStore)."""
+        self.published += 1
+        subscribers = self._subscribers.get(session_id)
+        if subscribers:
+            frame = {"type": "delta", "epoch": epoch, "v": delta["v"], "deltas": [delta]}
+            for subscription in subscribers:
+                subscription.push(frame)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._subscribers),
+            "subscriptions": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+        }
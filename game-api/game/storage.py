@@ -0,0 +1,359 @@
+import time
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+from loguru import logger
+
+from game.models import PlayerState, MissionStatus
+from metrics import STORAGE_WRITES
+
+
+# npc_id -> (messages as (role, content), summary)
+Conversations = dict[str, tuple[list[tuple[str, str]], str]]
+
+
+class GameStore(ABC):
+    """Where player progress and NPC conversations live beyond a single process.
+
+    The record_* methods sit on the chat path, so implementations must return
+    immediately and do any slow I/O in the background. The load_* methods and
+    `version` may block: callers on the event loop run them in a thread.
+
+    A `shared` store can be written by several worker processes. Each player
+    then has a version number, bumped once per turn, so a worker can tell that
+    its cached session is out of date.
+    """
+
+    shared = False
+
+    @abstractmethod
+    def load_player(self, session_id: str) -> Optional[PlayerState]: ...
+
+    @abstractmethod
+    def load_conversations(self, session_id: str) -> Conversations: ...
+
+    @abstractmethod
+    def record_message(self, session_id: str, npc_id: str, role: str, content: str) -> None: ...
+
+    @abstractmethod
+    def record_trim(self, session_id: str, npc_id: str, keep: int, summary: str) -> None:
+        """Keep only the newest `keep` messages for the NPC and store the new summary."""
+
+    @abstractmethod
+    def record_summary(self, session_id: str, npc_id: str, summary: str) -> None: ...
+
+    @abstractmethod
+    def record_item(self, session_id: str, item: str) -> None: ...
+
+    @abstractmethod
+    def record_mission(self, session_id: str, mission_id: str, status: MissionStatus) -> None: ...
+
+    @abstractmethod
+    def reset(self, session_id: str) -> None: ...
+
+    def version(self, session_id: str) -> int:
+        return 0
+
+    def record_version(self, session_id: str) -> None:
+        """Mark the end of a turn: everything recorded so far is one new version."""
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryStore(GameStore):
+    """Dict-backed store. Keeps state across session eviction, not across restarts."""
+
+    def __init__(self):
+        self._players: dict[str, PlayerState] = {}
+        self._conversations: dict[str, dict[str, tuple[list[tuple[str, str]], str]]] = {}
+
+    def load_player(self, session_id: str) -> Optional[PlayerState]:
+        state = self._players.get(session_id)
+        return state.model_copy(deep=True) if state else None
+
+    def load_conversations(self, session_id: str) -> Conversations:
+        convs = self._conversations.get(session_id, {})
+        return {npc_id: (list(msgs), summary) for npc_id, (msgs, summary) in convs.items()}
+
+    def _player(self, session_id: str) -> PlayerState:
+        return self._players.setdefault(session_id, PlayerState())
+
+    def _conversation(self, session_id: str, npc_id: str) -> tuple[list[tuple[str, str]], str]:
+        return self._conversations.setdefault(session_id, {}).setdefault(npc_id, ([], ""))
+
+    def record_message(self, session_id: str, npc_id: str, role: str, content: str) -> None:
+        self._conversation(session_id, npc_id)[0].append((role, content))
+
+    def record_trim(self, session_id: str, npc_id: str, keep: int, summary: str) -> None:
+        msgs, _ = self._conversation(session_id, npc_id)
+        self._conversations[session_id][npc_id] = (msgs[-keep:] if keep else [], summary)
+
+    def record_summary(self, session_id: str, npc_id: str, summary: str) -> None:
+        msgs, _ = self._conversation(session_id, npc_id)
+        self._conversations[session_id][npc_id] = (msgs, summary)
+
+    def record_item(self, session_id: str, item: str) -> None:
+        self._player(session_id).add_item(item)
+
+    def record_mission(self, session_id: str, mission_id: str, status: MissionStatus) -> None:
+        self._player(session_id).missions[mission_id] = status
+
+    def reset(self, session_id: str) -> None:
+        self._players.pop(session_id, None)
+        self._conversations.pop(session_id, None)
+
+
+def _transient(error: sqlite3.Error) -> bool:
+    """Busy, locked or I/O errors, which may succeed on another try."""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and any(
+        word in message for word in ("locked", "busy", "disk i/o"))
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inventory (
+    session_id TEXT NOT NULL, item TEXT NOT NULL, seq INTEGER NOT NULL,
+    PRIMARY KEY (session_id, item)
+);
+CREATE TABLE IF NOT EXISTS missions (
+    session_id TEXT NOT NULL, mission_id TEXT NOT NULL, status TEXT NOT NULL,
+    PRIMARY KEY (session_id, mission_id)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL, npc_id TEXT NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, npc_id, id);
+CREATE TABLE IF NOT EXISTS summaries (
+    session_id TEXT NOT NULL, npc_id TEXT NOT NULL, summary TEXT NOT NULL,
+    PRIMARY KEY (session_id, npc_id)
+);
+CREATE TABLE IF NOT EXISTS versions (
+    session_id TEXT PRIMARY KEY, version INTEGER NOT NULL
+);
+"""
+
+
+class SQLiteStore(GameStore):
+    """SQLite (WAL) store with write-behind batching.
+
+    Writes are queued and applied by a background thread in batches of up to
+    `batch_size` statements per transaction, at least every `flush_interval`
+    seconds. Reads flush pending writes first so a reloaded session always
+    sees its latest progress. Several processes may share one file (WAL mode).
+
+    A batch that fails on a busy or locked database is retried `retries`
+    times with backoff, in order. If it still fails, its writes are applied
+    one by one so only the bad ones are lost; those are logged and counted
+    in `failed_writes`.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, flush_interval: float = 0.5, batch_size: int = 256, retries: int = 3):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.retries = retries
+        self.failed_writes = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._read_lock = threading.Lock()
+
+        self._reader = self._connect()
+        self._reader.executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"💾 SQLite store ready at {path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    # --- write-behind -----------------------------------------------------
+
+    def _enqueue(self, sql: str, params: tuple) -> None:
+        self._queue.put((sql, params))
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        while True:
+            try:
+                op = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch, waiters, stop = [], [], False
+            while True:
+                if op is None:
+                    stop = True
+                elif isinstance(op, threading.Event):
+                    waiters.append(op)
+                else:
+                    batch.append(op)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    op = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._apply(conn, batch)
+            for event in waiters:
+                event.set()
+            if stop:
+                conn.close()
+                return
+
+    def _apply(self, conn: sqlite3.Connection, batch: list[tuple[str, tuple]]) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                conn.execute("BEGIN")
+                for sql, params in batch:
+                    conn.execute(sql, params)
+                conn.execute("COMMIT")
+                STORAGE_WRITES.labels("committed").inc(len(batch))
+                return
+            except sqlite3.Error as e:
+                self._rollback(conn)
+                if not _transient(e) or attempt == self.retries:
+                    logger.error(f"SQLite batch of {len(batch)} writes failed: {e}")
+                    break
+                STORAGE_WRITES.labels("retried").inc(len(batch))
+                logger.warning(f"SQLite batch of {len(batch)} writes failed, retrying: {e}")
+                time.sleep(0.1 * 2 ** attempt)
+
+        # One transaction per write, so a bad statement does not take the rest of the batch with it.
+        for sql, params in batch:
+            try:
+                conn.execute(sql, params)
+                STORAGE_WRITES.labels("committed").inc()
+            except sqlite3.Error as e:
+                self.failed_writes += 1
+                STORAGE_WRITES.labels("failed").inc()
+                logger.error(f"💾 Dropped SQLite write {sql.split('(')[0].strip()!r} {params[:2]}: {e}")
+
+    @staticmethod
+    def _rollback(conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+
+    def flush(self) -> None:
+        """Block until every write queued so far is committed."""
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._reader.close()
+
+    # --- reads ------------------------------------------------------------
+
+    def load_player(self, session_id: str) -> Optional[PlayerState]:
+        self.flush()
+        with self._read_lock:
+            items = self._reader.execute(
+                "SELECT item FROM inventory WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+            missions = self._reader.execute(
+                "SELECT mission_id, status FROM missions WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        if not items and not missions:
+            return None
+        return PlayerState(
+            inventory=[item for (item,) in items],
+            missions={mission_id: MissionStatus(status) for mission_id, status in missions},
+        )
+
+    def load_conversations(self, session_id: str) -> Conversations:
+        self.flush()
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT npc_id, role, content FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+            summaries = dict(self._reader.execute(
+                "SELECT npc_id, summary FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchall())
+
+        convs: Conversations = {npc_id: ([], summary) for npc_id, summary in summaries.items()}
+        for npc_id, role, content in rows:
+            convs.setdefault(npc_id, ([], ""))[0].append((role, content))
+        return convs
+
+    def version(self, session_id: str) -> int:
+        """Committed version only: our own queued writes are already reflected in the caller's copy."""
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT version FROM versions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    # --- writes -----------------------------------------------------------
+
+    def record_message(self, session_id: str, npc_id: str, role: str, content: str) -> None:
+        self._enqueue(
+            "INSERT INTO messages (session_id, npc_id, role, content) VALUES (?, ?, ?, ?)",
+            (session_id, npc_id, role, content),
+        )
+
+    def record_trim(self, session_id: str, npc_id: str, keep: int, summary: str) -> None:
+        self._enqueue(
+            "DELETE FROM messages WHERE session_id = ? AND npc_id = ? AND id NOT IN ("
+            "SELECT id FROM messages WHERE session_id = ? AND npc_id = ? ORDER BY id DESC LIMIT ?)",
+            (session_id, npc_id, session_id, npc_id, keep),
+        )
+        self.record_summary(session_id, npc_id, summary)
+
+    def record_summary(self, session_id: str, npc_id: str, summary: str) -> None:
+        self._enqueue(
+            "INSERT OR REPLACE INTO summaries (session_id, npc_id, summary) VALUES (?, ?, ?)",
+            (session_id, npc_id, summary),
+        )
+
+    def record_item(self, session_id: str, item: str) -> None:
+        self._enqueue(
+            "INSERT OR IGNORE INTO inventory (session_id, item, seq) VALUES "
+            "(?, ?, (SELECT COUNT(*) FROM inventory WHERE session_id = ?))",
+            (session_id, item, session_id),
+        )
+
+    def record_mission(self, session_id: str, mission_id: str, status: MissionStatus) -> None:
+        self._enqueue(
+            "INSERT OR REPLACE INTO missions (session_id, mission_id, status) VALUES (?, ?, ?)",
+            (session_id, mission_id, status.value),
+        )
+
+    def record_version(self, session_id: str) -> None:
+        self._enqueue(
+            "INSERT INTO versions (session_id, version) VALUES (?, 1) "
+            "ON CONFLICT (session_id) DO UPDATE SET version = version + 1",
+            (session_id,),
+        )
+
+    def reset(self, session_id: str) -> None:
+        for table in ("inventory", "missions", "messages", "summaries"):
+            self._enqueue(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+
+
+def create_store(backend: str, sqlite_path: str = "game_state.db",
+                 flush_interval: float = 0.5, batch_size: int = 256) -> Optional[GameStore]:
+    """Build the configured store. `none` keeps state in the live session only."""
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return InMemoryStore()
+    if backend == "sqlite":
+        return SQLiteStore(sqlite_path, flush_interval=flush_interval, batch_size=batch_size)
+    raise ValueError(f"Unknown storage backend '{backend}'")
@@ -0,0 +1,474 @@
+"""
+Server-side world: where every player and NPC stands, NPC roaming, and who is
+close enough to talk to whom.
+
+- Entities live in parallel NumPy arrays, so a tick moves every NPC with a
+  handful of vectorized operations however many there are.
+- Static colliders come from the compiled tilemap (compile_map.py). They are
+  rasterized once into a mask of MASK_CELL-pixel cells, already grown by the
+  entity body, so a collision test is one array lookup per entity.
+- SpatialHash, a uniform grid rebuilt every tick with one counting sort,
+  answers "who is near (x, y)" from the few cells a radius touches.
+- Players are kinematic: the client reports where it is, the world accepts
+  it as far as walking speed and walls allow and returns a correction
+  otherwise.
+"""
+import json
+import math
+import time
+import asyncio
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+from loguru import logger
+
+from metrics import WORLD_TICK
+
+
+MASK_CELL = 8                 # collision mask resolution, pixels
+BODY_HALF = (12.0, 18.0)      # half extents of the 24x36 sprite bodies (Player.js, NPC.js)
+COLLIDER_INSET = 0.1          # per side, in tiles — TinySwordsMap._addCollider makes bodies 80% of a tile
+NPC, PLAYER = 0, 1
+
+# NPC roaming, as NPC.js: head home when further than HOME_RADIUS, otherwise
+# walk one way for a while (4 in 6) or stand, then pause before deciding again.
+HOME_RADIUS = 120.0
+HOME_WALK = 1.2
+WALK_TIME = (0.6, 1.5)
+PAUSE_TIME = (1.5, 4.5)
+DIRECTIONS = np.array([(-1.0, 0.0), (1.0, 0.0), (0.0, -1.0), (0.0, 1.0)])
+
+# Player moves: slack over PLAYER_SPEED for frame timing and throttled reports.
+SPEED_TOLERANCE = 1.25
+MOVE_ALLOWANCE = 32.0         # pixels always allowed, whatever the elapsed time
+MAX_MOVE_GAP = 1.0            # seconds; an idle player does not bank distance
+CORRECTION_DISTANCE = 16.0    # send the accepted position back when further than this from the report
+SWEEP_EVERY = 100             # ticks between sweeps of idle players
+
+
+class OutOfRange(Exception):
+    """The player is not close enough to the NPC to talk to it."""
+
+
+def _bucket(cells: np.ndarray, count: int) -> tuple[np.ndarray, np.ndarray]:
+    """Indices sorted by cell, and where each of the `count` cells starts in that order
+    (with a final end offset). Cell ids that fit 16 bits get NumPy's radix sort."""
+    keys = cells.astype(np.uint16) if count <= 1 << 16 else cells
+    starts = np.zeros(count + 1, np.intp)
+    np.cumsum(np.bincount(cells, minlength=count), out=starts[1:])
+    return np.argsort(keys, kind="stable"), starts
+
+
+class SpatialHash:
+    """Uniform grid over the map for neighbour queries.
+
+    `rebuild` buckets every position with one counting sort: entity indices
+    ordered by cell, plus the offset where each cell starts. Cells of a grid
+    row are contiguous, so `candidates` reads one slice per row the query
+    circle touches instead of looking at every entity.
+    """
+
+    def __init__(self, width: float, height: float, cell_size: float = 128.0):
+        self.cell_size = cell_size
+        self.cols = max(1, math.ceil(width / cell_size))
+        self.rows = max(1, math.ceil(height / cell_size))
+        self._order, self._starts = _bucket(np.empty(0, np.intp), self.cols * self.rows)
+
+    def rebuild(self, x: np.ndarray, y: np.ndarray) -> None:
+        cx = np.clip((x // self.cell_size).astype(np.intp), 0, self.cols - 1)
+        cy = np.clip((y // self.cell_size).astype(np.intp), 0, self.rows - 1)
+        cells = cy * self.cols + cx
+        self._order, self._starts = _bucket(cells, self.cols * self.rows)
+
+    def candidates(self, x: float, y: float, radius: float) -> np.ndarray:
+        """Indices in every cell within `radius` of (x, y): a superset of the entities in range."""
+        c0 = max(int((x - radius) // self.cell_size), 0)
+        c1 = min(int((x + radius) // self.cell_size), self.cols - 1)
+        r0 = max(int((y - radius) // self.cell_size), 0)
+        r1 = min(int((y + radius) // self.cell_size), self.rows - 1)
+        if c0 > c1 or r0 > r1:
+            return self._order[:0]
+        starts = self._starts
+        return np.concatenate([
+            self._order[starts[row * self.cols + c0]:starts[row * self.cols + c1 + 1]] for row in range(r0, r1 + 1)
+        ])
+
+
+def close_pairs(x: np.ndarray, y: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray]:
+    """Every pair (i, j), i < j, of points within `radius` of each other, without
+    a Python loop per point: bucket the points in radius-sized cells, then match
+    each cell against itself and four neighbours (the other four are covered
+    from the other side)."""
+    if len(x) < 2:
+        return np.empty(0, np.intp), np.empty(0, np.intp)
+    cx, cy = (x // radius).astype(np.intp), (y // radius).astype(np.intp)
+    cx -= cx.min()
+    cy -= cy.min()
+    width = int(cx.max()) + 2  # a spare column, so offset -1 never wraps onto a real cell
+    cells = cy * width + cx
+    count = (int(cy.max()) + 2) * width  # and a spare row for offset +1
+    order, starts = _bucket(cells, count)
+    firsts, seconds = [], []
+    for ox, oy in ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+        target = cells + oy * width + ox
+        lo = starts[target]
+        counts = starts[target + 1] - lo
+        total = int(counts.sum())
+        if not total:
+            continue
+        ends = np.cumsum(counts)
+        i = np.repeat(np.arange(len(x)), counts)
+        j = order[np.arange(total) - np.repeat(ends - counts - lo, counts)]
+        keep = i < j if (ox, oy) == (0, 0) else i != j
+        firsts.append(i[keep])
+        seconds.append(j[keep])
+    if not firsts:
+        return np.empty(0, np.intp), np.empty(0, np.intp)
+    i, j = np.concatenate(firsts), np.concatenate(seconds)
+    close = (x[i] - x[j]) ** 2 + (y[i] - y[j]) ** 2 <= radius * radius
+    return i[close], j[close]
+
+
+class World:
+    """Positions of every player and NPC, advanced at a fixed rate by `run`.
+
+    NPCs roam around their home like the client used to do on its own; friendly
+    NPCs that wander within `meet_distance` of each other stop and `on_meet(a, b)`
+    is called so the server can hand out their chatter. Players move only
+    through `move_player`.
+    """
+
+    _COLUMNS = {
+        "x": np.float64, "y": np.float64, "vx": np.float64, "vy": np.float64,
+        "home_x": np.float64, "home_y": np.float64, "speed": np.float64,
+        "until": np.float64, "held_until": np.float64, "last_meet": np.float64,
+        "moved_at": np.float64, "seen_at": np.float64,
+        "walking": np.bool_, "chatty": np.bool_, "kind": np.int8,
+    }
+
+    def __init__(self, width: float, height: float, colliders=(), tile_size: float = 64.0,
+                 cell_size: float = 128.0, spawn: tuple[float, float] = None, player_speed: float = 120.0,
+                 player_ttl: float = 600.0, meet_distance: float = 100.0, meet_cooldown: float = 12.0,
+                 meet_hold: float = 9.0, on_meet: Optional[Callable[[str, str], None]] = None, seed: int = None):
+        self.width, self.height = float(width), float(height)
+        self.spawn = spawn or (self.width / 2, self.height / 2)
+        self.player_speed = player_speed
+        self.player_ttl = player_ttl
+        self.meet_distance = meet_distance
+        self.meet_cooldown = meet_cooldown
+        self.meet_hold = meet_hold
+        self.on_meet = on_meet
+        self.rng = np.random.default_rng(seed)
+        self.mask = self._rasterize(colliders, tile_size)
+        self.hash = SpatialHash(self.width, self.height, cell_size)
+        self._hash_dirty = True
+
+        self.n = 0
+        self.ids: list[str] = []
+        self._index: dict[str, int] = {}
+        for name, dtype in self._COLUMNS.items():
+            setattr(self, name, np.zeros(16, dtype))
+
+        self.time = 0.0  # simulated seconds; NPC timers run on it
+        self.ticks = 0
+        self.overruns = 0
+        self.meets = 0
+        self.corrections = 0
+        self.tick_seconds = 0.0
+        self.max_tick_seconds = 0.0
+
+    @classmethod
+    def from_compiled(cls, path: str, **kwargs) -> "World":
+        """A world sized to a compiled map header (compile_map.py), with its colliders.
+        Falls back to an open 29x16-tile map if the header is missing."""
+        try:
+            header = json.loads(Path(path).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            logger.warning(f"⚠️ Compiled map {path} not found: the world has no colliders (run compile_map.py)")
+            header = {}
+        tile = header.get("tileSize", 64)
+        return cls(header.get("mapWidth", 29) * tile, header.get("mapHeight", 16) * tile,
+                   header.get("colliders", []), tile_size=tile, **kwargs)
+
+    def _rasterize(self, colliders, tile_size: float) -> np.ndarray:
+        """Cells where an entity's centre can not be: collider rectangles grown by the
+        body, and the map border. A cell is blocked only when all of it is, so the
+        mask never rejects a position the client's physics allows."""
+        cols, rows = math.ceil(self.width / MASK_CELL), math.ceil(self.height / MASK_CELL)
+        mask = np.zeros((rows, cols), np.bool_)
+        hw, hh = BODY_HALF
+        inset = COLLIDER_INSET * tile_size
+        regions = [(x * tile_size + inset - hw, y * tile_size + inset - hh,
+                    (x + w) * tile_size - inset + hw, (y + h) * tile_size - inset + hh) for x, y, w, h in colliders]
+        regions += [(-hw, -hh, hw, self.height + hh), (self.width - hw, -hh, self.width + hw, self.height + hh),
+                    (-hw, -hh, self.width + hw, hh), (-hw, self.height - hh, self.width + hw, self.height + hh)]
+        for x0, y0, x1, y1 in regions:
+            mask[max(math.ceil(y0 / MASK_CELL), 0):max(math.floor(y1 / MASK_CELL), 0),
+                 max(math.ceil(x0 / MASK_CELL), 0):max(math.floor(x1 / MASK_CELL), 0)] = True
+        return mask
+
+    def blocked(self, x, y) -> np.ndarray:
+        rows, cols = self.mask.shape
+        ix = np.clip((np.asarray(x) // MASK_CELL).astype(np.intp), 0, cols - 1)
+        iy = np.clip((np.asarray(y) // MASK_CELL).astype(np.intp), 0, rows - 1)
+        return self.mask[iy, ix]
+
+    # --- entities ---------------------------------------------------------
+
+    def _add(self, entity_id: str, x: float, y: float, kind: int) -> int:
+        if entity_id in self._index:
+            raise ValueError(f"Entity '{entity_id}' is already in the world")
+        if self.n == len(self.x):
+            for name in self._COLUMNS:
+                column = getattr(self, name)
+                setattr(self, name, np.concatenate([column, np.zeros_like(column)]))
+        i = self.n
+        for name in self._COLUMNS:
+            getattr(self, name)[i] = 0
+        self.x[i], self.y[i], self.kind[i] = x, y, kind
+        self.home_x[i], self.home_y[i] = x, y
+        self.last_meet[i] = -math.inf
+        self.ids.append(entity_id)
+        self._index[entity_id] = i
+        self.n += 1
+        self._hash_dirty = True
+        return i
+
+    def add_npc(self, npc_id: str, x: float, y: float, speed: float = 30.0, chatty: bool = False) -> None:
+        i = self._add(npc_id, x, y, NPC)
+        self.speed[i] = speed
+        self.chatty[i] = chatty
+        self.until[i] = self.time + self.rng.uniform(*PAUSE_TIME)
+        if self.blocked(x, y):
+            logger.warning(f"⚠️ {npc_id} spawns inside a collider at ({x:.0f}, {y:.0f})")
+
+    def add_player(self, session_id: str, x: float = None, y: float = None) -> None:
+        i = self._add(session_id, self.spawn[0] if x is None else x, self.spawn[1] if y is None else y, PLAYER)
+        self.moved_at[i] = self.seen_at[i] = time.monotonic()
+
+    def remove(self, entity_id: str) -> bool:
+        """Drop an entity (the last one takes its slot)."""
+        i = self._index.pop(entity_id, None)
+        if i is None:
+            return False
+        last = self.n - 1
+        if i != last:
+            for name in self._COLUMNS:
+                column = getattr(self, name)
+                column[i] = column[last]
+            self.ids[i] = self.ids[last]
+            self._index[self.ids[i]] = i
+        self.ids.pop()
+        self.n = last
+        self._hash_dirty = True
+        return True
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._index
+
+    def position(self, entity_id: str) -> Optional[tuple[float, float]]:
+        i = self._index.get(entity_id)
+        return None if i is None else (float(self.x[i]), float(self.y[i]))
+
+    def distance(self, a: str, b: str) -> Optional[float]:
+        i, j = self._index.get(a), self._index.get(b)
+        if i is None or j is None:
+            return None
+        return math.hypot(self.x[i] - self.x[j], self.y[i] - self.y[j])
+
+    def can_interact(self, session_id: str, npc_id: str, reach: float) -> bool:
+        """Whether the player stands within `reach` of the NPC. NPCs the world
+        does not simulate are not gated; players it has never seen are."""
+        if npc_id not in self._index:
+            return True
+        distance = self.distance(session_id, npc_id)
+        return distance is not None and distance <= reach
+
+    def hold(self, npc_id: str, seconds: float) -> None:
+        """Stop an NPC where it is (someone is talking to it) for at least `seconds`."""
+        i = self._index.get(npc_id)
+        if i is None or self.kind[i] != NPC:
+            return
+        self.vx[i] = self.vy[i] = 0.0
+        self.walking[i] = False
+        self.held_until[i] = self.until[i] = max(self.held_until[i], self.time + seconds)
+
+    def touch(self, session_id: str) -> None:
+        """Keep a connected but motionless player from being swept."""
+        i = self._index.get(session_id)
+        if i is not None:
+            self.seen_at[i] = time.monotonic()
+
+    def move_player(self, session_id: str, x: float, y: float, now: float = None) -> Optional[tuple[float, float]]:
+        """Apply a client-reported position. The player walks there in a straight
+        line, no further than PLAYER_SPEED allows since its last report and
+        stopping before a wall. Returns the accepted position when it is more
+        than CORRECTION_DISTANCE from the report (the client should snap to it)."""
+        now = time.monotonic() if now is None else now
+        i = self._index.get(session_id)
+        if i is None:
+            self.add_player(session_id)
+            i = self._index[session_id]
+        x0, y0 = float(self.x[i]), float(self.y[i])
+        elapsed = min(max(now - float(self.moved_at[i]), 0.0), MAX_MOVE_GAP)
+        self.moved_at[i] = self.seen_at[i] = now
+
+        length = math.hypot(x - x0, y - y0)
+        budget = self.player_speed * elapsed * SPEED_TOLERANCE + MOVE_ALLOWANCE
+        scale = min(1.0, budget / length) if length else 1.0
+        tx, ty = x0 + (x - x0) * scale, y0 + (y - y0) * scale
+        if length and not self.blocked(x0, y0):  # already inside a wall: let the player walk out
+            t = np.linspace(0.0, 1.0, math.ceil(length * scale / (MASK_CELL / 2)) + 1)[1:]
+            path_x, path_y = x0 + (tx - x0) * t, y0 + (ty - y0) * t
+            hits = self.blocked(path_x, path_y)
+            if hits.any():
+                k = int(hits.argmax())
+                tx, ty = (x0, y0) if k == 0 else (float(path_x[k - 1]), float(path_y[k - 1]))
+        self.x[i], self.y[i] = tx, ty
+        if math.hypot(tx - x, ty - y) > CORRECTION_DISTANCE:
+            self.corrections += 1
+            return tx, ty
+        return None
+
+    # --- queries ----------------------------------------------------------
+
+    def _fresh_hash(self) -> SpatialHash:
+        if self._hash_dirty:
+            self.hash.rebuild(self.x[:self.n], self.y[:self.n])
+            self._hash_dirty = False
+        return self.hash
+
+    def near(self, x: float, y: float, radius: float) -> np.ndarray:
+        """Indices of the entities within `radius` of (x, y)."""
+        found = self._fresh_hash().candidates(x, y, radius)
+        dx, dy = self.x[found] - x, self.y[found] - y
+        return found[dx * dx + dy * dy <= radius * radius]
+
+    def view(self, session_id: str, radius: float) -> list[list]:
+        """[npc_id, x, y] for the NPCs within `radius` of the player (of the spawn
+        point if the player has not joined yet), sorted by id."""
+        x, y = self.position(session_id) or self.spawn
+        found = self.near(x, y, radius)
+        found = found[self.kind[found] == NPC]
+        return sorted([self.ids[i], round(float(self.x[i])), round(float(self.y[i]))] for i in found)
+
+    # --- simulation -------------------------------------------------------
+
+    def tick(self, dt: float) -> None:
+        self.time += dt
+        self.ticks += 1
+        if self.n:
+            self._think()
+            self._move(dt)
+            self.hash.rebuild(self.x[:self.n], self.y[:self.n])
+            self._hash_dirty = False
+            if self.on_meet:
+                self._meet()
+        if self.ticks % SWEEP_EVERY == 0:
+            self._sweep()
+
+    def _think(self) -> None:
+        """Start the next roaming action for every NPC whose current one is over."""
+        n, now, rng = self.n, self.time, self.rng
+        due = np.flatnonzero((self.kind[:n] == NPC) & (self.until[:n] <= now))
+        if not due.size:
+            return
+        walked = self.walking[due]
+
+        ended = due[walked]  # a walk is over: stop and pause
+        self.vx[ended] = self.vy[ended] = 0.0
+        self.walking[ended] = False
+        self.until[ended] = now + rng.uniform(*PAUSE_TIME, ended.size)
+
+        decide = due[~walked]
+        dx, dy = self.home_x[decide] - self.x[decide], self.home_y[decide] - self.y[decide]
+        away = np.hypot(dx, dy)
+        far = away > HOME_RADIUS
+        home = decide[far]
+        self.vx[home] = dx[far] / away[far] * self.speed[home]
+        self.vy[home] = dy[far] / away[far] * self.speed[home]
+        self.walking[home] = True
+        self.until[home] = now + HOME_WALK
+
+        roam = decide[~far]
+        walk = rng.integers(0, 6, roam.size) <= 3
+        walkers, standers = roam[walk], roam[~walk]
+        direction = DIRECTIONS[rng.integers(0, 4, walkers.size)]
+        self.vx[walkers] = direction[:, 0] * self.speed[walkers]
+        self.vy[walkers] = direction[:, 1] * self.speed[walkers]
+        self.walking[walkers] = True
+        self.until[walkers] = now + rng.uniform(*WALK_TIME, walkers.size)
+        self.until[standers] = now + rng.uniform(*PAUSE_TIME, standers.size)
+
+    def _move(self, dt: float) -> None:
+        """Advance walking NPCs; a blocked move slides along whichever axis is free."""
+        n = self.n
+        moving = np.flatnonzero((self.vx[:n] != 0) | (self.vy[:n] != 0))
+        if not moving.size:
+            return
+        x, y = self.x[moving], self.y[moving]
+        nx, ny = x + self.vx[moving] * dt, y + self.vy[moving] * dt
+        free = ~self.blocked(nx, ny)
+        slide_x = ~free & ~self.blocked(nx, y)
+        slide_y = ~free & ~slide_x & ~self.blocked(x, ny)
+        self.x[moving] = np.where(free | slide_x, nx, x)
+        self.y[moving] = np.where(free | slide_y, ny, y)
+
+    def _meet(self) -> None:
+        """At most one new NPC conversation per tick, between the closest free pair."""
+        n, now = self.n, self.time
+        free = np.flatnonzero(self.chatty[:n] & (self.held_until[:n] <= now)
+                              & (self.last_meet[:n] + self.meet_cooldown <= now))
+        a, b = close_pairs(self.x[free], self.y[free], self.meet_distance)
+        if not a.size:
+            return
+        closest = np.argmin(np.hypot(self.x[free[a]] - self.x[free[b]], self.y[free[a]] - self.y[free[b]]))
+        pair = (free[a[closest]], free[b[closest]])
+        for k in pair:
+            self.hold(self.ids[k], self.meet_hold)
+            self.last_meet[k] = now
+        self.meets += 1
+        self.on_meet(self.ids[pair[0]], self.ids[pair[1]])
+
+    def _sweep(self) -> None:
+        n, cutoff = self.n, time.monotonic() - self.player_ttl
+        stale = [self.ids[i] for i in np.flatnonzero((self.kind[:n] == PLAYER) & (self.seen_at[:n] < cutoff))]
+        for session_id in stale:
+            self.remove(session_id)
+        if stale:
+            logger.info(f"🧹 Removed {len(stale)} idle players from the world")
+
+    async def run(self, hz: float = 20.0) -> None:
+        """Tick at a fixed rate. Each tick advances 1/hz simulated seconds; when a
+        tick runs late the missed ones are dropped rather than caught up."""
+        loop = asyncio.get_running_loop()
+        period = 1.0 / hz
+        next_at = loop.time()
+        logger.info(f"🌍 World ticking at {hz:g} Hz ({self.n} entities)")
+        while True:
+            start = time.perf_counter()
+            try:
+                self.tick(period)
+            except Exception as e:
+                logger.exception(f"World tick failed: {e}")
+            cost = time.perf_counter() - start
+            WORLD_TICK.observe(cost)
+            self.tick_seconds += cost
+            self.max_tick_seconds = max(self.max_tick_seconds, cost)
+            next_at += period
+            delay = next_at - loop.time()
+            if delay < 0:
+                self.overruns += 1
+                next_at, delay = loop.time(), 0.0
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        players = int((self.kind[:self.n] == PLAYER).sum())
+        return {
+            "entities": self.n, "players": players, "npcs": self.n - players,
+            "ticks": self.ticks, "overruns": self.overruns, "meets": self.meets, "corrections": self.corrections,
+            "avg_tick_ms": round(self.tick_seconds / max(self.ticks, 1) * 1000, 3),
+            "max_tick_ms": round(self.max_tick_seconds * 1000, 3),
+            "grid": [self.hash.cols, self.hash.rows],
+        }
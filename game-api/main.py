@@ -1,30 +1,112 @@
-from contextlib import asynccontextmanager
+import json
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable
+from contextlib import asynccontextmanager, aclosing, suppress
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from loguru import logger
 
+from config import settings
+from metrics import (
+    REGISTRY, MetricsMiddleware, monitor_event_loop, WS_CONNECTIONS, WS_CONNECTIONS_TOTAL, WS_MESSAGES, WS_STREAMS, SSE_STREAMS,
+    PROXIMITY_REJECTIONS, STATE_SYNCS,
+)
 from agents.npc_agent import NPCAgent
+from agents.llm import LazyLLM, check_provider, create_llm
+from agents.commands import COMMAND_MODES, CommandStreamParser, StreamEvent
+from agents.admission import Priority, all_admission_stats
+from agents.memory import create_summarizer
+from agents.ambient import AmbientChatter, AMBIENT_EXCLUDED
+from agents.prewarm import Prewarmer
+from agents.prompts import NPC_CONFIGS, UnknownNPC, check_npc, npc_label
 from game.missions import MissionManager
+from game.npc_registry import NPC_REGISTRY, PLAYER_SPAWN
+from game.quests import QUESTS
 from game.models import ChatMessage
+from game.sessions import PlayerSession, SessionStore, DEFAULT_SESSION_ID
+from game.state_feed import StateFeed
+from game.storage import create_store
+from game.world import World, OutOfRange
 
 
 npc_agent: NPCAgent = None
-mission_manager: MissionManager = None
+sessions: SessionStore = None
+chatter: AmbientChatter = None
+prewarmer: Prewarmer = None
+state_feed: StateFeed = None
+world: World = None
+# One outbox per v2 socket for world events (NPC chatter), drained by the socket's world task.
+world_outboxes: dict[WebSocket, deque] = {}
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global npc_agent, mission_manager
+    global npc_agent, sessions, chatter, prewarmer, state_feed, world
     logger.info("🚀 Starting Game API...")
     npc_agent = NPCAgent()
-    mission_manager = MissionManager()
+    if isinstance(npc_agent.llm, LazyLLM) and settings.LLM_WARMUP != "lazy":
+        # The provider stack loads in a thread; with "background" the server listens meanwhile.
+        warming = npc_agent.llm.warm()
+        if settings.LLM_WARMUP == "startup":
+            await warming
+    store = create_store(
+        settings.STORAGE_BACKEND, sqlite_path=settings.SQLITE_PATH,
+        flush_interval=settings.STORAGE_FLUSH_INTERVAL, batch_size=settings.STORAGE_BATCH_SIZE,
+    )
+    state_feed = StateFeed()
+    sessions = SessionStore(
+        ttl_seconds=settings.SESSION_TTL_SECONDS,
+        max_sessions=settings.MAX_SESSIONS,
+        max_messages=settings.MAX_CONVERSATION_HISTORY,
+        store=store,
+        max_history_tokens=settings.HISTORY_TOKEN_BUDGET,
+        summarizer=create_summarizer(
+            settings.SUMMARY_STRATEGY, llm=npc_agent.llm, admission=npc_agent.admission,
+            max_words=settings.SUMMARY_MAX_WORDS,
+        ),
+        shared=settings.WORKERS > 1,
+        state_history=settings.STATE_DELTA_HISTORY, on_state_delta=state_feed.publish,
+    )
+    if settings.WORKERS > 1 and not (store and store.shared):
+        logger.warning("⚠️ Multiple workers without a shared store: each worker keeps its own player state")
+    if settings.PREWARM_ENABLED:
+        prewarmer = Prewarmer(
+            npc_agent, ttl=settings.PREWARM_TTL, max_inflight=settings.PREWARM_MAX_INFLIGHT,
+            max_entries=settings.PREWARM_MAX_ENTRIES, cooldown=settings.PREWARM_COOLDOWN,
+        )
+    _register_state_gauges()
+    background = [
+        asyncio.create_task(sessions.run_sweeper(settings.SESSION_SWEEP_INTERVAL)),
+        asyncio.create_task(monitor_event_loop()),
+    ]
+    if settings.AMBIENT_CHATTER_ENABLED:
+        chatter = AmbientChatter(
+            npc_agent.llm, admission=npc_agent.admission, pool_size=settings.AMBIENT_POOL_SIZE,
+            turns=settings.AMBIENT_TURNS, refill_interval=settings.AMBIENT_REFILL_INTERVAL,
+        )
+        background.append(asyncio.create_task(chatter.run()))
+    if settings.WORLD_ENABLED:
+        world = _create_world()
+        background.append(asyncio.create_task(world.run(settings.WORLD_TICK_HZ)))
+        if settings.WORKERS > 1 and settings.PROXIMITY_GATE == "enforce":
+            logger.warning("⚠️ Multiple workers: each worker simulates its own world, so a player's moves "
+                           "and chat must reach the same worker for PROXIMITY_GATE=enforce")
     logger.info("✅ Game API ready!")
     yield
+    for task in background:
+        task.cancel()
+    if store:
+        store.close()
+    if npc_agent.tracer:
+        npc_agent.tracer.close()
     logger.info("👋 Shutting down...")
 
 
 app = FastAPI(title="My 2D Game API", lifespan=lifespan)
 
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True,
@@ -32,20 +114,104 @@ app.add_middleware(
 )
 
 
+def _register_state_gauges() -> None:
+    """Gauges read from live objects at scrape time, so nothing runs on the request path."""
+    REGISTRY.gauge("sessions_live", "Live player sessions", callback=lambda: {(): len(sessions)})
+    REGISTRY.gauge(
+        "llm_queue_depth", "Requests waiting for an LLM slot", ("provider",),
+        callback=lambda: {(s["provider"],): s["queue_depth"] for s in all_admission_stats()},
+    )
+    REGISTRY.gauge(
+        "llm_active_requests", "In-flight LLM requests", ("provider",),
+        callback=lambda: {(s["provider"],): s["active"] for s in all_admission_stats()},
+    )
+    REGISTRY.gauge(
+        "llm_queue_wait_avg_seconds", "Average admission wait", ("provider",),
+        callback=lambda: {(s["provider"],): s["avg_wait_ms"] / 1000 for s in all_admission_stats()},
+    )
+    REGISTRY.gauge(
+        "llm_shed_requests", "Requests shed by admission control", ("provider", "priority"),
+        callback=lambda: {(s["provider"], p): n for s in all_admission_stats() for p, n in s["shed"].items()},
+    )
+    REGISTRY.gauge(
+        "response_cache_hits", "Response cache lookups by result", ("result",),
+        callback=lambda: {("hit",): npc_agent.cache.hits, ("miss",): npc_agent.cache.misses}
+        if npc_agent.cache else {},
+    )
+    REGISTRY.gauge(
+        "world_entities", "Entities in the world simulation", ("kind",),
+        callback=lambda: {("player",): world.stats()["players"], ("npc",): world.stats()["npcs"]} if world else {},
+    )
+    REGISTRY.gauge(
+        "ambient_pool_exchanges", "Ready NPC chatter exchanges", ("pair",),
+        callback=lambda: {(pair,): n for pair, n in chatter.stats()["pools"].items()} if chatter else {},
+    )
+
+
+def _create_world() -> World:
+    world = World.from_compiled(
+        settings.WORLD_MAP_PATH, cell_size=settings.WORLD_CELL_SIZE, spawn=PLAYER_SPAWN,
+        player_speed=settings.PLAYER_SPEED, player_ttl=settings.WORLD_PLAYER_TTL,
+        meet_distance=settings.WORLD_MEET_DISTANCE, meet_cooldown=settings.WORLD_MEET_COOLDOWN,
+        on_meet=_on_meet,
+    )
+    for npc in NPC_REGISTRY.get_all_npcs():
+        world.add_npc(npc.id, npc.spawn_x, npc.spawn_y, npc.roam_speed, chatty=npc.id not in AMBIENT_EXCLUDED)
+    return world
+
+
+def _on_meet(npc_a: str, npc_b: str) -> None:
+    """Two NPCs stopped for a chat: every v2 socket gets the lines (empty = use canned chatter)."""
+    lines = chatter.take(npc_a, npc_b) if chatter else None
+    frame = {"type": "chatter", "npcs": [npc_a, npc_b], "lines": lines or []}
+    for outbox in world_outboxes.values():
+        outbox.append(frame)
+
+
+def _check_proximity(session_id: str, npc_id: str) -> None:
+    """Gate a chat turn on the world's positions (PROXIMITY_GATE). An accepted
+    turn holds the NPC still so the player stays in reach while it answers.
+    Players that never report a position (HTTP and v1 clients) are only
+    checked, and counted, under "enforce"."""
+    if world is None or settings.PROXIMITY_GATE == "off":
+        return
+    if session_id not in world and settings.PROXIMITY_GATE != "enforce":
+        return
+    if world.can_interact(session_id, npc_id, settings.INTERACTION_DISTANCE + settings.PROXIMITY_SLACK):
+        world.hold(npc_id, settings.WORLD_TALK_HOLD)
+        return
+    PROXIMITY_REJECTIONS.labels(npc_label(npc_id), settings.PROXIMITY_GATE).inc()
+    if settings.PROXIMITY_GATE == "enforce":
+        raise OutOfRange(f"Too far from {NPC_CONFIGS[npc_id]['name']} to talk; walk closer first")
+
+
 @app.get("/health")
 def health():
-    return {"status": "alive"}
+    llm = npc_agent.llm.state if isinstance(npc_agent.llm, LazyLLM) else "ready"
+    return {"status": "alive", "llm": llm}
 
 
 @app.post("/chat")
 async def chat(msg: ChatMessage):
+    try:
+        check_npc(msg.npc_id)
+        _check_proximity(msg.session_id, msg.npc_id)
+    except UnknownNPC as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OutOfRange as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    session = await sessions.get(msg.session_id)
+    mission_manager = session.mission_manager
     try:
         response = await npc_agent.chat(
             npc_id=msg.npc_id, player_message=msg.message,
             inventory=mission_manager.get_inventory(),
             missions_completed={k: v.value for k, v in mission_manager.get_missions().items()},
+            memory=session.memory, priority=_priority(msg.priority), session_id=msg.session_id,
+        )
+        actions = mission_manager.process_npc_actions(
+            response.give_item, response.mission_complete, npc_id=msg.npc_id,
         )
-        actions = mission_manager.process_npc_actions(response.give_item, response.mission_complete)
         return {
             "response": response.message, "give_item": response.give_item,
             "mission_complete": response.mission_complete, "game_actions": actions,
@@ -53,67 +219,512 @@ async def chat(msg: ChatMessage):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await session.commit()
 
 
-@app.websocket("/ws/chat")
-async def websocket_chat(websocket: WebSocket):
-    """Streaming WebSocket — same protocol as PhiloAgents."""
-    await websocket.accept()
-    logger.info("🔌 Player connected")
+def _sse(kind: str, frame: dict) -> str:
+    return f"event: {kind}\ndata: {json.dumps(frame)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(msg: ChatMessage):
+    """Server-Sent Events over plain HTTP: start, chunk, action and done (or error) events,
+    same payloads and session semantics as /ws/chat. Disconnecting cancels the upstream stream."""
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def emit(kind: str, frame: dict) -> None:
+        await queue.put(_sse(kind, frame))
+
+    async def run() -> None:
+        try:
+            await _stream_turn(emit, msg.model_dump(), msg.session_id)
+            SSE_STREAMS.labels("done").inc()
+        except Exception as e:
+            SSE_STREAMS.labels("error").inc()
+            await queue.put(_sse("error", {"error": str(e)}))
+        finally:
+            await queue.put(None)
+
+    async def events():
+        task = asyncio.create_task(run())
+        try:
+            while (frame := await queue.get()) is not None:
+                yield frame  # one body chunk per event, so every token is flushed as it arrives
+        finally:
+            if not task.done():
+                # Client went away (Starlette cancels the body iterator on http.disconnect).
+                SSE_STREAMS.labels("disconnected").inc()
+                task.cancel()
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _priority(value) -> Priority:
+    return Priority.AMBIENT if value == "ambient" else Priority.PLAYER
+
+
+# emit(kind, frame): kind is the v2 frame type; the legacy protocol ignores it.
+Emit = Callable[[str, dict], Awaitable[None]]
+
 
+async def _emit_stream_event(emit: Emit, event: StreamEvent, npc_id: str,
+                             mission_manager: MissionManager, actions: dict, full_state: bool = True) -> None:
+    """Forward clean text as it arrives and apply command tags the moment they close
+    (or reject them, if the quest graph does not allow this grant yet). Clients
+    subscribed to state deltas (`full_state=False`) get no inventory copy."""
+    if event.kind == "text":
+        await emit("chunk", {"chunk": event.value})
+        return
+
+    if event.kind == "give_item":
+        result = mission_manager.process_npc_actions(event.value, None, npc_id=npc_id)
+    else:
+        result = mission_manager.process_npc_actions(None, event.value, npc_id=npc_id)
+    actions["items_received"].extend(result["items_received"])
+    actions["missions_completed"].extend(result["missions_completed"])
+    actions["rejected"].extend(result["rejected"])
+    actions["game_complete"] = result["game_complete"]
+    frame = {"action": event.kind, "value": event.value, "game_actions": result}
+    if full_state:
+        frame["inventory"] = mission_manager.get_inventory()
+    await emit("action", frame)
+
+
+async def _stream_turn(emit: Emit, data: dict, default_session: str, full_state: bool = True) -> None:
+    """Run one streamed NPC turn. Cancelling the caller closes the upstream LLM stream."""
+    session_id = data.get("session_id", default_session)
+    npc_id = data["npc_id"]
+    check_npc(npc_id)
+    _check_proximity(session_id, npc_id)
+    session = await sessions.get(session_id)
+    mission_manager = session.mission_manager
+    await emit("start", {"streaming": True})
+
+    inventory = mission_manager.get_inventory()
+    missions = {k: v.value for k, v in mission_manager.get_missions().items()}
+    opener = prewarmer.take(session_id, npc_id, inventory, missions, session.memory) if prewarmer else None
+
+    parser = CommandStreamParser()
+    actions = {"items_received": [], "missions_completed": [], "rejected": [], "game_complete": False}
+    stream = npc_agent.chat_streaming(
+        npc_id=npc_id, player_message=data["message"],
+        inventory=inventory, missions_completed=missions,
+        memory=session.memory, priority=_priority(data.get("priority")), opener=opener,
+        session_id=session_id,
+    )
     try:
+        async with aclosing(stream):
+            async for chunk in stream:
+                for event in parser.feed(chunk):
+                    await _emit_stream_event(emit, event, npc_id, mission_manager, actions, full_state)
+        for event in parser.close():
+            await _emit_stream_event(emit, event, npc_id, mission_manager, actions, full_state)
+        actions["game_complete"] = mission_manager.is_game_complete()
+    finally:
+        # A cancelled or failed turn may already have written messages or actions.
+        await session.commit()
+
+    frame = {
+        "response": parser.text, "streaming": False,
+        "give_item": parser.give_item, "mission_complete": parser.mission_complete, "game_actions": actions,
+    }
+    if full_state:
+        frame["inventory"] = mission_manager.get_inventory()
+    await emit("done", frame)
+
+
+def _state_sync(session: PlayerSession, epoch: str = None, version: int = None) -> dict:
+    """What a client at (epoch, version) needs: the deltas it missed, or the whole state."""
+    mission_manager = session.mission_manager
+    deltas = mission_manager.deltas_since(epoch, version)
+    if deltas is None:
+        STATE_SYNCS.labels("snapshot").inc()
+        return {"type": "state", **mission_manager.snapshot()}
+    STATE_SYNCS.labels("deltas").inc()
+    return {"type": "delta", "epoch": mission_manager.epoch, "v": mission_manager.version, "deltas": deltas}
+
+
+async def _serve_legacy(websocket: WebSocket, session_id: str) -> None:
+    """v1: one turn at a time, frames matched by arrival order."""
+    async def emit(kind: str, frame: dict) -> None:
+        await websocket.send_json(frame)
+        WS_MESSAGES.labels("out").inc()
+
+    while True:
+        data = await websocket.receive_json()
+        WS_MESSAGES.labels("in").inc()
+
+        if "message" not in data or "npc_id" not in data:
+            await websocket.send_json({"error": "Need 'message' and 'npc_id'"})
+            continue
+        try:
+            await _stream_turn(emit, data, session_id)
+        except Exception as e:
+            await websocket.send_json({"error": str(e)})
+
+
+async def _serve_v2(websocket: WebSocket, session_id: str) -> None:
+    """v2: every frame carries the request `id`; several turns stream at once and can be cancelled.
+
+    Client frames: {"type": "chat", "id", "npc_id", "message"}, {"type": "cancel", "id"},
+    {"type": "approach", "npc_id"}, {"type": "move", "x", "y"}, {"type": "subscribe", "epoch", "v"},
+    {"type": "ping"} / {"type": "pong"}. Server frames: start, chunk, action, done, cancelled, error
+    (each with "id"), ping/pong heartbeats, state / delta (game state, once subscribed) and, with the
+    world enabled, world (nearby NPC positions), position (a rejected move) and chatter.
+
+    After `subscribe` the server pushes every inventory/mission change as a delta frame and stops
+    copying the inventory into action and done frames. Sending the last (epoch, v) seen resyncs with
+    just the missed deltas when it can, a full state frame otherwise.
+    """
+    loop = asyncio.get_running_loop()
+    send_lock = asyncio.Lock()
+    streams: dict[str, asyncio.Task] = {}
+    stream_npcs: dict[str, str] = {}
+    last_seen = last_active = loop.time()
+
+    async def send(frame: dict) -> None:
+        async with send_lock:
+            await websocket.send_json(frame)
+        WS_MESSAGES.labels("out").inc()
+
+    async def run(request_id: str, data: dict) -> None:
+        async def emit(kind: str, frame: dict) -> None:
+            await send({"type": kind, "id": request_id, **frame})
+
+        try:
+            await _stream_turn(emit, data, session_id, full_state=subscription is None)
+            WS_STREAMS.labels("done").inc()
+        except asyncio.CancelledError:
+            WS_STREAMS.labels("cancelled").inc()
+            with suppress(Exception):
+                await send({"type": "cancelled", "id": request_id})
+        except Exception as e:
+            WS_STREAMS.labels("error").inc()
+            with suppress(Exception):
+                await send({"type": "error", "id": request_id, "error": str(e)})
+        finally:
+            streams.pop(request_id, None)
+            stream_npcs.pop(request_id, None)
+
+    async def reject(request_id, error: str) -> None:
+        WS_STREAMS.labels("rejected").inc()
+        await send({"type": "error", "id": request_id, "error": error})
+
+    async def push_world(outbox: deque) -> None:
+        """NPC positions around the player whenever they change, plus queued world events."""
+        last = None
         while True:
-            data = await websocket.receive_json()
+            await asyncio.sleep(1 / settings.WORLD_SNAPSHOT_HZ)
+            world.touch(session_id)
+            while outbox:
+                await send(outbox.popleft())
+            npcs = world.view(session_id, settings.WORLD_VIEW_RADIUS)
+            if npcs != last:
+                await send({"type": "world", "npcs": npcs})
+                last = npcs
 
-            if "message" not in data or "npc_id" not in data:
-                await websocket.send_json({"error": "Need 'message' and 'npc_id'"})
-                continue
+    async def push_state(subscription) -> None:
+        while True:
+            frame = await subscription.get()
+            await send(frame if frame is not None else _state_sync(await sessions.get(session_id)))
+
+    subscription, state_task = None, None
+    world_task, outbox = None, deque(maxlen=32)
+    if world is not None:
+        if session_id not in world:
+            world.add_player(session_id)
+        world_outboxes[websocket] = outbox
+        world_task = asyncio.create_task(push_world(outbox))
 
+    try:
+        while True:
             try:
-                await websocket.send_json({"streaming": True})
-
-                full_response = ""
-                async for chunk in npc_agent.chat_streaming(
-                    npc_id=data["npc_id"], player_message=data["message"],
-                    inventory=mission_manager.get_inventory(),
-                    missions_completed={k: v.value for k, v in mission_manager.get_missions().items()},
-                ):
-                    full_response += chunk
-                    await websocket.send_json({"chunk": chunk})
-
-                give_item = npc_agent._extract_command(full_response, "GIVE_ITEM")
-                mission_complete = npc_agent._extract_command(full_response, "MISSION_COMPLETE")
-                clean = npc_agent._clean_response(full_response)
-                actions = mission_manager.process_npc_actions(give_item, mission_complete)
-
-                await websocket.send_json({
-                    "response": clean, "streaming": False,
-                    "give_item": give_item, "mission_complete": mission_complete,
-                    "game_actions": actions, "inventory": mission_manager.get_inventory(),
-                })
-            except Exception as e:
-                await websocket.send_json({"error": str(e)})
+                data = await asyncio.wait_for(websocket.receive_json(), settings.WS_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                now = loop.time()
+                if now - last_seen > 2 * settings.WS_HEARTBEAT_INTERVAL:
+                    logger.info(f"🔌 Closing unresponsive socket ({session_id})")
+                    await websocket.close(code=1001, reason="heartbeat timeout")
+                    return
+                if not streams and now - last_active > settings.WS_IDLE_TIMEOUT:
+                    logger.info(f"🔌 Closing idle socket ({session_id})")
+                    await websocket.close(code=1000, reason="idle timeout")
+                    return
+                await send({"type": "ping"})
+                continue
+
+            WS_MESSAGES.labels("in").inc()
+            last_seen = loop.time()
+            kind, request_id = data.get("type"), data.get("id")
 
+            if kind == "ping":
+                await send({"type": "pong"})
+            elif kind == "pong":
+                pass
+            elif kind == "approach":
+                await _approach(data.get("npc_id"), data.get("session_id", session_id))
+            elif kind == "subscribe":
+                if subscription is None:
+                    subscription = state_feed.subscribe(session_id)
+                    state_task = asyncio.create_task(push_state(subscription))
+                await send(_state_sync(await sessions.get(session_id), data.get("epoch"), data.get("v")))
+            elif kind == "move":
+                if world is None:
+                    continue
+                try:
+                    x, y = float(data["x"]), float(data["y"])
+                except (KeyError, TypeError, ValueError):
+                    await reject(request_id, "Need numeric 'x' and 'y'")
+                    continue
+                correction = world.move_player(session_id, x, y)
+                if correction:
+                    await send({"type": "position", "x": correction[0], "y": correction[1]})
+            elif kind == "cancel":
+                last_active = last_seen
+                task = streams.get(request_id)
+                if task:
+                    task.cancel()
+            elif kind == "chat":
+                last_active = last_seen
+                if request_id is None or "message" not in data or "npc_id" not in data:
+                    await reject(request_id, "Need 'id', 'message' and 'npc_id'")
+                elif request_id in streams:
+                    await reject(request_id, f"Request '{request_id}' is already streaming")
+                elif len(streams) >= settings.WS_MAX_STREAMS:
+                    await reject(request_id, f"At most {settings.WS_MAX_STREAMS} concurrent streams per socket")
+                elif data["npc_id"] in stream_npcs.values():
+                    await reject(request_id, f"{data['npc_id']} is still answering; cancel it first")
+                else:
+                    stream_npcs[request_id] = data["npc_id"]
+                    streams[request_id] = asyncio.create_task(run(request_id, data))
+            else:
+                await reject(request_id, f"Unknown frame type '{kind}'")
+    finally:
+        for task in list(streams.values()):
+            task.cancel()
+        if world_task:
+            world_task.cancel()
+            world_outboxes.pop(websocket, None)
+        if state_task:
+            state_task.cancel()
+            state_feed.unsubscribe(subscription)
+
+
+@app.websocket("/ws/chat")
+async def websocket_chat(websocket: WebSocket, session_id: str = DEFAULT_SESSION_ID, protocol: str = "v1"):
+    """Streaming WebSocket scoped to one player session.
+
+    The default (v1) is the original PhiloAgents-style protocol; `?protocol=v2`
+    multiplexes concurrent, cancellable turns by request id.
+    """
+    await websocket.accept()
+    logger.info(f"🔌 Player connected ({session_id}, {protocol})")
+    WS_CONNECTIONS.inc()
+    WS_CONNECTIONS_TOTAL.inc()
+
+    try:
+        if protocol == "v2":
+            await _serve_v2(websocket, session_id)
+        else:
+            await _serve_legacy(websocket, session_id)
     except WebSocketDisconnect:
-        logger.info("🔌 Player disconnected")
+        logger.info(f"🔌 Player disconnected ({session_id})")
+    finally:
+        WS_CONNECTIONS.dec()
+
+
+async def _approach(npc_id: str, session_id: str) -> str:
+    if prewarmer is None:
+        return "disabled"
+    try:
+        check_npc(npc_id)
+    except UnknownNPC:
+        return "unknown_npc"
+    try:
+        _check_proximity(session_id, npc_id)
+    except OutOfRange:
+        return "out_of_range"
+    session = await sessions.get(session_id)
+    mission_manager = session.mission_manager
+    return prewarmer.approach(
+        session_id, npc_id, mission_manager.get_inventory(),
+        {k: v.value for k, v in mission_manager.get_missions().items()}, session.memory,
+    )
+
+
+@app.post("/approach")
+async def approach(npc_id: str, session_id: str = DEFAULT_SESSION_ID):
+    """The player is walking up to an NPC: speculatively prepare its opening line."""
+    status = await _approach(npc_id, session_id)
+    if status == "unknown_npc":
+        raise HTTPException(status_code=404, detail=f"Unknown NPC '{npc_id}'")
+    return {"status": status, "npc_id": npc_id, "session_id": session_id}
+
+
+@app.post("/move")
+async def move(x: float, y: float, session_id: str = DEFAULT_SESSION_ID):
+    """Report the player's position (v2 sockets send move frames instead). Returns where the world put it."""
+    if world is None:
+        raise HTTPException(status_code=404, detail="World simulation is disabled")
+    # Only players with a live session enter the world, so made-up ids cannot fill it.
+    if session_id not in world and sessions.peek(session_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown session '{session_id}'; start it with /game-state first")
+    correction = world.move_player(session_id, x, y)
+    x, y = correction or (x, y)
+    return {"x": x, "y": y, "corrected": correction is not None, "session_id": session_id}
+
+
+@app.get("/world/stats")
+def world_stats():
+    if world is None:
+        return {"enabled": False}
+    return {"enabled": True, "proximity_gate": settings.PROXIMITY_GATE, **world.stats()}
+
+
+@app.get("/prewarm/stats")
+def prewarm_stats():
+    if prewarmer is None:
+        return {"enabled": False}
+    return {"enabled": True, **prewarmer.stats()}
 
 
 @app.post("/reset-memory")
-async def reset():
-    npc_agent.reset_memory()
-    mission_manager.reset()
-    return {"status": "reset"}
+async def reset(session_id: str = DEFAULT_SESSION_ID):
+    session = await sessions.get(session_id)
+    session.reset()
+    await session.commit()
+    if world is not None and world.remove(session_id):
+        world.add_player(session_id)  # back to the spawn point
+    return {"status": "reset", "session_id": session_id}
 
 
 @app.get("/game-state")
-def game_state():
-    return {
-        "inventory": mission_manager.get_inventory(),
-        "missions": {k: v.value for k, v in mission_manager.get_missions().items()},
-        "game_complete": mission_manager.is_game_complete(),
-    }
+async def game_state(session_id: str = DEFAULT_SESSION_ID, epoch: str = None, since: int = None):
+    """The player's inventory and missions. With the `epoch` and version (`since`) of an
+    earlier answer, only the changes after it (`deltas`), when they are still known."""
+    frame = _state_sync(await sessions.get(session_id), epoch, since)
+    frame.pop("type")
+    return frame
+
+
+@app.get("/sessions/stats")
+def session_stats():
+    return {**sessions.stats(), "state_feed": state_feed.stats()}
+
+
+@app.get("/admission/stats")
+def admission_stats():
+    return {"providers": all_admission_stats()}
+
+
+@app.get("/npc-chatter")
+async def npc_chatter(npc_a: str, npc_b: str):
+    """A pre-generated exchange between two NPCs. Never calls the LLM; empty `lines` means use canned chatter."""
+    if chatter is None:
+        return {"pair": [npc_a, npc_b], "lines": []}
+    try:
+        lines = chatter.take(npc_a, npc_b)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"pair": [npc_a, npc_b], "lines": lines or []}
+
+
+@app.get("/npc-chatter/stats")
+def npc_chatter_stats():
+    if chatter is None:
+        return {"enabled": False}
+    return {"enabled": True, **chatter.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    if npc_agent.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **npc_agent.cache.stats()}
+
+
+@app.get("/trace/stats")
+def trace_stats():
+    if npc_agent.tracer is None:
+        return {"enabled": False}
+    return {"enabled": True, **npc_agent.tracer.stats()}
+
+
+LLM_WARMUP_MODES = ("startup", "background", "lazy")
+PROXIMITY_GATES = ("enforce", "log", "off")
+
+
+def _check_config() -> None:
+    check_provider()
+    if settings.LLM_WARMUP not in LLM_WARMUP_MODES:
+        raise ValueError(f"LLM_WARMUP must be one of {LLM_WARMUP_MODES}, got '{settings.LLM_WARMUP}'")
+    if settings.COMMAND_MODE not in COMMAND_MODES:
+        raise ValueError(f"COMMAND_MODE must be one of {COMMAND_MODES}, got '{settings.COMMAND_MODE}'")
+    if settings.PROXIMITY_GATE not in PROXIMITY_GATES:
+        raise ValueError(f"PROXIMITY_GATE must be one of {PROXIMITY_GATES}, got '{settings.PROXIMITY_GATE}'")
+
+
+def _check_npcs() -> None:
+    npc_ids = {npc.id for npc in NPC_REGISTRY.get_all_npcs()}
+    for mission in QUESTS.missions.values():
+        if mission.npc not in npc_ids:
+            raise ValueError(f"Mission {mission.id} is given by unknown NPC '{mission.npc}'")
+
+
+def _check_storage() -> None:
+    store = create_store(
+        settings.STORAGE_BACKEND, sqlite_path=settings.SQLITE_PATH,
+        flush_interval=settings.STORAGE_FLUSH_INTERVAL, batch_size=settings.STORAGE_BATCH_SIZE,
+    )
+    if store:
+        store.close()
+
+
+def _check_world() -> None:
+    if not settings.WORLD_ENABLED:
+        return
+    world = _create_world()
+    for npc in NPC_REGISTRY.get_all_npcs():
+        if world.blocked(npc.spawn_x, npc.spawn_y):
+            raise ValueError(f"{npc.id} spawns inside a collider")
+    if world.blocked(*PLAYER_SPAWN):
+        raise ValueError("The player spawns inside a collider")
+
+
+def startup_check() -> bool:
+    """Run every start-up step that can fail without serving (`--check`):
+    settings, NPC and quest data, storage, the world map and building the LLM client.
+    Nothing is sent to the provider. Prints each step with its time."""
+    import time
+    ok = True
+    steps = [("config", _check_config), ("npcs/quests", _check_npcs),
+             ("storage", _check_storage), ("world", _check_world), (f"llm ({settings.LLM_PROVIDER})", create_llm)]
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+            status = "ok"
+        except Exception as e:
+            ok, status = False, f"FAILED: {e}"
+        print(f"  {name:<18} {(time.perf_counter() - start) * 1000:>8.1f} ms  {status}")
+    return ok
 
 
 if __name__ == "__main__":
+    import sys
+    import argparse
+    parser = argparse.ArgumentParser(description="Development server. For production (several workers) use serve.py.")
+    parser.add_argument("--check", action="store_true", help="validate the configuration and exit (0 ok, 1 failed)")
+    if parser.parse_args().check:
+        sys.exit(0 if startup_check() else 1)
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
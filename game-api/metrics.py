@@ -0,0 +1,243 @@
+"""
+Minimal in-process Prometheus-style metrics: counters, gauges and histograms
+rendered in the text exposition format at /metrics. No collector required.
+
+Hot-path cost is a dict lookup plus an add (counters) or a bisect (histograms);
+label children are created once and cached.
+"""
+import time
+import asyncio
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (0, 2, 5, 10, 20, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> list[str]:
+        return [f"{self.name}{_format_labels(self.label_names, values)} {child.value}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), callback: Callable = None):
+        super().__init__(name, help, labels)
+        self.callback = callback  # optional: returns {label values tuple: value} at scrape time
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def render(self) -> list[str]:
+        if self.callback:
+            for values, value in self.callback().items():
+                self.labels(*values).set(value)
+        return super().render()
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, values, child) -> list[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), child.counts):
+            cumulative += count
+            le = _format_labels(self.label_names, values, f'le="{bound}"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        base = _format_labels(self.label_names, values)
+        lines.append(f"{self.name}_sum{base} {child.sum}")
+        lines.append(f"{self.name}_count{base} {child.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = (), callback: Callable = None) -> Gauge:
+        return self.register(Gauge(name, help, labels, callback))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency", ("route", "method", "status"))
+WS_CONNECTIONS = REGISTRY.gauge("ws_connections_active", "Open WebSocket connections")
+WS_CONNECTIONS_TOTAL = REGISTRY.counter("ws_connections_total", "WebSocket connections accepted")
+WS_MESSAGES = REGISTRY.counter("ws_messages_total", "WebSocket frames", ("direction",))
+SSE_STREAMS = REGISTRY.counter("sse_streams_total", "/chat/stream responses by outcome", ("outcome",))
+WS_STREAMS = REGISTRY.counter("ws_streams_total", "v2 WebSocket turns by outcome", ("outcome",))
+
+LLM_REQUESTS = REGISTRY.counter("llm_requests_total", "NPC turns by outcome", ("npc", "outcome"))
+LLM_TTFT = REGISTRY.histogram("llm_time_to_first_token_seconds", "Time to first streamed token", ("npc",))
+LLM_DURATION = REGISTRY.histogram("llm_response_seconds", "Total LLM call / stream time", ("npc", "mode"))
+PROMPT_BUILD = REGISTRY.histogram(
+    "prompt_build_seconds", "System prompt + context assembly time", ("npc",),
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05),
+)
+INPUT_TOKENS = REGISTRY.histogram("llm_input_tokens", "Input tokens per request", ("npc",),
+                                  buckets=(100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 8000))
+HISTORY_LENGTH = REGISTRY.histogram("conversation_history_messages", "History messages per turn", ("npc",),
+                                    buckets=SIZE_BUCKETS)
+SUMMARY_SIZE = REGISTRY.histogram("conversation_summary_chars", "Summary length per turn", ("npc",),
+                                  buckets=SIZE_BUCKETS)
+COMMAND_PARSE_FAILURES = REGISTRY.counter("command_parse_failures_total",
+                                          "Malformed command tags or unusable tool calls", ("npc", "mode"))
+NPC_ACTIONS = REGISTRY.counter("npc_actions_total", "process_npc_actions outcomes", ("outcome",))
+PREWARM_EVENTS = REGISTRY.counter("prewarm_events_total", "Speculative greeting outcomes", ("outcome",))
+PREWARM_TOKENS = REGISTRY.counter("prewarm_tokens_total", "Speculative greeting tokens", ("result",))
+AMBIENT_EXCHANGES = REGISTRY.counter("ambient_exchanges_total", "NPC chatter pool events", ("outcome",))
+STATE_DELTAS = REGISTRY.counter("state_deltas_total", "Game-state delta frames for subscribed sockets", ("outcome",))
+STATE_SYNCS = REGISTRY.counter("state_syncs_total", "Game-state resyncs by what was sent", ("result",))
+WORLD_TICK = REGISTRY.histogram("world_tick_seconds", "World simulation tick time",
+                                buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05))
+PROXIMITY_REJECTIONS = REGISTRY.counter("proximity_rejections_total",
+                                        "Chat turns from players out of reach of the NPC", ("npc", "mode"))
+STORAGE_WRITES = REGISTRY.counter("storage_writes_total", "Write-behind store writes by outcome", ("outcome",))
+EVENT_LOOP_LAG = REGISTRY.histogram("event_loop_lag_seconds", "Event loop scheduling delay",
+                                    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route HTTP latency (WebSockets pass through)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_LATENCY.labels(path, scope["method"], status).observe(time.perf_counter() - start)
+
+
+async def monitor_event_loop(interval: float = 0.5) -> None:
+    """Sample how late the loop wakes us up — a direct measure of blocking work."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(loop.time() - start - interval, 0.0))
@@ -0,0 +1,51 @@
+"""
+Production entry point: N uvicorn worker processes sharing player state.
+
+    cd game-api
+    python serve.py --workers 4 --port 8000
+    python serve.py --check          # validate settings, data, storage and LLM client, then exit
+
+Every worker keeps its own live sessions, admission limits and caches, but
+inventory, missions and conversations live in the SQLite store (WAL mode).
+Each turn is flushed and versioned before its final frame is sent, so a
+player who reconnects to a different worker (or whose HTTP requests are
+spread across workers) always continues from their latest state.
+WebSockets stay on the worker that accepted them.
+"""
+import os
+import argparse
+import uvicorn
+
+from config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.API_HOST)
+    parser.add_argument("--port", type=int, default=settings.API_PORT)
+    parser.add_argument("--workers", type=int, default=settings.WORKERS, help="worker processes; 0 means one per CPU")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--check", action="store_true", help="validate the configuration and exit (0 ok, 1 failed)")
+    args = parser.parse_args()
+
+    if args.check:
+        from main import startup_check
+        raise SystemExit(0 if startup_check() else 1)
+
+    if args.workers <= 0:
+        args.workers = os.cpu_count() or 1
+    # Workers are fresh processes that read their settings from the environment.
+    os.environ["WORKERS"] = str(args.workers)
+    if args.workers > 1 and settings.STORAGE_BACKEND != "sqlite":
+        if settings.STORAGE_BACKEND != "none":
+            parser.error(f"--workers {args.workers} needs STORAGE_BACKEND=sqlite, got '{settings.STORAGE_BACKEND}'")
+        os.environ["STORAGE_BACKEND"] = "sqlite"
+
+    uvicorn.run(
+        "main:app", host=args.host, port=args.port, workers=args.workers,
+        log_level=args.log_level, proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
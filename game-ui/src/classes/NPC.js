@@ -72,6 +72,9 @@ export default class NPC {
         this.roamState = 'idle'; // idle, walking, pausing
         this.isDragon = config.isDragon || false;
 
+        // Set once the server's world simulation moves this NPC; local roaming then stops
+        this.serverTarget = null;
+
         // Start roaming
         this._scheduleNextAction();
     }
@@ -112,7 +115,7 @@ export default class NPC {
     }
 
     _doAction() {
-        if (!this.sprite || !this.sprite.active) return;
+        if (!this.sprite || !this.sprite.active || this.serverTarget) return;
 
         // Dragon paces more aggressively
         const speed = this.isDragon ? 45 : 30;
@@ -182,6 +185,29 @@ export default class NPC {
         }
     }
 
+    /** Position from the server's world frame; update() walks the sprite there. */
+    setServerPosition(x, y) {
+        this.serverTarget = { x, y };
+    }
+
+    _followServer() {
+        const dx = this.serverTarget.x - this.sprite.x;
+        const dy = this.serverTarget.y - this.sprite.y;
+        const dist = Math.hypot(dx, dy);
+        if (dist > 48) {
+            // Too far behind (tab was hidden, dialogue was open): jump there
+            this.sprite.setPosition(this.serverTarget.x, this.serverTarget.y);
+            this.sprite.setVelocity(0);
+        } else if (dist > 1) {
+            // Close the gap within about one snapshot interval
+            this.sprite.setVelocity(dx * 8, dy * 8);
+            if (!this.isChatting) this._playDirectionAnim(dx, dy);
+        } else {
+            this.sprite.setVelocity(0);
+            if (!this.isChatting) this._stopAnim();
+        }
+    }
+
     isPlayerNearby(playerSprite, dist = 60) {
         return Phaser.Math.Distance.Between(
             playerSprite.x, playerSprite.y, this.sprite.x, this.sprite.y
@@ -205,15 +231,35 @@ export default class NPC {
 
         if (dist > 100) return false;
 
-        // Find conversation lines
-        const pairKey1 = `${this.npcId}-${otherNpc.npcId}`;
-        const pairKey2 = `${otherNpc.npcId}-${this.npcId}`;
-        let lines = NPC_CHATTER[pairKey1] || NPC_CHATTER[pairKey2];
-        if (!lines) return false;
+        // Prefer a server-generated exchange; fall back to canned lines
+        const served = this.scene.takeChatter ? this.scene.takeChatter(this.npcId, otherNpc.npcId) : null;
+        return this.chatWith(otherNpc, served);
+    }
 
-        const exchange = lines[Phaser.Math.Between(0, lines.length - 1)];
-        const isFirstSpeaker = !!NPC_CHATTER[pairKey1];
+    /**
+     * Play an exchange with another NPC: `served` lines of {npc_id, text}, or
+     * canned lines for the pair when null. Returns false if there is nothing to say.
+     */
+    chatWith(otherNpc, served = null) {
+        let script;
+        if (served) {
+            script = served.map(line => ({
+                speaker: line.npc_id === this.npcId ? this : otherNpc, text: line.text,
+            }));
+        } else {
+            const pairKey1 = `${this.npcId}-${otherNpc.npcId}`;
+            const pairKey2 = `${otherNpc.npcId}-${this.npcId}`;
+            const lines = NPC_CHATTER[pairKey1] || NPC_CHATTER[pairKey2];
+            if (!lines) return false;
+
+            const exchange = lines[Phaser.Math.Between(0, lines.length - 1)];
+            const isFirstSpeaker = !!NPC_CHATTER[pairKey1];
+            const speaker1 = isFirstSpeaker ? this : otherNpc;
+            const speaker2 = isFirstSpeaker ? otherNpc : this;
+            script = [{ speaker: speaker1, text: exchange.a }, { speaker: speaker2, text: exchange.b }];
+        }
 
+        const now = Date.now();
         this.isChatting = true;
         otherNpc.isChatting = true;
         this.lastChatTime = now;
@@ -234,25 +280,18 @@ export default class NPC {
             otherNpc._tryPlay('right');
         }
 
-        // First NPC speaks
-        const speaker1 = isFirstSpeaker ? this : otherNpc;
-        const speaker2 = isFirstSpeaker ? otherNpc : this;
-
-        speaker1.bubble.show(
-            speaker1.sprite.x, speaker1.sprite.y,
-            speaker1.displayName, exchange.a, 3000
-        );
-
-        // Second NPC responds after a delay
-        this.scene.time.delayedCall(2000, () => {
-            speaker2.bubble.show(
-                speaker2.sprite.x, speaker2.sprite.y,
-                speaker2.displayName, exchange.b, 3000
-            );
+        // Speakers take turns, one line every 2 seconds
+        script.forEach(({ speaker, text }, i) => {
+            this.scene.time.delayedCall(i * 2000, () => {
+                speaker.bubble.show(
+                    speaker.sprite.x, speaker.sprite.y,
+                    speaker.displayName, text, 3000
+                );
+            });
         });
 
         // Free both after conversation
-        this.scene.time.delayedCall(5000, () => {
+        this.scene.time.delayedCall(script.length * 2000 + 1000, () => {
             this.isChatting = false;
             otherNpc.isChatting = false;
         });
@@ -262,6 +301,7 @@ export default class NPC {
 
     update() {
         if (!this.sprite || !this.sprite.active) return;
+        if (this.serverTarget) this._followServer();
         this.label.setPosition(this.sprite.x, this.sprite.y - 30);
 
         // Update bubble position if active
@@ -4,20 +4,64 @@ import Phaser from 'phaser';
  * Renderer for the Tiny Swords custom map format.
  * The map JSON uses {id, x, y} tile entries per layer,
  * where 'id' is the sprite index in the spritesheet.
+ *
+ * `compiled` is the header written by compile_map.py (tilemaps/village/map.json).
+ * Its merged collider rectangles replace one physics body per collider tile.
  */
 export default class TinySwordsMap {
-    constructor(scene, mapData, textureKey) {
+    constructor(scene, mapData, textureKey, compiled = null) {
         this.scene = scene;
         this.mapData = mapData;
         this.tileSize = mapData.tileSize || 64;
         this.mapWidth = mapData.mapWidth || 29;
         this.mapHeight = mapData.mapHeight || 16;
         this.textureKey = textureKey;
+        this.compiledColliders = this._compiledColliders(compiled);
 
         // Collision group for physics
         this.colliders = scene.physics.add.staticGroup();
 
         this._render();
+        if (this.compiledColliders) this.compiledColliders.forEach(rect => this._addCollider(...rect));
+    }
+
+    /** Collider rectangles from the compiled map, or null if it is missing or no longer matches the map data */
+    _compiledColliders(compiled) {
+        if (!compiled || !Array.isArray(compiled.colliders)) return null;
+        const layers = this.mapData.layers || [];
+        const sameMap = compiled.mapWidth === this.mapWidth && compiled.mapHeight === this.mapHeight
+            && compiled.layers.length === layers.length
+            && compiled.layers.every((l, i) => l.name === layers[i].name && l.collider === !!layers[i].collider)
+            && this._coversColliderTiles(compiled.colliders, layers);
+        if (!sameMap) {
+            console.warn('Compiled map does not match the map data — run compile_map.py; using per-tile colliders');
+            return null;
+        }
+        return compiled.colliders;
+    }
+
+    /** Whether the (non-overlapping) rectangles cover exactly the collider tiles, so a map edited since it was compiled is caught */
+    _coversColliderTiles(rects, layers) {
+        const solid = new Set();
+        layers.filter(l => l.collider).forEach(l => (l.tiles || []).forEach(t => solid.add(t.y * this.mapWidth + t.x)));
+        let area = 0;
+        for (const [x, y, w, h] of rects) {
+            for (let ty = y; ty < y + h; ty++) {
+                for (let tx = x; tx < x + w; tx++) {
+                    if (!solid.has(ty * this.mapWidth + tx)) return false;
+                    area++;
+                }
+            }
+        }
+        return area === solid.size;
+    }
+
+    /** Invisible static body over tiles [x, x+w) × [y, y+h), inset like the per-tile bodies (80% of a tile) */
+    _addCollider(x, y, w, h) {
+        const inset = this.tileSize * 0.2;
+        const body = this.colliders.create((x + w / 2) * this.tileSize, (y + h / 2) * this.tileSize, null);
+        body.setVisible(false);
+        body.body.setSize(w * this.tileSize - inset, h * this.tileSize - inset);
     }
 
     /** Width in pixels */
@@ -44,11 +88,9 @@ export default class TinySwordsMap {
                 const sprite = this.scene.add.sprite(px, py, this.textureKey, frameIndex);
                 sprite.setDepth(depth);
 
-                // If this layer has colliders, add invisible physics bodies
-                if (layer.collider) {
-                    const body = this.colliders.create(px, py, null);
-                    body.setVisible(false);
-                    body.body.setSize(this.tileSize * 0.8, this.tileSize * 0.8);
+                // If this layer has colliders and there is no compiled map, one body per tile
+                if (layer.collider && !this.compiledColliders) {
+                    this._addCollider(tile.x, tile.y, 1, 1);
                 }
             });
         });
@@ -14,7 +14,7 @@ export default class GameScene extends Phaser.Scene {
     create() {
         // Load the Tiny Swords map
         const mapData = this.cache.json.get('mapData');
-        this.villageMap = new TinySwordsMap(this, mapData, 'tileset');
+        this.villageMap = new TinySwordsMap(this, mapData, 'tileset', this.cache.json.get('mapCompiled'));
 
         // Set world bounds to map size
         this.physics.world.setBounds(0, 0, this.villageMap.widthInPixels, this.villageMap.heightInPixels);
@@ -43,6 +43,7 @@ export default class GameScene extends Phaser.Scene {
         this.dragon.sprite.setImmovable(true);
         this.dragon.label.setStyle({ fontSize: '12px', fill: '#ff4444', backgroundColor: '#00000088' });
         this.npcs.push(this.dragon);
+        this.dragonDown = false;
 
         // Collisions for all NPCs
         this.npcs.forEach(npc => {
@@ -62,8 +63,13 @@ export default class GameScene extends Phaser.Scene {
         // Dialogue & WebSocket
         this.dialogueBox = new DialogueBox(this);
         this.ws = new WebSocketService();
+        this._listenToWorld();
         this.ws.connect().catch(e => console.warn('Backend not running yet:', e));
 
+        // Server-generated NPC chatter, fetched per NPC pair once that pair first meets
+        this.chatterQueue = {};
+        this.chatterPending = new Set();
+
         // Input
         this.spaceKey = this.input.keyboard.addKey('SPACE');
         this.escKey = this.input.keyboard.addKey('ESC');
@@ -116,6 +122,7 @@ export default class GameScene extends Phaser.Scene {
     update() {
         if (this.inDialogue) {
             if (Phaser.Input.Keyboard.JustDown(this.escKey)) {
+                this.ws.cancelAll();
                 this.dialogueBox.hide();
                 this.inDialogue = false;
                 this.player.unfreeze();
@@ -126,6 +133,7 @@ export default class GameScene extends Phaser.Scene {
 
         this.player.update();
         this.npcs.forEach(n => n.update());
+        this.ws.move(this.player.sprite.x, this.player.sprite.y);
 
         // Check proximity to NPCs for hint
         let nearNpc = null;
@@ -137,16 +145,59 @@ export default class GameScene extends Phaser.Scene {
         }
         this.hintText.setText(nearNpc ? `Press SPACE to talk to ${nearNpc.displayName}` : '');
 
+        // Let the backend start on the NPC's greeting while the player decides to talk
+        if (nearNpc && nearNpc !== this.approachedNpc) this.ws.approach(nearNpc.npcId);
+        this.approachedNpc = nearNpc;
+
         if (Phaser.Input.Keyboard.JustDown(this.spaceKey) && nearNpc) {
             this.startDialogue(nearNpc);
         }
     }
 
+    /**
+     * The server's world simulation owns NPC positions, NPC-NPC chatter and, when it
+     * disagrees with a move, the player's position. Without it the NPCs roam locally.
+     */
+    _listenToWorld() {
+        this.serverWorld = false;
+        const byId = id => this.npcs.find(n => n.npcId === id);
+        this.ws.on('world', (frame) => {
+            this.serverWorld = true;
+            frame.npcs.forEach(([id, x, y]) => byId(id)?.setServerPosition(x, y));
+        });
+        this.ws.on('position', (frame) => this.player.sprite.setPosition(frame.x, frame.y));
+        this.ws.on('chatter', (frame) => {
+            const [a, b] = frame.npcs.map(byId);
+            if (a && b && !this.inDialogue) a.chatWith(b, frame.lines.length ? frame.lines : null);
+        });
+        this.ws.on('state', (state, deltas) => this._onGameState(state, deltas));
+    }
+
+    /**
+     * The server pushes game-state changes as they happen: a full snapshot on connect, then
+     * deltas. The HUD is redrawn from the state; the dragon and victory effects play on the
+     * delta that caused them (or silently, from a snapshot, after a reload).
+     */
+    _onGameState(state, deltas) {
+        this._updateInventory(state.inventory);
+        this._updateMissionTracker(state.missions);
+
+        if (state.missions.dragon_quest === 'completed' && !this.dragonDown) {
+            this._dragonDefeated(deltas.length > 0);
+        }
+        if (deltas.some(d => d.op === 'complete')) {
+            this.time.delayedCall(2000, () => {
+                this.dialogueBox.showResponse('🎉 VICTORY!',
+                    'All missions complete! The dragon is slain and the village is saved! You are the greatest hero!');
+            });
+        }
+    }
+
     /**
      * Periodically check if any NPCs are near each other and trigger conversations.
      */
     _tryNpcConversations() {
-        if (this.inDialogue) return;
+        if (this.inDialogue || this.serverWorld) return;
 
         // Only check friendly NPCs (not dragon)
         const friendlies = this.npcs.filter(n => n.npcId !== 'dragon');
@@ -160,6 +211,30 @@ export default class GameScene extends Phaser.Scene {
         }
     }
 
+    _chatterKey(npcA, npcB) {
+        return [npcA, npcB].sort().join('-');
+    }
+
+    async _prefetchChatter(npcA, npcB) {
+        const key = this._chatterKey(npcA, npcB);
+        if (this.chatterPending.has(key)) return;
+        this.chatterPending.add(key);
+        const lines = await this.ws.fetchChatter(npcA, npcB);
+        this.chatterPending.delete(key);
+        if (lines.length) (this.chatterQueue[key] ||= []).push(lines);
+    }
+
+    /**
+     * Next server-generated exchange for the pair (lines of {npc_id, text}), or null
+     * to fall back to canned chatter. Always fetches the next one in the background.
+     */
+    takeChatter(npcA, npcB) {
+        const queue = this.chatterQueue[this._chatterKey(npcA, npcB)];
+        const lines = queue && queue.length ? queue.shift() : null;
+        this._prefetchChatter(npcA, npcB);
+        return lines;
+    }
+
     startDialogue(npc) {
         this.inDialogue = true;
         this.player.freeze();
@@ -176,40 +251,23 @@ export default class GameScene extends Phaser.Scene {
         this.dialogueBox.enableInput(async (text) => {
             this.dialogueBox.showLoading();
             try {
+                // Inventory, missions and the dragon's fate arrive as state deltas
                 const resp = await this.ws.sendMessage(npc.npcId, text);
+                if (resp.cancelled) return;
                 this.dialogueBox.showResponse(npc.displayName, resp.response || '...');
-
-                // Update inventory display
-                if (resp.inventory) {
-                    const items = resp.inventory.length ? resp.inventory.join(', ') : '(empty)';
-                    this.invText.setText('🎒 Inventory: ' + items);
-                }
-
-                // Update mission tracker
-                if (resp.missions_completed) {
-                    this._updateMissionTracker(resp);
-                }
-
-                // Dragon defeated!
-                if (resp.game_actions?.missions_completed?.includes('dragon_quest')) {
-                    this._dragonDefeated();
-                }
-
-                // Game complete
-                if (resp.game_actions?.game_complete) {
-                    this.time.delayedCall(2000, () => {
-                        this.dialogueBox.showResponse('🎉 VICTORY!',
-                            'All missions complete! The dragon is slain and the village is saved! You are the greatest hero!');
-                    });
-                }
             } catch (e) {
                 this.dialogueBox.showResponse(npc.displayName, '*seems lost in thought...*');
             }
         });
     }
 
-    _updateMissionTracker(resp) {
-        const missions = resp.game_actions || {};
+    _updateInventory(inventory) {
+        if (!inventory) return;
+        const items = inventory.length ? inventory.join(', ') : '(empty)';
+        this.invText.setText('🎒 Inventory: ' + items);
+    }
+
+    _updateMissionTracker(missions) {
         let tracker = '📜 Missions:\n';
 
         const missionNames = {
@@ -220,23 +278,25 @@ export default class GameScene extends Phaser.Scene {
             'dragon_quest': 'Slay the Dragon'
         };
 
-        if (missions.missions_completed) {
-            missions.missions_completed.forEach(m => {
+        Object.entries(missions)
+            .filter(([, status]) => status === 'completed')
+            .forEach(([m]) => {
                 tracker += ` ✅ ${missionNames[m] || m}\n`;
             });
-        }
 
         this.missionText.setText(tracker);
     }
 
-    _dragonDefeated() {
+    _dragonDefeated(animate = true) {
+        this.dragonDown = true;
+
         // Visual feedback — dragon shrinks and turns red
         this.tweens.add({
             targets: this.dragon.sprite,
             scaleX: 0.3,
             scaleY: 0.3,
             alpha: 0.4,
-            duration: 2000,
+            duration: animate ? 2000 : 0,
             ease: 'Sine.easeOut'
         });
 
@@ -245,6 +305,7 @@ export default class GameScene extends Phaser.Scene {
         this.dragon.label.setStyle({ fill: '#888888' });
 
         // Screen flash
+        if (!animate) return;
         this.cameras.main.flash(500, 255, 200, 50);
         this.cameras.main.shake(300, 0.01);
     }
@@ -23,6 +23,8 @@ export default class PreloaderScene extends Phaser.Scene {
 
         // Map data (custom Tiny Swords JSON format)
         this.load.json('mapData', 'assets/tilemaps/village.json');
+        // Merged collider rectangles (python compile_map.py)
+        this.load.json('mapCompiled', 'assets/tilemaps/village/map.json');
 
         // Player and NPC placeholder spritesheets — generate in create()
         this.load.on('loaderror', (file) => {
@@ -3,38 +3,183 @@ export default class WebSocketService {
         this.socket = null;
         this.connected = false;
         this.baseUrl = 'ws://localhost:8000';
+        this.sessionId = WebSocketService.getSessionId();
+        this.pending = new Map();   // request id -> { resolve, onAction }
+        this.nextId = 1;
+        this.handlers = {};         // world frame type -> callback
+        this.lastMove = { x: null, y: null, at: 0 };
+        this.state = WebSocketService.emptyState();
+    }
+
+    /** Game state before the server's first snapshot; also what a 'reset' delta returns to. */
+    static emptyState() {
+        return { epoch: null, v: 0, inventory: [], missions: {}, game_complete: false };
+    }
+
+    /** Stable per-browser player id so each player gets their own inventory and NPC memory. */
+    static getSessionId() {
+        let id = localStorage.getItem('sessionId');
+        if (!id) {
+            id = crypto.randomUUID();
+            localStorage.setItem('sessionId', id);
+        }
+        return id;
     }
 
     connect() {
         return new Promise((resolve, reject) => {
-            this.socket = new WebSocket(`${this.baseUrl}/ws/chat`);
-            this.socket.onopen = () => { this.connected = true; console.log('WS connected'); resolve(); };
+            this.socket = new WebSocket(`${this.baseUrl}/ws/chat?session_id=${this.sessionId}&protocol=v2`);
+            this.socket.onopen = () => {
+                this.connected = true;
+                console.log('WS connected');
+                this._subscribe();
+                resolve();
+            };
             this.socket.onerror = (e) => { console.error('WS error', e); reject(e); };
-            this.socket.onclose = () => { this.connected = false; console.log('WS closed'); };
+            this.socket.onmessage = (event) => this._onFrame(JSON.parse(event.data));
+            this.socket.onclose = () => {
+                this.connected = false;
+                console.log('WS closed');
+                // Streams die with the socket; settle them so the UI never hangs
+                this.pending.forEach(({ resolve }) => resolve({ cancelled: true }));
+                this.pending.clear();
+            };
         });
     }
 
-    async sendMessage(npcId, message) {
-        if (!this.connected) await this.connect();
+    /**
+     * Listen for server world frames: 'world' (nearby NPC positions), 'position' (a rejected move),
+     * 'chatter'; and 'state', called with (state, deltas) whenever the game state changes.
+     */
+    on(type, handler) {
+        this.handlers[type] = handler;
+    }
+
+    /** Route a v2 frame to the request it belongs to. */
+    _onFrame(data) {
+        if (data.type === 'ping') {
+            this.socket.send(JSON.stringify({ type: 'pong' }));
+            return;
+        }
+        if (data.type === 'state' || data.type === 'delta') {
+            this._onState(data);
+            return;
+        }
+        if (this.handlers[data.type] && data.id === undefined) {
+            this.handlers[data.type](data);
+            return;
+        }
+        const request = this.pending.get(data.id);
+        if (!request) return;
 
-        return new Promise((resolve) => {
-            this.socket.send(JSON.stringify({ npc_id: npcId, message }));
+        if (data.type === 'action' && request.onAction) request.onAction(data);
+        if (data.type === 'done' || data.type === 'cancelled' || data.type === 'error') {
+            this.pending.delete(data.id);
+            if (data.type === 'error') request.reject(new Error(data.error));
+            else request.resolve(data.type === 'cancelled' ? { cancelled: true } : data);
+        }
+    }
 
-            const chunks = [];
-            const handler = (event) => {
-                const data = JSON.parse(event.data);
-                if (data.chunk) chunks.push(data.chunk);
-                if (data.response !== undefined) {
-                    this.socket.removeEventListener('message', handler);
-                    resolve(data);
+    /**
+     * Ask the server to push game-state changes to this socket. Sending the version we
+     * already have (after a reconnect) gets just the deltas we missed.
+     */
+    _subscribe() {
+        const { epoch, v } = this.state;
+        this.socket.send(JSON.stringify(epoch ? { type: 'subscribe', epoch, v } : { type: 'subscribe' }));
+    }
+
+    /**
+     * Apply a 'state' snapshot or a batch of deltas. Deltas we already have are skipped; a gap
+     * or another epoch (the server restarted or reloaded the session) means we resubscribe
+     * from scratch and wait for the snapshot.
+     */
+    _onState(frame) {
+        let applied = [];
+        if (frame.type === 'state') {
+            const { type, ...state } = frame;
+            this.state = state;
+        } else {
+            if (frame.epoch !== this.state.epoch) {
+                this.state = WebSocketService.emptyState();
+                this._subscribe();
+                return;
+            }
+            for (const delta of frame.deltas) {
+                if (delta.v <= this.state.v) continue;
+                if (delta.v !== this.state.v + 1) {
+                    this.state.epoch = null;
+                    this._subscribe();
+                    return;
                 }
-            };
-            this.socket.addEventListener('message', handler);
+                this._applyDelta(delta);
+                applied.push(delta);
+            }
+            if (!applied.length) return;
+        }
+        this.handlers.state?.(this.state, applied);
+    }
+
+    _applyDelta(delta) {
+        const state = this.state;
+        if (delta.op === 'item') state.inventory = [...state.inventory, delta.id];
+        else if (delta.op === 'mission') state.missions = { ...state.missions, [delta.id]: delta.status };
+        else if (delta.op === 'complete') state.game_complete = true;
+        else if (delta.op === 'reset') Object.assign(state, WebSocketService.emptyState(), { epoch: state.epoch });
+        state.v = delta.v;
+    }
+
+    /**
+     * Send a message and resolve with the final frame ({ cancelled: true } if cancelled).
+     * `onAction` is called mid-stream whenever the NPC hands over an item or completes a mission;
+     * the resulting state arrives separately through on('state').
+     * Several messages can be in flight at once; replies are matched by request id.
+     */
+    async sendMessage(npcId, message, onAction = null) {
+        if (!this.connected) await this.connect();
+
+        const id = String(this.nextId++);
+        return new Promise((resolve, reject) => {
+            this.pending.set(id, { resolve, reject, onAction });
+            this.socket.send(JSON.stringify({ type: 'chat', id, npc_id: npcId, message }));
         });
     }
 
+    /** Tell the server the player is walking up to an NPC so it can prepare a greeting. */
+    approach(npcId) {
+        if (!this.connected) return;
+        this.socket.send(JSON.stringify({ type: 'approach', npc_id: npcId }));
+    }
+
+    /** Report the player's position; at most 10 frames a second, and only when it changed. */
+    move(x, y) {
+        if (!this.connected) return;
+        const now = performance.now();
+        const last = this.lastMove;
+        if (now - last.at < 100 || (Math.abs(x - last.x) < 1 && Math.abs(y - last.y) < 1)) return;
+        this.lastMove = { x, y, at: now };
+        this.socket.send(JSON.stringify({ type: 'move', x: Math.round(x), y: Math.round(y) }));
+    }
+
+    /** Stop every in-flight NPC reply (the server aborts the upstream LLM stream). */
+    cancelAll() {
+        if (!this.connected) return;
+        this.pending.forEach((_, id) => this.socket.send(JSON.stringify({ type: 'cancel', id })));
+    }
+
+    /** Pre-generated NPC-NPC exchange from the server's pool; [] when none is ready or the backend is down. */
+    async fetchChatter(npcA, npcB) {
+        try {
+            const resp = await fetch(`http://localhost:8000/npc-chatter?npc_a=${npcA}&npc_b=${npcB}`);
+            if (!resp.ok) return [];
+            return (await resp.json()).lines;
+        } catch (e) {
+            return [];
+        }
+    }
+
     async resetGame() {
-        const resp = await fetch('http://localhost:8000/reset-memory', { method: 'POST' });
+        const resp = await fetch(`http://localhost:8000/reset-memory?session_id=${this.sessionId}`, { method: 'POST' });
         return resp.json();
     }
 }
\ No newline at end of file
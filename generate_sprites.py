@@ -1,167 +1,338 @@
 """
 Generate pixel art character spritesheets (32x48 per frame, 4 cols × 4 rows).
 Rows: Down, Up, Left, Right — 4 walking frames each.
+
+Each character is a palette plus a stack of layer functions. A layer draws
+rectangles and ellipses with coordinates that are NumPy arrays over all 16
+frames, so one call paints a shape into every frame at once (palette indices
+into a (frames, h, w) array). Sheets are rendered in a process pool, and a
+sheet is only rebuilt when the hash of its palette and layer source changes.
+
+    python generate_sprites.py                      # build what changed
+    python generate_sprites.py --force --jobs 4     # rebuild everything
+    python generate_sprites.py --out build/sprites --only wizard dragon
+    python generate_sprites.py --bench              # full vs no-op rebuild times
 """
+import os
+import json
+import time
+import hashlib
+import inspect
+import argparse
+import tempfile
+from pathlib import Path
+from functools import lru_cache
+from typing import Callable, NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from PIL import Image, ImageDraw
 
-def draw_character(draw, x, y, direction, frame, palette):
-    """Draw a single character frame at (x, y) with the given palette and direction."""
-    skin = palette['skin']
-    hair = palette['hair']
-    body = palette['body']
-    body2 = palette['body2']
-    legs = palette['legs']
-    shoes = palette['shoes']
-    accent = palette.get('accent', body)
-    
-    # Walking bounce
-    bounce = -1 if frame % 2 == 0 else 0
-    leg_offset = 2 if frame % 2 == 0 else -2
-    arm_swing = 1 if frame % 2 == 0 else -1
-    
-    facing_down = direction == 0
-    facing_up = direction == 1
-    facing_left = direction == 2
-    facing_right = direction == 3
-    
+
+DEFAULT_OUT = Path(__file__).parent / "game-ui" / "public" / "assets" / "sprites"
+MANIFEST = ".sprite-hashes.json"
+# Part of every sheet hash: bump when the canvas classes or helpers below change output.
+RENDER_VERSION = 1
+# Shapes may stick out of their frame (the wizard's hat tip does, by 10px) and
+# land in the neighbouring frame, so frames are rendered with this margin.
+PAD = 12
+# A palette key a sheet may leave out, and the key it falls back to.
+COLOR_FALLBACK = {"accent": "body"}
+
+EYE = (30, 30, 30)
+MOUTH = (180, 100, 100)
+
+
+class FrameBatch:
+    """All frames of one sheet as a (frames, h, w) array of palette indices.
+
+    `direction` and `frame` hold each frame's row and column. Shape
+    coordinates are scalars or arrays over the frames; `when` limits a shape
+    to some frames. Index 0 is transparent. Indices stand for palette keys
+    (or literal colors), so one render can be recolored with any palette.
+    """
+
+    def __init__(self, palette: dict, frame_size: tuple[int, int], cols: int = 4, rows: int = 4):
+        self.palette = palette
+        self.frame_size = frame_size
+        self.cols, self.rows = cols, rows
+        self.n = cols * rows
+        self.direction, self.frame = np.divmod(np.arange(self.n), cols)
+        fw, fh = frame_size
+        self.pixels = np.zeros((self.n, fh + 2 * PAD, fw + 2 * PAD), np.uint8)
+        self._ys = np.arange(-PAD, fh + PAD).reshape(1, -1, 1)
+        self._xs = np.arange(-PAD, fw + PAD).reshape(1, 1, -1)
+        self.colors: list = [(0, 0, 0, 0)]   # palette keys and literal colors, by index
+        self._index: dict = {}
+
+    def _color(self, color) -> int:
+        color = color if isinstance(color, str) else tuple(color)
+        if color not in self._index:
+            self._index[color] = len(self.colors)
+            self.colors.append(color)
+        return self._index[color]
+
+    def _per_frame(self, value) -> np.ndarray:
+        return np.broadcast_to(value, (self.n,)).reshape(-1, 1, 1)
+
+    def _box(self, x0, y0, x1, y1, when) -> tuple[np.ndarray, ...]:
+        x0, y0, x1, y1, when = (self._per_frame(v) for v in (x0, y0, x1, y1, when))
+        rows = when & (self._ys >= y0) & (self._ys <= y1)
+        cols = (self._xs >= x0) & (self._xs <= x1)
+        return x0, y0, rows & cols
+
+    def rect(self, x0, y0, x1, y1, color, when=True) -> None:
+        """Fill the box from (x0, y0) to (x1, y1) inclusive, like ImageDraw.rectangle."""
+        self.pixels[self._box(x0, y0, x1, y1, when)[2]] = self._color(color)
+
+    def ellipse(self, x0, y0, x1, y1, color, when=True) -> None:
+        """ImageDraw.ellipse in the same box. Its size must be the same in every frame."""
+        w, h = int(np.max(np.subtract(x1, x0))), int(np.max(np.subtract(y1, y0)))
+        x0, y0, box = self._box(x0, y0, x1, y1, when)
+        stamp = ellipse_stamp(w, h)
+        inside = stamp[np.clip(self._ys - y0, 0, h), np.clip(self._xs - x0, 0, w)]
+        self.pixels[box & inside] = self._color(color)
+
+    def sheet(self) -> np.ndarray:
+        """Frames laid out in their grid, drawn in order so overhangs overlap as they used to."""
+        fw, fh = self.frame_size
+        out = np.zeros((self.rows * fh + 2 * PAD, self.cols * fw + 2 * PAD), np.uint8)
+        for i, frame in enumerate(self.pixels):
+            row, col = divmod(i, self.cols)
+            np.copyto(out[row * fh:row * fh + fh + 2 * PAD, col * fw:col * fw + fw + 2 * PAD], frame,
+                      where=frame != 0)
+        return out[PAD:-PAD, PAD:-PAD]
+
+    def lut(self, palette: dict = None) -> np.ndarray:
+        """RGBA per index for `palette` (default: the batch's own)."""
+        return np.array([rgba(color, palette or self.palette) for color in self.colors], np.uint8)
+
+    def rgba(self, palette: dict = None) -> np.ndarray:
+        return self.lut(palette)[self.sheet()]
+
+
+def rgba(color, palette: dict) -> tuple:
+    """A palette key or literal color as an RGBA tuple."""
+    if isinstance(color, str):
+        color = palette.get(color) or palette[COLOR_FALLBACK[color]]
+    return (*color, 255) if len(color) == 3 else tuple(color)
+
+
+@lru_cache(maxsize=None)
+def ellipse_stamp(w: int, h: int) -> np.ndarray:
+    """The pixels ImageDraw.ellipse fills in a (w+1)×(h+1) box."""
+    img = Image.new("1", (w + 1, h + 1), 0)
+    ImageDraw.Draw(img).ellipse([0, 0, w, h], fill=1)
+    return np.array(img, dtype=bool)
+
+
+class PILFrame:
+    """One frame drawn with ImageDraw calls, the way the sheets used to be
+    drawn. Kept as the reference for --bench and --verify."""
+
+    def __init__(self, draw: ImageDraw.ImageDraw, x: int, y: int, direction: int, frame: int, palette: dict):
+        self.draw, self.x, self.y, self.palette = draw, x, y, palette
+        self.direction, self.frame = np.array([direction]), np.array([frame])
+
+    def _args(self, x0, y0, x1, y1, color, when):
+        if not np.all(when):
+            return None
+        x0, y0, x1, y1 = (int(np.asarray(v).flat[0]) for v in (x0, y0, x1, y1))
+        return [self.x + x0, self.y + y0, self.x + x1, self.y + y1], rgba(color, self.palette)
+
+    def rect(self, x0, y0, x1, y1, color, when=True) -> None:
+        args = self._args(x0, y0, x1, y1, color, when)
+        if args:
+            self.draw.rectangle(args[0], fill=args[1])
+
+    def ellipse(self, x0, y0, x1, y1, color, when=True) -> None:
+        args = self._args(x0, y0, x1, y1, color, when)
+        if args:
+            self.draw.ellipse(args[0], fill=args[1])
+
+
+def by_direction(direction: np.ndarray, down, up, left, right) -> np.ndarray:
+    """Per-frame value picked by facing direction."""
+    return np.array([down, up, left, right])[direction]
+
+
+# === LAYERS ===
+# Coordinates are relative to the frame's top-left corner.
+
+def draw_character(c):
+    """Draw the base character: head, torso, arms and walking legs."""
+    d, step = c.direction, c.frame % 2 == 0
+    bounce = np.where(step, -1, 0)
+    leg_offset = np.where(step, 2, -2)
+    arm_swing = np.where(step, 1, -1)
+    down, up, left, right = d == 0, d == 1, d == 2, d == 3
+    vertical = down | up
+
     # === HEAD (centered at top) ===
-    head_y = y + 4 + bounce
-    # Hair back (behind head)
-    if facing_down or facing_left or facing_right:
-        draw.rectangle([x+10, head_y-2, x+22, head_y+2], fill=hair)
-    
-    # Head shape
-    draw.rectangle([x+10, head_y, x+22, head_y+12], fill=skin)
-    
-    # Hair on top
-    draw.rectangle([x+9, head_y-1, x+23, head_y+3], fill=hair)
-    
-    if facing_down:
-        # Eyes
-        draw.rectangle([x+12, head_y+5, x+14, head_y+7], fill=(30, 30, 30))
-        draw.rectangle([x+18, head_y+5, x+20, head_y+7], fill=(30, 30, 30))
-        # Mouth
-        draw.rectangle([x+14, head_y+9, x+18, head_y+10], fill=(180, 100, 100))
-    elif facing_up:
-        # Just hair from behind
-        draw.rectangle([x+9, head_y-1, x+23, head_y+8], fill=hair)
-    elif facing_left:
-        draw.rectangle([x+10, head_y+5, x+12, head_y+7], fill=(30, 30, 30))
-        draw.rectangle([x+10, head_y+9, x+14, head_y+10], fill=(180, 100, 100))
-    elif facing_right:
-        draw.rectangle([x+20, head_y+5, x+22, head_y+7], fill=(30, 30, 30))
-        draw.rectangle([x+18, head_y+9, x+22, head_y+10], fill=(180, 100, 100))
-    
+    head_y = 4 + bounce
+    c.rect(10, head_y-2, 22, head_y+2, 'hair', when=~up)  # hair behind the head
+    c.rect(10, head_y, 22, head_y+12, 'skin')
+    c.rect(9, head_y-1, 23, head_y+3, 'hair')
+    # Eyes and mouth (the back of the head when facing up)
+    c.rect(12, head_y+5, 14, head_y+7, EYE, when=down)
+    c.rect(18, head_y+5, 20, head_y+7, EYE, when=down)
+    c.rect(14, head_y+9, 18, head_y+10, MOUTH, when=down)
+    c.rect(9, head_y-1, 23, head_y+8, 'hair', when=up)
+    eye_x = by_direction(d, 0, 0, 10, 20)
+    mouth_x = by_direction(d, 0, 0, 10, 18)
+    c.rect(eye_x, head_y+5, eye_x+2, head_y+7, EYE, when=left | right)
+    c.rect(mouth_x, head_y+9, mouth_x+4, head_y+10, MOUTH, when=left | right)
+
     # === BODY / TORSO ===
     body_y = head_y + 13
-    draw.rectangle([x+8, body_y, x+24, body_y+14], fill=body)
-    # Body accent (belt, collar, etc.)
-    draw.rectangle([x+8, body_y+12, x+24, body_y+14], fill=accent)
-    
-    # Arms
-    if facing_down or facing_up:
-        # Left arm
-        draw.rectangle([x+5, body_y+2+arm_swing, x+8, body_y+12+arm_swing], fill=body2)
-        # Right arm  
-        draw.rectangle([x+24, body_y+2-arm_swing, x+27, body_y+12-arm_swing], fill=body2)
-    elif facing_left:
-        draw.rectangle([x+6, body_y+2+arm_swing, x+10, body_y+12+arm_swing], fill=body2)
-    elif facing_right:
-        draw.rectangle([x+22, body_y+2+arm_swing, x+26, body_y+12+arm_swing], fill=body2)
-
+    c.rect(8, body_y, 24, body_y+14, 'body')
+    c.rect(8, body_y+12, 24, body_y+14, 'accent')  # belt, collar, etc.
+
+    # Arms: both from the front or back, one from the side
+    arm_x = by_direction(d, 5, 5, 6, 22)
+    arm_w = by_direction(d, 3, 3, 4, 4)
+    c.rect(arm_x, body_y+2+arm_swing, arm_x+arm_w, body_y+12+arm_swing, 'body2')
+    c.rect(24, body_y+2-arm_swing, 27, body_y+12-arm_swing, 'body2', when=vertical)
     # Hands
-    if facing_down or facing_up:
-        draw.rectangle([x+5, body_y+11+arm_swing, x+8, body_y+13+arm_swing], fill=skin)
-        draw.rectangle([x+24, body_y+11-arm_swing, x+27, body_y+13-arm_swing], fill=skin)
-    
+    c.rect(5, body_y+11+arm_swing, 8, body_y+13+arm_swing, 'skin', when=vertical)
+    c.rect(24, body_y+11-arm_swing, 27, body_y+13-arm_swing, 'skin', when=vertical)
+
     # === LEGS ===
     leg_y = body_y + 15
-    if facing_down or facing_up:
-        # Left leg
-        draw.rectangle([x+10+leg_offset, leg_y, x+15+leg_offset, leg_y+8], fill=legs)
-        draw.rectangle([x+10+leg_offset, leg_y+7, x+15+leg_offset, leg_y+10], fill=shoes)
-        # Right leg
-        draw.rectangle([x+17-leg_offset, leg_y, x+22-leg_offset, leg_y+8], fill=legs)
-        draw.rectangle([x+17-leg_offset, leg_y+7, x+22-leg_offset, leg_y+10], fill=shoes)
-    elif facing_left:
-        draw.rectangle([x+10+leg_offset, leg_y, x+16+leg_offset, leg_y+8], fill=legs)
-        draw.rectangle([x+10+leg_offset, leg_y+7, x+16+leg_offset, leg_y+10], fill=shoes)
-        draw.rectangle([x+12-leg_offset, leg_y, x+18-leg_offset, leg_y+8], fill=legs)
-        draw.rectangle([x+12-leg_offset, leg_y+7, x+18-leg_offset, leg_y+10], fill=shoes)
-    elif facing_right:
-        draw.rectangle([x+14+leg_offset, leg_y, x+20+leg_offset, leg_y+8], fill=legs)
-        draw.rectangle([x+14+leg_offset, leg_y+7, x+20+leg_offset, leg_y+10], fill=shoes)
-        draw.rectangle([x+16-leg_offset, leg_y, x+22-leg_offset, leg_y+8], fill=legs)
-        draw.rectangle([x+16-leg_offset, leg_y+7, x+22-leg_offset, leg_y+10], fill=shoes)
-
-
-def draw_wizard_extras(draw, x, y, direction, frame, bounce):
+    front_x = by_direction(d, 10, 10, 10, 14) + leg_offset
+    back_x = by_direction(d, 17, 17, 12, 16) - leg_offset
+    leg_w = np.where(vertical, 5, 6)
+    for x in (front_x, back_x):
+        c.rect(x, leg_y, x+leg_w, leg_y+8, 'legs')
+        c.rect(x, leg_y+7, x+leg_w, leg_y+10, 'shoes')
+
+
+def draw_wizard_extras(c):
     """Add wizard-specific details: tall hat, staff, beard."""
-    head_y = y + 4 + bounce
-    
+    d = c.direction
+    head_y = 4 + np.where(c.frame % 2 == 0, -1, 0)
+
     # Tall pointy hat
     hat_color = (100, 50, 160)
-    hat_band = (200, 170, 50)
-    draw.rectangle([x+8, head_y-2, x+24, head_y+3], fill=hat_color)
-    draw.rectangle([x+10, head_y-6, x+22, head_y-1], fill=hat_color)
-    draw.rectangle([x+12, head_y-10, x+20, head_y-5], fill=hat_color)
-    draw.rectangle([x+14, head_y-13, x+18, head_y-9], fill=hat_color)
-    draw.rectangle([x+8, head_y+1, x+24, head_y+3], fill=hat_band)
-    
+    c.rect(8, head_y-2, 24, head_y+3, hat_color)
+    c.rect(10, head_y-6, 22, head_y-1, hat_color)
+    c.rect(12, head_y-10, 20, head_y-5, hat_color)
+    c.rect(14, head_y-13, 18, head_y-9, hat_color)
+    c.rect(8, head_y+1, 24, head_y+3, (200, 170, 50))  # band
+
     # Beard (only facing down or sides)
-    if direction == 0:  # down
-        draw.rectangle([x+12, head_y+10, x+20, head_y+18], fill=(220, 220, 220))
-        draw.rectangle([x+14, head_y+18, x+18, head_y+21], fill=(200, 200, 200))
-    elif direction == 2:  # left
-        draw.rectangle([x+8, head_y+10, x+14, head_y+18], fill=(220, 220, 220))
-    elif direction == 3:  # right
-        draw.rectangle([x+18, head_y+10, x+24, head_y+18], fill=(220, 220, 220))
-    
-    # Staff
-    staff_x = x + 26 if direction != 2 else x + 4
+    beard_x = by_direction(d, 12, 0, 8, 18)
+    beard_w = by_direction(d, 8, 0, 6, 6)
+    c.rect(beard_x, head_y+10, beard_x+beard_w, head_y+18, (220, 220, 220), when=d != 1)
+    c.rect(14, head_y+18, 18, head_y+21, (200, 200, 200), when=d == 0)
+
+    # Staff with an orb on top
+    staff_x = np.where(d != 2, 26, 4)
     body_y = head_y + 13
-    draw.rectangle([staff_x, head_y-8, staff_x+2, body_y+20], fill=(139, 90, 43))
-    # Orb on top
-    draw.ellipse([staff_x-2, head_y-12, staff_x+4, head_y-6], fill=(100, 200, 255))
+    c.rect(staff_x, head_y-8, staff_x+2, body_y+20, (139, 90, 43))
+    c.ellipse(staff_x-2, head_y-12, staff_x+4, head_y-6, (100, 200, 255))
 
 
-def draw_blacksmith_extras(draw, x, y, direction, frame, bounce):
+def draw_blacksmith_extras(c):
     """Add blacksmith-specific details: apron, hammer, bald head."""
-    head_y = y + 4 + bounce
-    body_y = head_y + 13
-    
+    d = c.direction
+    body_y = 17 + np.where(c.frame % 2 == 0, -1, 0)
+
     # Apron over body
-    draw.rectangle([x+9, body_y+4, x+23, body_y+16], fill=(139, 90, 43))
-    draw.rectangle([x+12, body_y+2, x+20, body_y+5], fill=(139, 90, 43))
-    
-    # Hammer (in hand)
-    if direction in [0, 3]:  # down or right
-        hx = x + 25
-        draw.rectangle([hx, body_y+2, hx+2, body_y+14], fill=(100, 80, 60))
-        draw.rectangle([hx-2, body_y, hx+4, body_y+4], fill=(160, 160, 170))
-    elif direction == 2:  # left
-        hx = x + 3
-        draw.rectangle([hx, body_y+2, hx+2, body_y+14], fill=(100, 80, 60))
-        draw.rectangle([hx-2, body_y, hx+4, body_y+4], fill=(160, 160, 170))
-
-
-def create_spritesheet(palette, extras_fn, filename):
-    """Create a 128x192 spritesheet (4 cols × 4 rows, 32x48 each)."""
-    fw, fh = 32, 48
-    img = Image.new('RGBA', (fw * 4, fh * 4), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
-    for direction in range(4):  # down, up, left, right
-        for frame in range(4):
-            x = frame * fw
-            y = direction * fh
-            bounce = -1 if frame % 2 == 0 else 0
-            draw_character(draw, x, y, direction, frame, palette)
-            if extras_fn:
-                extras_fn(draw, x, y, direction, frame, bounce)
-    
-    img.save(filename)
-    print(f"✅ Created: {filename} ({img.size[0]}x{img.size[1]})")
+    c.rect(9, body_y+4, 23, body_y+16, (139, 90, 43))
+    c.rect(12, body_y+2, 20, body_y+5, (139, 90, 43))
+
+    # Hammer (in hand, hidden when facing up)
+    hx = by_direction(d, 25, 0, 3, 25)
+    c.rect(hx, body_y+2, hx+2, body_y+14, (100, 80, 60), when=d != 1)
+    c.rect(hx-2, body_y, hx+4, body_y+4, (160, 160, 170), when=d != 1)
+
+
+def draw_herbalist_extras(c):
+    """Add herbalist-specific details: flower crown, potion bottle."""
+    d = c.direction
+    head_y = 4 + np.where(c.frame % 2 == 0, -1, 0)
+    body_y = head_y + 13
+
+    # Long hair flowing down
+    c.rect(8, head_y+2, 11, head_y+16, (180, 100, 40), when=d == 0)
+    c.rect(21, head_y+2, 24, head_y+16, (180, 100, 40), when=d == 0)
+    c.rect(8, head_y+2, 24, head_y+16, (180, 100, 40), when=d == 1)
+
+    # Flower crown
+    c.rect(11, head_y-2, 14, head_y+1, (255, 100, 150))
+    c.rect(15, head_y-3, 18, head_y, (255, 200, 50))
+    c.rect(19, head_y-2, 22, head_y+1, (150, 100, 255))
+
+    # Potion bottle in hand
+    bx = by_direction(d, 25, 0, 2, 25)
+    c.rect(bx, body_y+6, bx+3, body_y+12, (50, 200, 100), when=d != 1)
+    c.rect(bx+1, body_y+4, bx+2, body_y+7, (200, 200, 200), when=d != 1)
+
+
+def draw_guard_extras(c):
+    """Add guard-specific details: helmet, shield, cape."""
+    d = c.direction
+    head_y = 4 + np.where(c.frame % 2 == 0, -1, 0)
+    body_y = head_y + 13
+
+    # Helmet with a red plume, visor when facing down
+    helmet = (140, 150, 165)
+    c.rect(8, head_y-3, 24, head_y+2, helmet)
+    c.rect(7, head_y-1, 25, head_y+4, helmet)
+    c.rect(14, head_y-6, 18, head_y-2, (200, 40, 40))
+    c.rect(10, head_y+3, 22, head_y+5, (100, 110, 125), when=d == 0)
+
+    # Cape (behind body; peeks from the sides when facing down)
+    cape = (180, 40, 40)
+    c.rect(7, body_y, 25, body_y+16, cape, when=d == 1)
+    c.rect(5, body_y+4, 8, body_y+18, cape, when=d == 0)
+    c.rect(24, body_y+4, 27, body_y+18, cape, when=d == 0)
+
+    # Shield, with a cross unless it is seen from the right
+    sx = by_direction(d, 4, 0, 3, 24)
+    c.rect(sx, body_y+2, sx+4, body_y+12, helmet, when=d != 1)
+    c.rect(sx+1, body_y+4, sx+3, body_y+10, (200, 40, 40), when=d != 1)
+    c.rect(sx+2, body_y+5, sx+2, body_y+9, (255, 220, 50), when=(d == 0) | (d == 2))
+    c.rect(sx+1, body_y+7, sx+3, body_y+7, (255, 220, 50), when=(d == 0) | (d == 2))
+
+
+def draw_dragon(c):
+    """Larger boss sprite (48x64 per frame): horns, wings, tail and fire breath."""
+    d, step = c.direction, c.frame % 2 == 0
+    bounce = np.where(step, -2, 0)
+    wing = bounce + np.where(step, 4, -2)
+    leg_offset = np.where(step, 2, -2)
+
+    c.rect(14, 22+bounce, 34, 48+bounce, 'body')
+    c.rect(18, 30+bounce, 30, 46+bounce, 'belly')
+    c.ellipse(12, 10+bounce, 36, 28+bounce, 'head')
+    # Horns
+    c.rect(14, 6+bounce, 18, 14+bounce, 'horns')
+    c.rect(30, 6+bounce, 34, 14+bounce, 'horns')
+    # Eyes
+    c.rect(18, 16+bounce, 22, 20+bounce, 'eyes', when=d != 1)
+    c.rect(26, 16+bounce, 30, 20+bounce, 'eyes', when=d != 1)
+    c.rect(19, 17+bounce, 21, 19+bounce, 'pupils', when=d != 1)
+    c.rect(27, 17+bounce, 29, 19+bounce, 'pupils', when=d != 1)
+    # Mouth / fire
+    c.rect(20, 26+bounce, 28, 30+bounce, 'fire', when=(d == 0) & step)
+    c.rect(22, 30+bounce, 26, 34+bounce, 'eyes', when=(d == 0) & step)
+    # Wings
+    c.rect(4, 18+wing, 14, 38+wing, 'wings')
+    c.rect(34, 18+wing, 44, 38+wing, 'wings')
+    c.rect(2, 20+wing, 8, 30+wing, 'wing_tips')
+    c.rect(40, 20+wing, 46, 30+wing, 'wing_tips')
+    # Tail, to the right when facing down or left
+    tail_x = by_direction(d, 34, 4, 34, 4)
+    tip_x = by_direction(d, 42, 2, 42, 2)
+    c.rect(tail_x, 40+bounce, tail_x+10, 44+bounce, 'body')
+    c.rect(tip_x, 38+bounce, tip_x+4, 42+bounce, 'head')
+    # Legs
+    c.rect(16+leg_offset, 48+bounce, 22+leg_offset, 58+bounce, 'legs')
+    c.rect(26-leg_offset, 48+bounce, 32-leg_offset, 58+bounce, 'legs')
+    c.rect(16+leg_offset, 56+bounce, 23+leg_offset, 60+bounce, 'horns')
+    c.rect(25-leg_offset, 56+bounce, 33-leg_offset, 60+bounce, 'horns')
 
 
 # === PLAYER: Green tunic adventurer ===
@@ -219,136 +390,170 @@ guard_palette = {
     'accent': (180, 40, 40),   # red belt/sash
 }
 
+# === DRAGON: Red scales, fire breath ===
+dragon_palette = {
+    'body': (160, 30, 30),
+    'belly': (200, 120, 60),
+    'head': (180, 40, 40),
+    'horns': (80, 60, 40),     # also claws
+    'eyes': (255, 200, 0),     # also the flame's core
+    'pupils': (20, 20, 20),
+    'fire': (255, 100, 0),
+    'wings': (140, 25, 25),
+    'wing_tips': (120, 20, 20),
+    'legs': (130, 25, 25),
+}
 
-def draw_herbalist_extras(draw, x, y, direction, frame, bounce):
-    """Add herbalist-specific details: flower crown, potion bottle."""
-    head_y = y + 4 + bounce
-    body_y = head_y + 13
 
-    # Long hair flowing down
-    if direction == 0:  # down
-        draw.rectangle([x+8, head_y+2, x+11, head_y+16], fill=(180, 100, 40))
-        draw.rectangle([x+21, head_y+2, x+24, head_y+16], fill=(180, 100, 40))
-    elif direction == 1:  # up
-        draw.rectangle([x+8, head_y+2, x+24, head_y+16], fill=(180, 100, 40))
+class Sheet(NamedTuple):
+    palette: dict
+    layers: tuple[Callable, ...]
+    frame_size: tuple[int, int] = (32, 48)
 
-    # Flower crown
-    flowers = [(255, 100, 150), (255, 200, 50), (150, 100, 255)]
-    draw.rectangle([x+11, head_y-2, x+14, head_y+1], fill=flowers[0])
-    draw.rectangle([x+15, head_y-3, x+18, head_y], fill=flowers[1])
-    draw.rectangle([x+19, head_y-2, x+22, head_y+1], fill=flowers[2])
 
-    # Potion bottle in hand
-    if direction in [0, 3]:  # down or right
-        bx = x + 25
-        draw.rectangle([bx, body_y+6, bx+3, body_y+12], fill=(50, 200, 100))
-        draw.rectangle([bx+1, body_y+4, bx+2, body_y+7], fill=(200, 200, 200))
-    elif direction == 2:  # left
-        bx = x + 2
-        draw.rectangle([bx, body_y+6, bx+3, body_y+12], fill=(50, 200, 100))
-        draw.rectangle([bx+1, body_y+4, bx+2, body_y+7], fill=(200, 200, 200))
+SHEETS = {
+    'player': Sheet(player_palette, (draw_character,)),
+    'wizard': Sheet(wizard_palette, (draw_character, draw_wizard_extras)),
+    'blacksmith': Sheet(blacksmith_palette, (draw_character, draw_blacksmith_extras)),
+    'herbalist': Sheet(herbalist_palette, (draw_character, draw_herbalist_extras)),
+    'guard': Sheet(guard_palette, (draw_character, draw_guard_extras)),
+    'dragon': Sheet(dragon_palette, (draw_dragon,), frame_size=(48, 64)),
+}
 
 
-def draw_guard_extras(draw, x, y, direction, frame, bounce):
-    """Add guard-specific details: helmet, shield, cape."""
-    head_y = y + 4 + bounce
-    body_y = head_y + 13
+@lru_cache(maxsize=None)
+def layer_source(layer: Callable) -> bytes:
+    return inspect.getsource(layer).encode()
 
-    # Helmet
-    helmet = (140, 150, 165)
-    visor = (100, 110, 125)
-    draw.rectangle([x+8, head_y-3, x+24, head_y+2], fill=helmet)
-    draw.rectangle([x+7, head_y-1, x+25, head_y+4], fill=helmet)
-    # Helmet plume (red)
-    draw.rectangle([x+14, head_y-6, x+18, head_y-2], fill=(200, 40, 40))
 
-    if direction == 0:  # down - visor
-        draw.rectangle([x+10, head_y+3, x+22, head_y+5], fill=visor)
+def sheet_hash(sheet: Sheet) -> str:
+    """Changes when the sheet's palette, frame size or layer source does."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(json.dumps([RENDER_VERSION, sheet.frame_size, sorted(sheet.palette.items())]).encode())
+    for layer in sheet.layers:
+        h.update(layer_source(layer))
+    return h.hexdigest()
 
-    # Cape (behind body)
-    cape = (180, 40, 40)
-    if direction == 1:  # up
-        draw.rectangle([x+7, body_y, x+25, body_y+16], fill=cape)
-    elif direction == 0:  # down - cape peeks from sides
-        draw.rectangle([x+5, body_y+4, x+8, body_y+18], fill=cape)
-        draw.rectangle([x+24, body_y+4, x+27, body_y+18], fill=cape)
-
-    # Shield (left side)
-    if direction in [0, 2]:
-        sx = x + 3 if direction == 2 else x + 4
-        draw.rectangle([sx, body_y+2, sx+4, body_y+12], fill=(140, 150, 165))
-        draw.rectangle([sx+1, body_y+4, sx+3, body_y+10], fill=(200, 40, 40))
-        # Cross on shield
-        draw.rectangle([sx+2, body_y+5, sx+2, body_y+9], fill=(255, 220, 50))
-        draw.rectangle([sx+1, body_y+7, sx+3, body_y+7], fill=(255, 220, 50))
-    elif direction == 3:  # right
-        sx = x + 24
-        draw.rectangle([sx, body_y+2, sx+4, body_y+12], fill=(140, 150, 165))
-        draw.rectangle([sx+1, body_y+4, sx+3, body_y+10], fill=(200, 40, 40))
+
+def render_batch(sheet: Sheet) -> FrameBatch:
+    batch = FrameBatch(sheet.palette, sheet.frame_size)
+    for layer in sheet.layers:
+        layer(batch)
+    return batch
+
+
+def render_sheet(sheet: Sheet) -> np.ndarray:
+    """The sheet as an RGBA array (4 rows × 4 columns of frames)."""
+    return render_batch(sheet).rgba()
+
+
+def render_sheet_pil(sheet: Sheet) -> np.ndarray:
+    """Reference renderer: one ImageDraw call per shape per frame."""
+    fw, fh = sheet.frame_size
+    img = Image.new('RGBA', (fw * 4, fh * 4), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    for direction in range(4):  # down, up, left, right
+        for frame in range(4):
+            c = PILFrame(draw, frame * fw, direction * fh, direction, frame, sheet.palette)
+            for layer in sheet.layers:
+                layer(c)
+    return np.array(img)
+
+
+def _build_one(name: str, out_dir: str) -> tuple[str, float]:
+    start = time.perf_counter()
+    Image.fromarray(render_sheet(SHEETS[name]), 'RGBA').save(os.path.join(out_dir, f'{name}.png'))
+    return name, time.perf_counter() - start
+
+
+def build(out_dir, names=None, jobs: int = 0, force: bool = False, quiet: bool = False) -> list[str]:
+    """Render the sheets whose hash changed since the last build into out_dir. Returns the names built."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+
+    hashes = {name: sheet_hash(SHEETS[name]) for name in names or SHEETS}
+    stale = [name for name, digest in hashes.items()
+             if force or manifest.get(name) != digest or not (out_dir / f'{name}.png').exists()]
+    jobs = min(jobs or os.cpu_count() or 1, len(stale))
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            results = list(pool.map(_build_one, stale, [str(out_dir)] * len(stale)))
+    else:
+        results = [_build_one(name, str(out_dir)) for name in stale]
+
+    for name, seconds in results:
+        manifest[name] = hashes[name]
+        if not quiet:
+            w, h = Image.open(out_dir / f'{name}.png').size
+            print(f"✅ Created: {out_dir / name}.png ({w}x{h}) in {seconds * 1000:.1f} ms")
+    if results:
+        manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    if not quiet:
+        print(f"\n🎮 {len(results)} sheets built, {len(hashes) - len(results)} unchanged")
+    return [name for name, _ in results]
+
+
+def verify() -> bool:
+    """Every sheet matches the ImageDraw reference pixel for pixel."""
+    ok = True
+    for name, sheet in SHEETS.items():
+        same = np.array_equal(render_sheet(sheet), render_sheet_pil(sheet))
+        ok &= same
+        print(f"{'✅' if same else '❌'} {name}")
+    return ok
+
+
+def bench(runs: int, jobs: int) -> None:
+    """Full and no-op rebuild times into a scratch directory (best of `runs`)."""
+    def best(fn) -> float:
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def pil_build():
+            for name, sheet in SHEETS.items():
+                Image.fromarray(render_sheet_pil(sheet), 'RGBA').save(os.path.join(tmp, f'{name}.png'))
+
+        print(f"{len(SHEETS)} sheets, best of {runs}")
+        print(f"  ImageDraw, one call per shape and frame  {best(pil_build):>8.1f} ms")
+        print(f"  vectorized, full rebuild (1 process)     "
+              f"{best(lambda: build(tmp, jobs=1, force=True, quiet=True)):>8.1f} ms")
+        if jobs > 1:
+            print(f"  vectorized, full rebuild ({jobs} processes)   "
+                  f"{best(lambda: build(tmp, jobs=jobs, force=True, quiet=True)):>8.1f} ms")
+        print(f"  no-op rebuild (hashes unchanged)         {best(lambda: build(tmp, quiet=True)):>8.1f} ms")
+        one = 'wizard'
+        print(f"  one sheet changed                        "
+              f"{best(lambda: build(tmp, names=[one], force=True, quiet=True)):>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default=str(DEFAULT_OUT), help='output directory')
+    parser.add_argument('--only', nargs='+', choices=sorted(SHEETS), help='build only these sheets')
+    parser.add_argument('--jobs', type=int, default=0, help='worker processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='rebuild even if nothing changed')
+    parser.add_argument('--verify', action='store_true', help='compare every sheet with the ImageDraw reference')
+    parser.add_argument('--bench', action='store_true', help='time full and no-op rebuilds, then exit')
+    parser.add_argument('--runs', type=int, default=5, help='repetitions for --bench')
+    args = parser.parse_args()
+
+    if args.verify:
+        raise SystemExit(0 if verify() else 1)
+    if args.bench:
+        bench(args.runs, args.jobs or os.cpu_count() or 1)
+        return
+    build(args.out, args.only, jobs=args.jobs, force=args.force)
 
 
 if __name__ == '__main__':
-    import os
-    out = r'c:\Python Game\game-ui\public\assets\sprites'
-    os.makedirs(out, exist_ok=True)
-
-    create_spritesheet(player_palette, None, os.path.join(out, 'player.png'))
-    create_spritesheet(wizard_palette, draw_wizard_extras, os.path.join(out, 'wizard.png'))
-    create_spritesheet(blacksmith_palette, draw_blacksmith_extras, os.path.join(out, 'blacksmith.png'))
-    create_spritesheet(herbalist_palette, draw_herbalist_extras, os.path.join(out, 'herbalist.png'))
-    create_spritesheet(guard_palette, draw_guard_extras, os.path.join(out, 'guard.png'))
-
-    # === DRAGON: Larger boss sprite (48x64 per frame) ===
-    dragon_fw, dragon_fh = 48, 64
-    dragon_img = Image.new('RGBA', (dragon_fw * 4, dragon_fh * 4), (0, 0, 0, 0))
-    dd = ImageDraw.Draw(dragon_img)
-
-    for direction in range(4):
-        for frame_i in range(4):
-            ox = frame_i * dragon_fw
-            oy = direction * dragon_fh
-            bounce = -2 if frame_i % 2 == 0 else 0
-            wing_flap = 4 if frame_i % 2 == 0 else -2
-
-            # Body
-            dd.rectangle([ox+14, oy+22+bounce, ox+34, oy+48+bounce], fill=(160, 30, 30))
-            # Belly
-            dd.rectangle([ox+18, oy+30+bounce, ox+30, oy+46+bounce], fill=(200, 120, 60))
-            # Head
-            dd.ellipse([ox+12, oy+10+bounce, ox+36, oy+28+bounce], fill=(180, 40, 40))
-            # Horns
-            dd.rectangle([ox+14, oy+6+bounce, ox+18, oy+14+bounce], fill=(80, 60, 40))
-            dd.rectangle([ox+30, oy+6+bounce, ox+34, oy+14+bounce], fill=(80, 60, 40))
-            # Eyes
-            if direction != 1:
-                dd.rectangle([ox+18, oy+16+bounce, ox+22, oy+20+bounce], fill=(255, 200, 0))
-                dd.rectangle([ox+26, oy+16+bounce, ox+30, oy+20+bounce], fill=(255, 200, 0))
-                dd.rectangle([ox+19, oy+17+bounce, ox+21, oy+19+bounce], fill=(20, 20, 20))
-                dd.rectangle([ox+27, oy+17+bounce, ox+29, oy+19+bounce], fill=(20, 20, 20))
-            # Mouth / fire
-            if direction == 0 and frame_i % 2 == 0:
-                dd.rectangle([ox+20, oy+26+bounce, ox+28, oy+30+bounce], fill=(255, 100, 0))
-                dd.rectangle([ox+22, oy+30+bounce, ox+26, oy+34+bounce], fill=(255, 200, 0))
-            # Wings
-            dd.rectangle([ox+4, oy+18+bounce+wing_flap, ox+14, oy+38+bounce+wing_flap], fill=(140, 25, 25))
-            dd.rectangle([ox+34, oy+18+bounce+wing_flap, ox+44, oy+38+bounce+wing_flap], fill=(140, 25, 25))
-            dd.rectangle([ox+2, oy+20+bounce+wing_flap, ox+8, oy+30+bounce+wing_flap], fill=(120, 20, 20))
-            dd.rectangle([ox+40, oy+20+bounce+wing_flap, ox+46, oy+30+bounce+wing_flap], fill=(120, 20, 20))
-            # Tail
-            if direction in [2, 0]:
-                dd.rectangle([ox+34, oy+40+bounce, ox+44, oy+44+bounce], fill=(160, 30, 30))
-                dd.rectangle([ox+42, oy+38+bounce, ox+46, oy+42+bounce], fill=(180, 40, 40))
-            elif direction in [3, 1]:
-                dd.rectangle([ox+4, oy+40+bounce, ox+14, oy+44+bounce], fill=(160, 30, 30))
-                dd.rectangle([ox+2, oy+38+bounce, ox+6, oy+42+bounce], fill=(180, 40, 40))
-            # Legs
-            leg_off = 2 if frame_i % 2 == 0 else -2
-            dd.rectangle([ox+16+leg_off, oy+48+bounce, ox+22+leg_off, oy+58+bounce], fill=(130, 25, 25))
-            dd.rectangle([ox+26-leg_off, oy+48+bounce, ox+32-leg_off, oy+58+bounce], fill=(130, 25, 25))
-            dd.rectangle([ox+16+leg_off, oy+56+bounce, ox+23+leg_off, oy+60+bounce], fill=(80, 60, 40))
-            dd.rectangle([ox+25-leg_off, oy+56+bounce, ox+33-leg_off, oy+60+bounce], fill=(80, 60, 40))
-
-    dragon_img.save(os.path.join(out, 'dragon.png'))
-    print(f"✅ Created: dragon.png ({dragon_img.size[0]}x{dragon_img.size[1]})")
-
-    print("\n🎮 All character sprites generated!")
+    main()
@@ -0,0 +1,265 @@
+"""
+Generate background villagers: many palette/outfit variants of the
+characters in generate_sprites.py, packed into a few power-of-two texture
+atlases with one JSON frame index (Phaser multiatlas format).
+
+An outfit is `draw_character` plus one of the `*_extras` layers, and its 16
+frames are rendered once as palette indices. A variant is that render with
+its own palette. Frames are trimmed to their visible pixels and shelf-packed
+into pages of at most --max-size. Pages are drawn and PNG-encoded in a
+process pool. The client then loads len(pages) + 1 files instead of one
+sheet per villager.
+
+    python generate_villagers.py                    # 256 villagers → game-ui/public/assets/atlases
+    python generate_villagers.py --count 1000 --jobs 4 --max-size 4096
+"""
+import os
+import json
+import time
+import random
+import colorsys
+import hashlib
+import argparse
+from pathlib import Path
+from functools import lru_cache
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from generate_sprites import (
+    MANIFEST, PAD, RENDER_VERSION, Sheet, draw_blacksmith_extras, draw_character, draw_guard_extras,
+    draw_herbalist_extras, draw_wizard_extras, layer_source, render_batch, rgba,
+)
+
+
+DEFAULT_OUT = Path(__file__).parent / "game-ui" / "public" / "assets" / "atlases"
+ATLAS = "villagers"
+FRAME_SIZE = (32, 48)
+
+# Outfit -> extra layers drawn over draw_character, and how often it is picked.
+OUTFITS = {
+    'villager': ((), 6),
+    'smith': ((draw_blacksmith_extras,), 2),
+    'herbalist': ((draw_herbalist_extras,), 2),
+    'guard': ((draw_guard_extras,), 1),
+    'mage': ((draw_wizard_extras,), 1),
+}
+
+SKIN_TONES = [(255, 220, 185), (255, 210, 170), (240, 210, 190), (220, 185, 155),
+              (200, 160, 130), (170, 120, 90), (140, 95, 70), (100, 70, 50)]
+HAIR_COLORS = [(40, 40, 40), (50, 40, 35), (120, 70, 30), (180, 100, 40), (200, 200, 200),
+               (230, 200, 120), (90, 50, 30), (150, 40, 30)]
+ACCENTS = [(180, 140, 50), (200, 170, 50), (139, 90, 43), (180, 40, 40), (60, 60, 70)]
+
+
+class Variant(NamedTuple):
+    name: str
+    outfit: str
+    palette: dict
+
+
+def _hsv(h: float, s: float, v: float) -> tuple[int, int, int]:
+    return tuple(round(c * 255) for c in colorsys.hsv_to_rgb(h % 1.0, s, v))
+
+
+def make_variant(seed: int, i: int) -> Variant:
+    """Villager i of a farm. Depends only on (seed, i), not on --count or --jobs."""
+    rng = random.Random(seed * 1_000_003 + i)
+    outfit = rng.choices(list(OUTFITS), weights=[w for _, w in OUTFITS.values()])[0]
+    hue, sat, val = rng.random(), rng.uniform(0.35, 0.75), rng.uniform(0.45, 0.8)
+    palette = {
+        'skin': rng.choice(SKIN_TONES),
+        'hair': rng.choice(HAIR_COLORS),
+        'body': _hsv(hue, sat, val),
+        'body2': _hsv(hue, sat, val * 0.85),
+        'legs': _hsv(rng.random(), rng.uniform(0.1, 0.4), rng.uniform(0.25, 0.5)),
+        'shoes': _hsv(rng.uniform(0.05, 0.1), rng.uniform(0.4, 0.7), rng.uniform(0.2, 0.4)),
+        'accent': rng.choice(ACCENTS),
+    }
+    return Variant(f'villager_{i:03d}', outfit, palette)
+
+
+class OutfitFrames(NamedTuple):
+    colors: list                              # FrameBatch.colors: palette key or color per index
+    frames: list[np.ndarray]                  # trimmed index frames
+    offsets: list[tuple[int, int]]            # where each trimmed frame sits in its 32x48 frame
+
+
+@lru_cache(maxsize=None)
+def outfit_frames(outfit: str) -> OutfitFrames:
+    """The outfit's 16 frames as palette indices, each trimmed to its visible pixels.
+    Shapes that overhang a frame are clipped to it."""
+    fw, fh = FRAME_SIZE
+    batch = render_batch(Sheet({}, (draw_character, *OUTFITS[outfit][0]), FRAME_SIZE))
+    frames, offsets = [], []
+    for pixels in batch.pixels[:, PAD:PAD + fh, PAD:PAD + fw]:
+        ys, xs = np.nonzero(pixels)
+        y0, x0 = ys.min(), xs.min()
+        frames.append(pixels[y0:ys.max() + 1, x0:xs.max() + 1])
+        offsets.append((int(x0), int(y0)))
+    return OutfitFrames(batch.colors, frames, offsets)
+
+
+def _next_pow2(n: int) -> int:
+    return 1 << max(n - 1, 0).bit_length()
+
+
+def shelf_pack(sizes: list[tuple[int, int]], max_size: int, padding: int = 1):
+    """Place (w, h) boxes on shelves, tallest first, opening a new page when
+    one is full. Returns a (page, x, y) per box and each page's (w, h),
+    rounded up to powers of two."""
+    placements: list = [None] * len(sizes)
+    pages: list[list[int]] = []
+    x = shelf_y = shelf_h = max_size  # forces a new page for the first box
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        w, h = sizes[i][0] + padding, sizes[i][1] + padding
+        if w > max_size or h > max_size:
+            raise ValueError(f"Frame {sizes[i]} does not fit a {max_size}px page")
+        if x + w > max_size:
+            x, shelf_y, shelf_h = 0, shelf_y + shelf_h, h
+        if shelf_y + h > max_size:
+            pages.append([0, 0])
+            x, shelf_y, shelf_h = 0, 0, h
+        placements[i] = (len(pages) - 1, x, shelf_y)
+        page = pages[-1]
+        page[0], page[1] = max(page[0], x + w), max(page[1], shelf_y + h)
+        x += w
+    return placements, [(_next_pow2(w), _next_pow2(h)) for w, h in pages]
+
+
+def _render_page(path: str, size: tuple[int, int], entries: list) -> float:
+    """Draw one atlas page: entries are (variant, frame index, x, y)."""
+    start = time.perf_counter()
+    page = np.zeros((size[1], size[0], 4), np.uint8)
+    luts = {}
+    for variant, i, x, y in entries:
+        outfit = outfit_frames(variant.outfit)
+        if variant.name not in luts:
+            luts[variant.name] = np.array([rgba(c, variant.palette) for c in outfit.colors], np.uint8)
+        frame = outfit.frames[i]
+        page[y:y + frame.shape[0], x:x + frame.shape[1]] = luts[variant.name][frame]
+    Image.fromarray(page, 'RGBA').save(path)
+    return time.perf_counter() - start
+
+
+def farm_hash(count: int, seed: int, max_size: int, padding: int) -> str:
+    """Changes with the options and with the source of every layer an outfit draws."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(json.dumps([RENDER_VERSION, count, seed, max_size, padding, SKIN_TONES, HAIR_COLORS, ACCENTS,
+                         {name: w for name, (_, w) in OUTFITS.items()}]).encode())
+    h.update(layer_source(draw_character))
+    for layers, _ in OUTFITS.values():
+        for layer in layers:
+            h.update(layer_source(layer))
+    h.update(layer_source(make_variant))
+    return h.hexdigest()
+
+
+def build(out_dir, count: int = 256, seed: int = 1, max_size: int = 2048, padding: int = 1,
+          jobs: int = 0, force: bool = False, quiet: bool = False) -> dict:
+    """Generate and pack `count` villagers into out_dir. Returns the build stats."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    digest = farm_hash(count, seed, max_size, padding)
+    if not force and manifest.get(ATLAS) == digest and (out_dir / f'{ATLAS}.json').exists():
+        if not quiet:
+            print(f"🎮 {ATLAS} atlas unchanged")
+        return {}
+
+    start = time.perf_counter()
+    variants = [make_variant(seed, i) for i in range(count)]
+    items = [(v, i) for v in variants for i in range(16)]
+    sizes = [outfit_frames(v.outfit).frames[i].shape[::-1] for v, i in items]
+    rendered = time.perf_counter()
+
+    placements, page_sizes = shelf_pack(sizes, max_size, padding)
+    entries: list[list] = [[] for _ in page_sizes]
+    textures = [{'image': f'{ATLAS}-{n}.png', 'format': 'RGBA8888', 'size': {'w': w, 'h': h}, 'scale': 1,
+                 'frames': []} for n, (w, h) in enumerate(page_sizes)]
+    fw, fh = FRAME_SIZE
+    for (variant, i), (w, h), (page, x, y) in zip(items, sizes, placements):
+        entries[page].append((variant, i, x, y))
+        ox, oy = outfit_frames(variant.outfit).offsets[i]
+        textures[page]['frames'].append({
+            'filename': f'{variant.name}/{i}', 'trimmed': True,
+            'sourceSize': {'w': fw, 'h': fh}, 'spriteSourceSize': {'x': ox, 'y': oy, 'w': w, 'h': h},
+            'frame': {'x': x, 'y': y, 'w': w, 'h': h},
+        })
+    packed = time.perf_counter()
+
+    paths = [str(out_dir / texture['image']) for texture in textures]
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            list(pool.map(_render_page, paths, page_sizes, entries))
+    else:
+        for args in zip(paths, page_sizes, entries):
+            _render_page(*args)
+    drawn = time.perf_counter()
+
+    index = {'textures': textures, 'meta': {
+        'app': 'generate_villagers.py', 'seed': seed, 'frameSize': {'w': fw, 'h': fh},
+        'variants': [{'name': v.name, 'outfit': v.outfit} for v in variants],
+    }}
+    (out_dir / f'{ATLAS}.json').write_text(json.dumps(index, separators=(',', ':')))
+    for stale in out_dir.glob(f'{ATLAS}-*.png'):
+        if str(stale) not in paths:
+            stale.unlink()
+    manifest[ATLAS] = digest
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    done = time.perf_counter()
+
+    # Same frames packed untrimmed, for comparison.
+    _, untrimmed_pages = shelf_pack([FRAME_SIZE] * len(items), max_size, padding)
+    frame_area = sum(w * h for w, h in sizes)
+    stats = {
+        'variants': count, 'frames': len(items), 'pages': page_sizes, 'untrimmed_pages': untrimmed_pages,
+        'efficiency': frame_area / sum(w * h for w, h in page_sizes),
+        'untrimmed_efficiency': frame_area / sum(w * h for w, h in untrimmed_pages),
+        'png_bytes': sum(os.path.getsize(p) for p in paths),
+        'json_bytes': (out_dir / f'{ATLAS}.json').stat().st_size,
+        'seconds': {'render': rendered - start, 'pack': packed - rendered, 'pages': drawn - packed,
+                    'total': done - start},
+    }
+    if not quiet:
+        report(stats, jobs)
+    return stats
+
+
+def report(stats: dict, jobs: int) -> None:
+    secs = stats['seconds']
+    pages = ', '.join(f'{w}x{h}' for w, h in stats['pages'])
+    print(f"✅ {stats['variants']} villagers, {stats['frames']} frames → {len(stats['pages'])} pages ({pages})")
+    print(f"   packing efficiency {stats['efficiency']:.1%} (trimmed frame area / page area; untrimmed frames: "
+          f"{stats['untrimmed_efficiency']:.1%} on {len(stats['untrimmed_pages'])} pages)")
+    print(f"   {stats['png_bytes'] / 1024:.0f} KiB PNG + {stats['json_bytes'] / 1024:.0f} KiB JSON "
+          f"in {len(stats['pages']) + 1} requests (one sheet per villager: {stats['variants']} requests)")
+    print(f"   {secs['total'] * 1000:.0f} ms: render {secs['render'] * 1000:.0f}, pack {secs['pack'] * 1000:.0f}, "
+          f"pages {secs['pages'] * 1000:.0f} ({jobs} processes) → "
+          f"{stats['variants'] / secs['total']:.0f} villagers/s, {stats['frames'] / secs['total']:.0f} frames/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default=str(DEFAULT_OUT), help='output directory')
+    parser.add_argument('--count', type=int, default=256, help='villagers to generate')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--max-size', type=int, default=2048, help='largest page side (a power of two)')
+    parser.add_argument('--padding', type=int, default=1, help='pixels between frames')
+    parser.add_argument('--jobs', type=int, default=0, help='worker processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='rebuild even if nothing changed')
+    args = parser.parse_args()
+    if args.max_size & (args.max_size - 1):
+        parser.error('--max-size must be a power of two')
+    build(args.out, args.count, args.seed, args.max_size, args.padding, jobs=args.jobs, force=args.force)
+
+
+if __name__ == '__main__':
+    main()